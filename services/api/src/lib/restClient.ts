@@ -17,6 +17,12 @@ export interface ChatStreamResponse {
   finished: boolean;
 }
 
+export interface WarmChatSessionRequest {
+  child_id: string;
+  persona: 'mummy' | 'daddy' | 'custom';
+  custom_prompt?: string;
+}
+
 export interface GenerateDaysRequest {
   child_id: string;
   persona_config: {
@@ -71,6 +77,14 @@ export class RestClient {
     return this.makeRequest<ChatStreamResponse>('/chat/stream', 'POST', request);
   }
 
+  /**
+   * Ask the intelligence service to preload a session's context.
+   * Call when the chat opens; it returns before the preload finishes.
+   */
+  async warmChatSession(sessionId: string, request: WarmChatSessionRequest): Promise<{ session_id: string; status: string }> {
+    return this.makeRequest(`/chat/session/${encodeURIComponent(sessionId)}/warm`, 'POST', request);
+  }
+
   /**
    * Generate daily messages for calendar
    */
@@ -0,0 +1 @@
+"""Performance benchmarks for the Advent Intelligence service."""
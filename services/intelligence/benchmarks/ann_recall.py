@@ -0,0 +1,103 @@
+"""Recall and latency of the IVF memory index against exact search.
+
+Builds a synthetic child memory of clustered embeddings (like chunks about a
+handful of recurring topics), then queries it with perturbed copies of stored
+vectors. Reports recall@k against ChildEmbeddingIndex's exact scan and
+per-query latency for several nprobe values, plus build time, saved file
+size and memory-mapped load time.
+
+    python -m benchmarks.ann_recall --vectors 20000 --dim 1536 --nprobe 4 8 16
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+from src.core.ann_index import IVFQuantizedIndex
+from src.core.embedding_index import ChildEmbeddingIndex
+
+
+def clustered_vectors(count: int, dim: int, topics: int, spread: float, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    members = centers[rng.integers(topics, size=count)]
+    noise = rng.standard_normal((count, dim)).astype(np.float32) * spread / np.sqrt(dim)
+    return (members + noise).astype(np.float32)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--spread", type=float, default=1.0, help="Noise around each topic")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=3, help="k in recall@k")
+    parser.add_argument("--threshold", type=float, default=0.0)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(args.vectors, args.dim, args.topics, args.spread, rng)
+    keys = [f"memory:bench:chunk:{i}" for i in range(args.vectors)]
+    sources = vectors[rng.integers(args.vectors, size=args.queries)]
+    queries = (sources + rng.standard_normal(sources.shape) * 0.5 / np.sqrt(args.dim)).astype(np.float32)
+
+    exact = ChildEmbeddingIndex(args.dim)
+    for key, vector in zip(keys, vectors):
+        exact.upsert(key, vector)
+
+    exact_latencies = []
+    truth = []
+    for query in queries:
+        started = time.perf_counter()
+        hits = exact.search(query, args.limit, args.threshold)
+        exact_latencies.append((time.perf_counter() - started) * 1000)
+        truth.append({key for key, _ in hits})
+
+    started = time.perf_counter()
+    built = IVFQuantizedIndex.build(keys, vectors)
+    build_seconds = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.ivf")
+        size = built.save(path)
+        started = time.perf_counter()
+        index = IVFQuantizedIndex.load(path)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        print(f"{args.vectors} vectors x {args.dim} dims, {index.nlist} lists")
+        print(f"build {build_seconds:.2f} s, file {size / 1e6:.1f} MB "
+              f"(float32 alone {vectors.nbytes / 1e6:.1f} MB), mmap load {load_ms:.1f} ms")
+        print(f"{'search':<14}{'recall@' + str(args.limit):>10}{'p50 ms':>10}{'p95 ms':>10}")
+        print(f"{'exact':<14}{1.0:>10.3f}{statistics.median(exact_latencies):>10.3f}"
+              f"{percentile(exact_latencies, 0.95):>10.3f}")
+
+        for nprobe in args.nprobe:
+            latencies = []
+            found = 0
+            for query, expected in zip(queries, truth):
+                unit = query / np.linalg.norm(query)
+                started = time.perf_counter()
+                hits = index.search(unit, args.limit, args.threshold, nprobe=nprobe, rerank_factor=args.rerank_factor)
+                latencies.append((time.perf_counter() - started) * 1000)
+                found += len(expected & {key for key, _ in hits})
+            recall = found / max(1, sum(len(expected) for expected in truth))
+            print(f"{'nprobe=' + str(nprobe):<14}{recall:>10.3f}{statistics.median(latencies):>10.3f}"
+                  f"{percentile(latencies, 0.95):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Load generator for /chat/stream and /chat/generate_days.
+
+Drives concurrent clients against the FastAPI app and reports time to first
+byte, stream duration, tokens and SSE frames per second and the peak number
+of concurrent streams. By default the app is served in-process by uvicorn on a local port,
+with the OpenAI client replaced by FakeAsyncOpenAI, so no API key or network
+access is needed. Pass --url to target an already running server instead (start
+it with OPENAI_FAKE_UPSTREAM=true to avoid calling the real API).
+
+    python -m benchmarks.load_chat_stream --concurrency 200 --requests 2000
+    python -m benchmarks.load_chat_stream --endpoint generate_days --concurrency 20
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "load-test")
+
+
+@dataclass
+class Result:
+    ok: bool
+    ttfb: Optional[float] = None
+    duration: float = 0.0
+    frames: int = 0
+    tokens: int = 0  # Words in data payloads; one per token from the fake upstream
+    status: Optional[int] = None
+
+
+@dataclass
+class Stats:
+    results: List[Result] = field(default_factory=list)
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def chat_stream_request(client: httpx.AsyncClient, stats: Stats, index: int) -> Result:
+    payload = {
+        "child_id": f"load-child-{index % 500}",
+        "session_id": str(uuid.uuid4()),
+        "persona": "daddy",
+        "message": "I love you Daddy",
+        "conversation_history": [],
+    }
+    return await timed_stream(client, stats, "/chat/stream", payload, sse=True)
+
+
+async def generate_days_request(client: httpx.AsyncClient, stats: Stats, index: int) -> Result:
+    payload = {
+        "child_id": f"load-child-{index}",
+        "child_name": f"Child {index}",
+        "persona": "mummy",
+        "theme": "winter",
+        "regenerate": True,
+    }
+    return await timed_stream(client, stats, "/chat/generate_days", payload, sse=False)
+
+
+async def timed_stream(client: httpx.AsyncClient, stats: Stats, path: str, payload: dict, sse: bool) -> Result:
+    start = time.perf_counter()
+    stats.in_flight += 1
+    stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+    result = Result(ok=False)
+    try:
+        async with client.stream("POST", path, json=payload) as response:
+            result.status = response.status_code
+            async for line in response.aiter_lines():
+                if result.ttfb is None:
+                    result.ttfb = time.perf_counter() - start
+                if not sse:
+                    continue
+                if line.startswith("data: [DONE]"):
+                    result.ok = True
+                elif line.startswith("data: [ERROR]"):
+                    break
+                elif line.startswith("id: "):
+                    result.frames += 1
+                elif line.startswith("data: "):
+                    # A frame coalesces several tokens
+                    result.tokens += len(line[6:].split())
+            if not sse:
+                result.ok = response.status_code == 200
+    except httpx.HTTPError:
+        result.ok = False
+    finally:
+        stats.in_flight -= 1
+        result.duration = time.perf_counter() - start
+    return result
+
+
+async def run_load(base_url: str, endpoint: str, concurrency: int, total: int) -> Stats:
+    stats = Stats()
+    request_fn = chat_stream_request if endpoint == "stream" else generate_days_request
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(120.0)
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def worker() -> None:
+            for index in counter:
+                stats.results.append(await request_fn(client, stats, index))
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    report(stats, endpoint, concurrency, elapsed)
+    return stats
+
+
+def report(stats: Stats, endpoint: str, concurrency: int, elapsed: float) -> None:
+    ok = [r for r in stats.results if r.ok]
+    ttfb = [r.ttfb * 1000 for r in ok if r.ttfb is not None]
+    durations = [r.duration * 1000 for r in ok]
+    frame_rates = [r.frames / r.duration for r in ok if r.duration > 0 and r.frames]
+    token_rates = [r.tokens / r.duration for r in ok if r.duration > 0 and r.tokens]
+
+    print(f"endpoint={endpoint} concurrency={concurrency} requests={len(stats.results)}")
+    print(f"  succeeded        {len(ok)} ({len(stats.results) - len(ok)} failed)")
+    print(f"  throughput       {len(ok) / elapsed:.1f} req/s over {elapsed:.1f}s")
+    print(f"  max concurrent   {stats.max_in_flight} streams (single worker)")
+    for name, values, unit in (("ttfb", ttfb, "ms"), ("duration", durations, "ms")):
+        print(
+            f"  {name:<16} p50={percentile(values, 50):.0f}{unit} "
+            f"p95={percentile(values, 95):.0f}{unit} p99={percentile(values, 99):.0f}{unit}"
+        )
+    for name, rates in (("tokens/s/stream", token_rates), ("frames/s/stream", frame_rates)):
+        if rates:
+            print(f"  {name:<16} mean={statistics.mean(rates):.1f} p50={percentile(rates, 50):.1f}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_in_process(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    from src.api.http_server import app
+    from src.integrations.fake_openai import FakeAsyncOpenAI
+    from src.integrations.openai_client import openai_client
+
+    openai_client.client = FakeAsyncOpenAI(
+        ttft_ms=args.ttft_ms,
+        token_latency_ms=args.token_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        tokens=args.tokens,
+    )
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    try:
+        await run_load(f"http://127.0.0.1:{port}", args.endpoint, args.concurrency, args.requests)
+    finally:
+        server.should_exit = True
+        await serve_task
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint", choices=["stream", "generate_days"], default="stream")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--url", help="Target a running server instead of serving in-process")
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_load(args.url, args.endpoint, args.concurrency, args.requests))
+    else:
+        asyncio.run(run_in_process(args))
+
+
+if __name__ == "__main__":
+    main()
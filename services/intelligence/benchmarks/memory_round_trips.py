@@ -0,0 +1,125 @@
+"""Benchmark Redis round trips for long-term memory store and search.
+
+Compares the original KEYS + per-key GET/SETEX access pattern with the
+batched chunk-index layer in MemoryManager. Requires a reachable Redis at
+settings.redis_url.
+
+    python -m benchmarks.memory_round_trips --chunks 200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.core.memory_manager import MemoryManager
+from src.settings import settings
+
+
+class RoundTripCounter:
+    """Counts network round trips issued through a redis.asyncio client."""
+
+    def __init__(self, client: Any):
+        self.count = 0
+        original_execute = client.execute_command
+        original_pipeline = client.pipeline
+
+        async def execute_command(*args: Any, **kwargs: Any) -> Any:
+            self.count += 1
+            return await original_execute(*args, **kwargs)
+
+        def pipeline(*args: Any, **kwargs: Any) -> Any:
+            pipe = original_pipeline(*args, **kwargs)
+            pipe_execute = pipe.execute
+
+            async def execute(*e_args: Any, **e_kwargs: Any) -> Any:
+                self.count += 1
+                return await pipe_execute(*e_args, **e_kwargs)
+
+            pipe.execute = execute
+            return pipe
+
+        client.execute_command = execute_command
+        client.pipeline = pipeline
+
+    def reset(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+
+async def legacy_store(manager: MemoryManager, child_id: str, messages: List[Dict[str, Any]],
+                       embeddings: List[List[float]]) -> None:
+    """The original store path: one awaited SETEX per chunk."""
+    for i, chunk in enumerate(manager.chunk_messages(messages)):
+        data = {"child_id": child_id, "chunk_id": i, "messages": chunk, "embedding": embeddings[i]}
+        await manager.redis_client.setex(
+            f"memory:{child_id}:chunk:{i}", settings.memory_ttl_days * 24 * 60 * 60, json.dumps(data)
+        )
+
+
+async def legacy_search(manager: MemoryManager, child_id: str) -> int:
+    """The original search path: KEYS followed by one GET per key."""
+    keys = await manager.redis_client.keys(f"memory:{child_id}:chunk:*")
+    loaded = 0
+    for key in keys:
+        if await manager.redis_client.get(key):
+            loaded += 1
+    return loaded
+
+
+async def run(chunks: int, dim: int) -> None:
+    manager = MemoryManager()
+    counter = RoundTripCounter(manager.redis_client)
+    rng = np.random.default_rng(0)
+
+    messages = [{"role": "user", "content": f"message {i}"} for i in range(chunks * 10)]
+    embeddings = rng.standard_normal((chunks, dim)).astype(np.float32).tolist()
+    query = embeddings[0]
+
+    results = []
+
+    legacy_child = f"bench-{uuid.uuid4()}"
+    start = time.perf_counter()
+    await legacy_store(manager, legacy_child, messages, embeddings)
+    results.append(("store (legacy SETEX loop)", counter.reset(), time.perf_counter() - start))
+    start = time.perf_counter()
+    await legacy_search(manager, legacy_child)
+    results.append(("search (legacy KEYS + GET)", counter.reset(), time.perf_counter() - start))
+
+    child = f"bench-{uuid.uuid4()}"
+    start = time.perf_counter()
+    await manager.store_long_term_memory(child, messages, embeddings)
+    results.append(("store (pipelined)", counter.reset(), time.perf_counter() - start))
+    manager.embedding_index.evict(child)
+    start = time.perf_counter()
+    await manager.search_long_term_memory(child, query)
+    results.append(("search, cold (ZRANGE + MGET)", counter.reset(), time.perf_counter() - start))
+    start = time.perf_counter()
+    await manager.search_long_term_memory(child, query)
+    results.append(("search, warm index", counter.reset(), time.perf_counter() - start))
+
+    print(f"{chunks} chunks, {dim}-dim embeddings")
+    print(f"{'operation':<32}{'round trips':>12}{'ms':>10}")
+    for name, trips, elapsed in results:
+        print(f"{name:<32}{trips:>12}{elapsed * 1000:>10.1f}")
+
+    for child_id in (legacy_child, child):
+        keys = [key async for key in manager.redis_client.scan_iter(match=f"memory:{child_id}:*")]
+        if keys:
+            await manager.redis_client.delete(*keys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+    asyncio.run(run(args.chunks, args.dim))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Microbenchmark for collecting streamed chunks into a response.
+
+Compares repeated string concatenation (`response += chunk`) with list
+joining, io.StringIO and ResponseAccumulator (which also tracks token
+timing), for responses of increasing length. Each chunk is appended from an
+object attribute, as in a long-lived generator, where CPython's in-place
+concatenation shortcut does not always apply.
+
+    python -m benchmarks.response_accumulator --tokens 100 1000 10000
+"""
+
+import argparse
+import io
+import time
+from typing import Callable, Dict, List
+
+from src.core.response_accumulator import ResponseAccumulator
+
+CHUNK = "word "
+
+
+class Holder:
+    """Keeps the running response on an attribute, like engine state."""
+    response = ""
+
+
+def concatenate(chunks: List[str]) -> str:
+    holder = Holder()
+    for chunk in chunks:
+        holder.response += chunk
+    return holder.response
+
+
+def list_join(chunks: List[str]) -> str:
+    parts: List[str] = []
+    for chunk in chunks:
+        parts.append(chunk)
+    return "".join(parts)
+
+
+def string_io(chunks: List[str]) -> str:
+    buffer = io.StringIO()
+    for chunk in chunks:
+        buffer.write(chunk)
+    return buffer.getvalue()
+
+
+def accumulator(chunks: List[str]) -> str:
+    response = ResponseAccumulator()
+    for chunk in chunks:
+        response.add(chunk)
+    return response.text()
+
+
+STRATEGIES: Dict[str, Callable[[List[str]], str]] = {
+    "concatenate (+=)": concatenate,
+    "list join": list_join,
+    "io.StringIO": string_io,
+    "ResponseAccumulator": accumulator,
+}
+
+
+def bench(fn: Callable[[List[str]], str], chunks: List[str], min_time: float) -> float:
+    """Best per-response time in microseconds over repeated runs."""
+    best = float("inf")
+    deadline = time.perf_counter() + min_time
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds per measurement")
+    args = parser.parse_args()
+
+    print(f"{'strategy':<22}" + "".join(f"{n:>14} tok" for n in args.tokens))
+    for name, fn in STRATEGIES.items():
+        row = []
+        for count in args.tokens:
+            chunks = [CHUNK] * count
+            assert fn(chunks) == CHUNK * count
+            row.append(bench(fn, chunks, args.min_time))
+        print(f"{name:<22}" + "".join(f"{us:>14.1f} us" for us in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark throughput of /chat/stream as server workers are added.
+
+For each worker count, starts `python -m src.api.serve --workers N` with the
+fake upstream at zero latency (so the run is CPU bound in the service, not
+waiting on OpenAI), drives it with the load_chat_stream client and reports
+requests per second, speedup over one worker and scaling efficiency. Needs
+Redis for memory and rate limits, like the service itself. Ideal scaling
+stops at the number of cores left over for the load generator.
+
+    python -m benchmarks.scaling --workers 1,2,4,8 --concurrency 200 --requests 4000
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import IO, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.load_chat_stream import free_port, percentile, run_load
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+
+
+def default_worker_counts() -> str:
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    return ",".join(str(n) for n in counts)
+
+
+def server_env(args: argparse.Namespace) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "load-test")
+    env.update({
+        "OPENAI_FAKE_UPSTREAM": "true",
+        "FAKE_UPSTREAM_TTFT_MS": str(args.ttft_ms),
+        "FAKE_UPSTREAM_TOKEN_LATENCY_MS": str(args.token_ms),
+        "FAKE_UPSTREAM_JITTER_MS": "0",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    return env
+
+
+def wait_for_health(server: subprocess.Popen, log: IO[bytes], port: int, timeout: float = 60.0) -> None:
+    started = time.perf_counter()
+    with httpx.Client() as client:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                log.seek(0)
+                raise RuntimeError(f"Server exited: {log.read().decode()[-2000:]}")
+            try:
+                if client.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.05)
+    raise RuntimeError(f"No /health response within {timeout}s")
+
+
+def measure(workers: int, args: argparse.Namespace) -> Tuple[float, List[float]]:
+    """Requests per second and successful TTFBs (ms) for one worker count."""
+    port = free_port()
+    # Server logs go to a file: an unread pipe would fill up and stall the workers
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "src.api.serve", "--workers", str(workers),
+         "--host", "127.0.0.1", "--port", str(port)],
+        cwd=SERVICE_DIR, env=server_env(args), stdout=subprocess.DEVNULL, stderr=log
+    )
+    try:
+        wait_for_health(server, log, port)
+        base_url = f"http://127.0.0.1:{port}"
+        # Warm every worker's lazy clients before timing
+        asyncio.run(run_load(base_url, "stream", args.concurrency, args.concurrency * 2))
+        started = time.perf_counter()
+        stats = asyncio.run(run_load(base_url, "stream", args.concurrency, args.requests))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+
+    ok = [r for r in stats.results if r.ok]
+    return len(ok) / elapsed, [r.ttfb * 1000 for r in ok if r.ttfb is not None]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default=default_worker_counts(), help="Comma-separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--ttft-ms", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    rows = []
+    for workers in [int(n) for n in args.workers.split(",")]:
+        throughput, ttfb = measure(workers, args)
+        rows.append((workers, throughput, ttfb))
+
+    base = rows[0][1] / rows[0][0]
+    print()
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'efficiency':>10} {'ttfb p50':>9} {'ttfb p95':>9}")
+    for workers, throughput, ttfb in rows:
+        speedup = throughput / rows[0][1]
+        efficiency = throughput / (base * workers)
+        print(
+            f"{workers:>7} {throughput:>9.1f} {speedup:>7.2f}x {efficiency:>9.0%} "
+            f"{percentile(ttfb, 50):>7.0f}ms {percentile(ttfb, 95):>7.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark session log entry size and encode/decode cost per serializer.
+
+Compares `json.dumps` with SessionSerializer formats, using single messages
+shaped like the entries append_short_term_memory writes to the session log,
+and zlib on top for reference: entries this small barely compress, which is
+why the serializer no longer does. Message texts are sampled from the
+transcripts in chat_sessions/ when present.
+
+    python -m benchmarks.session_encoding --messages 10000
+"""
+
+import argparse
+import json
+import random
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from src.core.session_codec import SessionSerializer, msgpack
+
+TRANSCRIPTS_DIR = Path(__file__).resolve().parents[3] / "chat_sessions"
+
+FALLBACK_TEXTS = [
+    "I love you Daddy",
+    "How are you daddy",
+    "What are we doing for Christmas?",
+    "I love you too, my little explorer! Tonight the stars are twinkling just for you.",
+    "That sounds like a wonderful adventure, buddy. Tell me all about the snowman you built!",
+]
+
+
+def load_texts() -> List[str]:
+    texts = []
+    for path in sorted(TRANSCRIPTS_DIR.glob("*.json")):
+        for entry in json.loads(path.read_text(encoding="utf-8")):
+            content = entry.get("message", {}).get("content")
+            if content:
+                texts.append(content)
+    return texts or FALLBACK_TEXTS
+
+
+def build_messages(count: int, texts: List[str]) -> List[Dict[str, Any]]:
+    rng = random.Random(0)
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": " ".join(rng.choice(texts) for _ in range(1 if i % 2 == 0 else 3)),
+            "token_count": rng.randint(8, 80),
+        }
+        for i in range(count)
+    ]
+
+
+def measure(name: str, dumps: Callable[[Dict[str, Any]], bytes],
+            loads: Callable[[bytes], Any], messages: List[Dict[str, Any]]) -> None:
+    start = time.perf_counter()
+    encoded = [dumps(message) for message in messages]
+    encode_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for raw in encoded:
+        loads(raw)
+    decode_s = time.perf_counter() - start
+
+    count = len(messages)
+    size = sum(len(raw) for raw in encoded) / count
+    print(f"{name:<22}{size:>12.0f}{encode_s / count * 1e6:>14.1f}{decode_s / count * 1e6:>14.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages, load_texts())
+
+    print(f"{args.messages} messages")
+    print(f"{'encoding':<22}{'bytes/msg':>12}{'encode us':>14}{'decode us':>14}")
+    measure("json.dumps", lambda d: json.dumps(d).encode("utf-8"), json.loads, messages)
+    measure(
+        "json.dumps+zlib",
+        lambda d: zlib.compress(json.dumps(d).encode("utf-8")),
+        lambda raw: json.loads(zlib.decompress(raw)),
+        messages
+    )
+
+    formats = ["json"] + (["msgpack"] if msgpack is not None else [])
+    for payload_format in formats:
+        serializer = SessionSerializer(format=payload_format)
+        measure(payload_format, serializer.dumps, serializer.loads, messages)
+
+if __name__ == "__main__":
+    main()
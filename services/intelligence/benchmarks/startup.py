@@ -0,0 +1,121 @@
+"""Benchmark cold start: app import time and time to the first /health response.
+
+Each run uses a fresh interpreter. The server is started without OpenAI
+credentials to check that startup does not build any clients. Budgets make
+the run exit non-zero when exceeded, so CI can track regressions.
+
+    python -m benchmarks.startup --runs 5 --max-import-ms 800 --max-health-ms 2500
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import src.api.http_server; "
+    "print(time.perf_counter() - start)"
+)
+
+# Heavy modules that importing the app must not pull in
+DEFERRED_MODULES = ("openai", "numpy", "redis", "src.settings")
+DEFERRED_SNIPPET = (
+    "import sys; import src.api.http_server; "
+    f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+)
+
+
+def clean_env() -> Dict[str, str]:
+    env = {k: v for k, v in os.environ.items() if not k.startswith("OPENAI_")}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=SERVICE_DIR, env=clean_env(), check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def eager_imports() -> List[str]:
+    output = subprocess.run(
+        [sys.executable, "-c", DEFERRED_SNIPPET],
+        cwd=SERVICE_DIR, env=clean_env(), check=True, capture_output=True, text=True
+    ).stdout
+    return [name for name in output.strip().split(",") if name]
+
+
+def measure_first_health(timeout: float = 30.0) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.api.http_server:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+        ],
+        cwd=SERVICE_DIR, env=clean_env(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        with httpx.Client() as client:
+            while time.perf_counter() - started < timeout:
+                if server.poll() is not None:
+                    raise RuntimeError(f"Server exited: {server.stderr.read().decode()[-2000:]}")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError(f"No /health response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(name: str, samples: List[float], budget_ms: float) -> bool:
+    ms = [s * 1000 for s in samples]
+    median = statistics.median(ms)
+    within = not budget_ms or median <= budget_ms
+    budget = f" budget={budget_ms:.0f}ms {'ok' if within else 'EXCEEDED'}" if budget_ms else ""
+    print(f"{name:<18} median={median:8.1f}ms min={min(ms):8.1f}ms max={max(ms):8.1f}ms{budget}")
+    return within
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=0, help="Fail if the median import exceeds this")
+    parser.add_argument("--max-health-ms", type=float, default=0, help="Fail if the median first /health exceeds this")
+    args = parser.parse_args()
+
+    eager = eager_imports()
+    print(f"Deferred modules imported by the app: {', '.join(eager) or 'none'}")
+
+    imports = [measure_import() for _ in range(args.runs)]
+    healths = [measure_first_health() for _ in range(args.runs)]
+
+    ok = report("import", imports, args.max_import_ms)
+    ok = report("first /health", healths, args.max_health_ms) and ok
+    if eager or not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
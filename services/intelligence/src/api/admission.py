@@ -0,0 +1,234 @@
+"""Admission control and rate limiting for chat streams."""
+
+import asyncio
+import math
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple
+import structlog
+
+from ..core import metrics
+
+logger = structlog.get_logger(__name__)
+
+admission_rejections = metrics.registry.counter(
+    "admission_rejections_total",
+    "Requests rejected with 429 by reason",
+    labelnames=("reason",)
+)
+admission_waiting = metrics.registry.gauge(
+    "admission_waiting",
+    "Requests waiting for a stream slot"
+)
+
+
+class AdmissionRejected(Exception):
+    """The request should be rejected with 429 Too Many Requests."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value in whole seconds (at least 1)."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class AdmissionTicket:
+    """A held stream slot; releasing it more than once is a no-op."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release()
+
+
+class AdmissionController:
+    """Global cap on concurrent streams with a bounded, time-limited wait queue.
+
+    Requests beyond `max_concurrent` wait for a slot, but only `max_waiting`
+    may wait at once and none longer than `wait_timeout`; everything else is
+    rejected immediately so overload shows up as fast 429s rather than
+    unbounded latency. A released slot is handed straight to the oldest
+    waiter, so it cannot sit idle while others keep blocking.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int, wait_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.active = 0
+        self.waiting = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    async def acquire(self) -> AdmissionTicket:
+        """Take a stream slot, waiting briefly if needed, or raise AdmissionRejected."""
+        if self.active < self.max_concurrent and self.waiting == 0:
+            self.active += 1
+            return AdmissionTicket(self)
+
+        if self.waiting >= self.max_waiting:
+            admission_rejections.inc(reason="queue_full")
+            raise AdmissionRejected("queue_full", self.wait_timeout)
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.waiting += 1
+        admission_waiting.inc()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.wait_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the wait timed out or was cancelled: pass it on
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                admission_rejections.inc(reason="queue_timeout")
+                raise AdmissionRejected("queue_timeout", self.wait_timeout)
+            raise
+        finally:
+            self.waiting -= 1
+            admission_waiting.dec()
+        return AdmissionTicket(self)
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # The slot passes to the waiter; active is unchanged
+                return
+        self.active -= 1
+
+
+# Atomic token buckets: refill each bucket by elapsed time, then take `cost`
+# tokens from every bucket only if all of them have enough, so a request
+# rejected by one limit spends nothing from the others. Time comes from the
+# Redis server so workers with skewed clocks agree (writes after TIME need
+# Redis 5+, which replicates script effects rather than the script).
+# KEYS: bucket keys; ARGV: cost, then capacity and refill per ms for each key.
+# Returns {allowed (0/1), milliseconds until enough tokens, index of the first
+# limiting bucket (1-based, 0 if allowed)}.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now_ms = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local cost = tonumber(ARGV[1])
+
+local tokens = {}
+local allowed = 1
+local wait_ms = 0
+local limiting = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local refill_per_ms = tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now_ms
+    tokens[i] = math.min(capacity, available + math.max(0, now_ms - ts) * refill_per_ms)
+    if tokens[i] < cost then
+        local wait = math.ceil((cost - tokens[i]) / refill_per_ms)
+        if allowed == 1 or wait > wait_ms then
+            wait_ms = wait
+            limiting = i
+        end
+        allowed = 0
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local refill_per_ms = tonumber(ARGV[2 * i + 1])
+    if allowed == 1 then
+        tokens[i] = tokens[i] - cost
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens[i]), 'ts', tostring(now_ms))
+    redis.call('PEXPIRE', key, math.ceil(capacity / refill_per_ms) + 1000)
+end
+return {allowed, wait_ms, limiting}
+"""
+
+
+class TokenBucket:
+    """A named token bucket limit: `capacity` burst, refilled per minute."""
+
+    def __init__(self, name: str, capacity: int, refill_per_minute: float):
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_ms = refill_per_minute / 60000
+
+    def key(self, identity: str) -> str:
+        return f"ratelimit:{self.name}:{identity}"
+
+
+class RedisRateLimiter:
+    """Token bucket rate limits whose state lives in Redis, shared by all workers."""
+
+    def __init__(self, redis_client: Any):
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def consume(self, limits: List[Tuple[TokenBucket, str]], cost: int = 1) -> None:
+        """Take tokens from each (bucket, identity) at once, or raise AdmissionRejected.
+
+        Fails open if Redis is unavailable: rate limiting is protective, not
+        worth failing chats over.
+        """
+        args: List[Any] = [cost]
+        for bucket, _ in limits:
+            args.extend([bucket.capacity, bucket.refill_per_ms])
+        try:
+            metrics.redis_round_trips.inc(operation="rate_limit")
+            allowed, wait_ms, limiting = await self._script(
+                keys=[bucket.key(identity) for bucket, identity in limits], args=args
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return
+
+        if not int(allowed):
+            name = limits[int(limiting) - 1][0].name
+            admission_rejections.inc(reason=f"{name}_rate")
+            raise AdmissionRejected(f"{name}_rate", int(wait_ms) / 1000)
+
+
+class StreamAdmission:
+    """Per-child and per-session rate limits plus the global stream cap."""
+
+    def __init__(self, redis_client: Any, settings: Any):
+        self.controller = AdmissionController(
+            max_concurrent=settings.stream_max_concurrent,
+            max_waiting=settings.stream_max_waiting,
+            wait_timeout=settings.stream_wait_timeout
+        )
+        self.rate_limiter = RedisRateLimiter(redis_client)
+        self.child_bucket = TokenBucket(
+            "child",
+            capacity=settings.child_rate_burst,
+            refill_per_minute=settings.child_rate_per_minute
+        )
+        self.session_bucket = TokenBucket(
+            "session",
+            capacity=settings.session_rate_burst,
+            refill_per_minute=settings.session_rate_per_minute
+        )
+
+    async def admit(self, child_id: str, session_id: Optional[str]) -> AdmissionTicket:
+        """Take a stream slot, then check the child and session rate limits together.
+
+        The slot comes first so a request that times out in the queue has not
+        spent any rate-limit budget.
+        """
+        limits = [(self.child_bucket, child_id)]
+        if session_id:
+            limits.append((self.session_bucket, session_id))
+        ticket = await self.controller.acquire()
+        try:
+            await self.rate_limiter.consume(limits)
+        except BaseException:
+            ticket.release()
+            raise
+        return ticket
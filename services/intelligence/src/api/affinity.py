@@ -0,0 +1,135 @@
+"""Consistent-hash affinity of children to workers."""
+
+import asyncio
+import bisect
+import hashlib
+import time
+from typing import Any, Iterable, List, Optional, Tuple
+import structlog
+from starlette.requests import Request
+from starlette.responses import RedirectResponse, Response
+
+from ..core import metrics
+
+logger = structlog.get_logger(__name__)
+
+# Marks a redirected request so it is never redirected twice
+HOP_PARAM = "affinity_hop"
+
+affinity_requests = metrics.registry.counter(
+    "child_affinity_requests_total",
+    "Requests by whether this worker owns the child (local, miss, redirected)",
+    labelnames=("result",)
+)
+
+
+def _point(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes.
+
+    Adding or removing one of n nodes moves only about 1/n of the keys, so
+    most children keep their worker, and its warm caches, as workers come
+    and go.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100):
+        self.nodes = sorted(set(nodes))
+        ring: List[Tuple[int, str]] = sorted(
+            (_point(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _point(key)) % len(self._points)
+        return self._owners[index]
+
+
+class ChildAffinity:
+    """Tracks live workers in Redis and routes each child to its owner.
+
+    Every worker heartbeats its advertised URL into a sorted set; workers
+    missing three heartbeats drop out of the ring. Per-child state (the
+    embedding index, the session history cache) then stays hot on one worker.
+    In "redirect" mode a request for a child owned elsewhere gets a 307 to
+    the owner, which HTTP clients follow with the same method and body; in
+    "report" mode it is served locally and counted.
+    """
+
+    MEMBERS_KEY = "cluster:workers"
+
+    def __init__(
+        self,
+        redis_client: Any,
+        advertise_url: str,
+        mode: str = "off",
+        heartbeat_interval: float = 5.0
+    ):
+        self.redis_client = redis_client
+        self.advertise_url = advertise_url.rstrip("/")
+        self.mode = mode if advertise_url else "off"
+        self.heartbeat_interval = heartbeat_interval
+        self.ring = HashRing()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.mode != "off" and self._task is None:
+            self._task = asyncio.create_task(self._heartbeat())
+            logger.info(f"Child affinity ({self.mode}) started for {self.advertise_url}")
+
+    async def stop(self) -> None:
+        """Leave the ring so the remaining workers take over this worker's children."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            await self.redis_client.zrem(self.MEMBERS_KEY, self.advertise_url)
+        except Exception as e:
+            logger.warning(f"Failed to leave the worker ring: {e}")
+
+    def owner(self, child_id: str) -> Optional[str]:
+        return self.ring.node_for(child_id)
+
+    def route(self, child_id: str, request: Request) -> Optional[Response]:
+        """A redirect to the child's owner, or None to serve the request here."""
+        if self.mode == "off":
+            return None
+        owner = self.owner(child_id)
+        if owner is None or owner == self.advertise_url:
+            affinity_requests.inc(result="local")
+            return None
+        if self.mode != "redirect" or HOP_PARAM in request.query_params:
+            # Already redirected once: serve here rather than bounce while rings disagree
+            affinity_requests.inc(result="miss")
+            return None
+
+        affinity_requests.inc(result="redirected")
+        query = f"{request.url.query}&{HOP_PARAM}=1" if request.url.query else f"{HOP_PARAM}=1"
+        return RedirectResponse(
+            f"{owner}{request.url.path}?{query}", status_code=307, headers={"X-Affinity-Owner": owner}
+        )
+
+    async def _heartbeat(self) -> None:
+        stale_after = self.heartbeat_interval * 3
+        while True:
+            try:
+                now = time.time()
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.zadd(self.MEMBERS_KEY, {self.advertise_url: now})
+                pipe.zremrangebyscore(self.MEMBERS_KEY, "-inf", now - stale_after)
+                pipe.zrange(self.MEMBERS_KEY, 0, -1)
+                members = (await pipe.execute())[-1]
+                if sorted(members) != self.ring.nodes:
+                    self.ring = HashRing(members)
+                    logger.info(f"Worker ring changed: {len(members)} workers")
+            except Exception as e:
+                # Keep routing with the last known ring
+                logger.warning(f"Worker heartbeat failed: {e}")
+            await asyncio.sleep(self.heartbeat_interval)
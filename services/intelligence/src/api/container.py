@@ -0,0 +1,169 @@
+"""Lazily created service dependencies for the HTTP app."""
+
+import asyncio
+from functools import cached_property
+from importlib import import_module
+from typing import TYPE_CHECKING, Optional
+import structlog
+
+if TYPE_CHECKING:
+    from fastapi import Request, Response
+
+    from ..core.batch_jobs import BatchJobManager
+    from ..core.cache_invalidation import CacheInvalidationBus
+    from ..core.chat_engine import ChatEngine
+    from ..core.memory_compaction import MemoryCompactor
+    from ..core.memory_manager import MemoryManager
+    from ..integrations.openai_client import OpenAIClient
+    from ..settings import Settings
+    from .admission import StreamAdmission
+    from .affinity import ChildAffinity
+
+logger = structlog.get_logger(__name__)
+
+
+class ServiceContainer:
+    """Builds each dependency on first use and closes what was built on shutdown.
+
+    Imports of the heavy modules (openai, numpy, redis) are deferred to the
+    first access, so importing the app and answering /health stay fast and
+    need no credentials. The modules' global instances are reused, so code
+    outside the HTTP app (tools, benchmarks) shares the same clients.
+    """
+
+    @cached_property
+    def settings(self) -> "Settings":
+        from ..settings import settings
+        return settings
+
+    @cached_property
+    def memory_manager(self) -> "MemoryManager":
+        from ..core.memory_manager import memory_manager
+        return memory_manager
+
+    @cached_property
+    def openai_client(self) -> "OpenAIClient":
+        from ..integrations.openai_client import openai_client
+        return openai_client
+
+    @cached_property
+    def chat_engine(self) -> "ChatEngine":
+        from ..core.chat_engine import chat_engine
+        # The engine uses these globals; resolve them so shutdown closes them
+        self.memory_manager
+        self.openai_client
+        chat_engine.persistence_queue.start()
+        return chat_engine
+
+    @cached_property
+    def stream_admission(self) -> "StreamAdmission":
+        from .admission import StreamAdmission
+        return StreamAdmission(self.memory_manager.redis_client, self.settings)
+
+    @cached_property
+    def child_affinity(self) -> "ChildAffinity":
+        from .affinity import ChildAffinity
+        affinity = ChildAffinity(
+            self.memory_manager.redis_client,
+            advertise_url=self.settings.affinity_advertise_url,
+            mode=self.settings.affinity_mode,
+            heartbeat_interval=self.settings.affinity_heartbeat_seconds
+        )
+        affinity.start()
+        return affinity
+
+    @property
+    def affinity_enabled(self) -> bool:
+        """Whether child affinity is configured: a mode other than "off" and this worker's URL."""
+        return self.settings.affinity_mode != "off" and bool(self.settings.affinity_advertise_url)
+
+    def route_child(self, child_id: str, request: "Request") -> Optional["Response"]:
+        """A redirect to the worker owning the child, or None to serve it here.
+
+        With affinity off this touches neither the affinity ring nor Redis.
+        """
+        if not self.affinity_enabled:
+            return None
+        return self.child_affinity.route(child_id, request)
+
+    @cached_property
+    def invalidation_bus(self) -> "CacheInvalidationBus":
+        from ..core.cache_invalidation import invalidation_bus
+        invalidation_bus.start()
+        return invalidation_bus
+
+    @cached_property
+    def batch_jobs(self) -> "BatchJobManager":
+        from ..core.batch_jobs import BatchJobManager
+        manager = BatchJobManager(
+            self.chat_engine,
+            self.memory_manager.redis_client,
+            workers=self.settings.batch_workers,
+            upstream_concurrency=self.settings.batch_upstream_concurrency,
+            lease_seconds=self.settings.batch_lease_seconds,
+            job_ttl_seconds=self.settings.batch_job_ttl_seconds
+        )
+        manager.start()
+        return manager
+
+    @cached_property
+    def memory_compactor(self) -> "MemoryCompactor":
+        from ..core.memory_compaction import MemoryCompactor
+        compactor = MemoryCompactor(
+            self.memory_manager,
+            self.openai_client,
+            interval_seconds=self.settings.memory_compaction_interval_seconds,
+            min_age_seconds=self.settings.memory_compaction_min_age_days * 24 * 60 * 60,
+            max_access_count=self.settings.memory_compaction_max_access,
+            group_size=self.settings.memory_compaction_group_size,
+            max_chunks=self.settings.memory_max_chunks_per_child,
+            summary_max_tokens=self.settings.memory_summary_max_tokens
+        )
+        compactor.start()
+        return compactor
+
+    async def start_background_work(self) -> None:
+        """Start background work: batch jobs (so interrupted ones resume), memory
+        compaction, and with several workers the worker ring and cache invalidation.
+
+        The heavy imports run in a thread so the server answers requests in
+        the meantime. Without configuration (e.g. no credentials) this is
+        logged and skipped.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            for module in ("..core.chat_engine", "..core.batch_jobs"):
+                await loop.run_in_executor(None, import_module, module, __package__)
+            if self.settings.cache_invalidation_enabled:
+                self.invalidation_bus
+            if self.affinity_enabled:
+                self.child_affinity
+            self.batch_jobs
+            if self.settings.memory_compaction_enabled:
+                self.memory_compactor
+        except Exception as e:
+            logger.warning(f"Background work not started: {e}")
+
+    def is_created(self, name: str) -> bool:
+        """Whether a dependency has been built yet."""
+        return name in self.__dict__
+
+    async def aclose(self) -> None:
+        """Drain background work, then close the clients that were created."""
+        if self.is_created("batch_jobs"):
+            await self.batch_jobs.stop()
+        if self.is_created("memory_compactor"):
+            await self.memory_compactor.stop()
+        if self.is_created("child_affinity"):
+            await self.child_affinity.stop()
+        if self.is_created("invalidation_bus"):
+            await self.invalidation_bus.stop()
+        if self.is_created("chat_engine"):
+            await self.chat_engine.persistence_queue.stop(
+                timeout=self.settings.persistence_drain_timeout
+            )
+        if self.is_created("openai_client"):
+            await self.openai_client.close()
+        if self.is_created("memory_manager"):
+            await self.memory_manager.close()
+        logger.info("Service dependencies closed")
@@ -1,17 +1,30 @@
 """FastAPI server for the Advent Intelligence service."""
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Union
+
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 import structlog
 
-from ..settings import settings
-from ..core.chat_engine import chat_engine
+from ..core import metrics
+from .admission import AdmissionRejected
+from .container import ServiceContainer
+from .sse import SSEWriter
 from .schemas import (
     ChatStreamRequest,
     ChatStreamResponse,
+    SessionWarmRequest,
+    SessionWarmResponse,
     GenerateDaysRequest,
     GenerateDaysResponse,
+    BatchGenerateDaysRequest,
+    BatchItemResult,
+    BatchJobStatus,
+    DailyMessage,
     ErrorResponse
 )
 
@@ -36,11 +49,37 @@ structlog.configure(
 
 logger = structlog.get_logger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create the dependency container on startup and close it on shutdown.
+
+    Clients are built on first use, so startup does no I/O and needs no
+    credentials. Interrupted batch jobs resume in the background.
+    """
+    logger.info("Starting Advent Intelligence Service")
+    container = app.state.container = ServiceContainer()
+    background = asyncio.create_task(container.start_background_work())
+    try:
+        yield
+    finally:
+        logger.info("Shutting down Advent Intelligence Service")
+        await background
+        await container.aclose()
+
+
+def get_container(request: Request) -> ServiceContainer:
+    """Dependency returning the app's service container."""
+    container: ServiceContainer = request.app.state.container
+    return container
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Advent Intelligence Service",
     description="AI-powered chat and content generation for Advent Calendar",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -54,14 +93,68 @@ app.add_middleware(
 
 
 @app.get("/health")
-async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy", "service": "advent-intelligence"}
+async def health_check(container: ServiceContainer = Depends(get_container)) -> Dict[str, Any]:
+    """Health check endpoint; reports only on dependencies already in use."""
+    health: Dict[str, Any] = {
+        "status": "healthy",
+        "service": "advent-intelligence",
+    }
+    if container.is_created("chat_engine"):
+        health["persistence_queue"] = container.chat_engine.persistence_queue.metrics()
+        health["response_cache"] = container.chat_engine.response_cache.metrics()
+    if container.is_created("stream_admission"):
+        health["streams"] = {
+            "active": container.stream_admission.controller.active,
+            "waiting": container.stream_admission.controller.waiting,
+        }
+    return health
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    """Prometheus metrics: chat stage latencies, in-flight streams, Redis round trips.
+
+    Counts are per process: with several workers this is the answering worker only.
+    """
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @app.post("/chat/stream", response_model=ChatStreamResponse)
-async def chat_stream(request: ChatStreamRequest):
-    """Stream a chat response for the given conversation."""
+async def chat_stream(
+    request: ChatStreamRequest,
+    http_request: Request,
+    container: ServiceContainer = Depends(get_container)
+) -> Response:
+    """Stream a chat response for the given conversation.
+
+    Rejected with 429 and Retry-After when the child or session is over its
+    rate limit, or when no stream slot frees up in time. With child affinity
+    in redirect mode, children owned by another worker get a 307 to it.
+    """
+    redirect = container.route_child(request.child_id, http_request)
+    if redirect is not None:
+        return redirect
+
+    try:
+        ticket = await container.stream_admission.admit(request.child_id, request.session_id)
+    except AdmissionRejected as e:
+        logger.warning(
+            "Chat stream rejected",
+            child_id=request.child_id,
+            session_id=request.session_id,
+            reason=e.reason
+        )
+        return JSONResponse(
+            status_code=429,
+            content=ErrorResponse(error="Too many requests", details={"reason": e.reason}).model_dump(),
+            headers={"Retry-After": e.retry_after_header}
+        )
+
+    chat_engine = container.chat_engine
+    settings = container.settings
 
     try:
         logger.info(
@@ -72,43 +165,102 @@ async def chat_stream(request: ChatStreamRequest):
             message_length=len(request.message)
         )
 
+        writer = SSEWriter(
+            http_request,
+            flush_interval=settings.sse_flush_interval_ms / 1000,
+            max_frame_bytes=settings.sse_max_frame_bytes,
+            keepalive_interval=settings.sse_keepalive_seconds
+        )
+
         # Generate streaming response
-        async def generate_response():
+        async def generate_response() -> AsyncIterator[str]:
+            metrics.streams_in_flight.inc()
             try:
-                async for chunk in chat_engine.generate_response(
+                async for frame in writer.stream(chat_engine.generate_response(
                     child_id=request.child_id,
                     session_id=request.session_id,
                     user_message=request.message,
                     persona=request.persona,
                     child_name="Child",  # TODO: Get from backend API
                     custom_prompt=request.custom_prompt,
-                    conversation_history=request.conversation_history
-                ):
-                    yield f"data: {chunk}\n\n"
+                    conversation_history=[
+                        message.model_dump(exclude_none=True)
+                        for message in request.conversation_history
+                    ]
+                )):
+                    yield frame
 
                 # Send completion signal
-                yield "data: [DONE]\n\n"
+                if not writer.disconnected:
+                    yield writer.event("[DONE]")
 
             except Exception as e:
                 logger.error("Streaming error", error=str(e))
-                yield f"data: [ERROR] {str(e)}\n\n"
+                yield writer.event(f"[ERROR] {str(e)}")
+
+            finally:
+                metrics.streams_in_flight.dec()
+                ticket.release()
 
+        # The background task also releases the slot if the client goes away
+        # before the stream body starts
         return StreamingResponse(
             generate_response(),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
-            }
+                "X-Accel-Buffering": "no",  # Keep reverse proxies from buffering frames
+            },
+            background=BackgroundTask(ticket.release)
         )
 
     except Exception as e:
+        ticket.release()
         logger.error("Chat stream failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/session/{session_id}/warm", response_model=SessionWarmResponse, status_code=202)
+async def warm_session(
+    session_id: str,
+    request: SessionWarmRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    container: ServiceContainer = Depends(get_container)
+) -> Union[Response, SessionWarmResponse]:
+    """Preload a session's history, persona prompt and memory index; call when the chat opens.
+
+    Returns immediately. A chat turn that arrives mid warm-up shares the
+    loads already in flight instead of repeating them.
+    """
+    redirect = container.route_child(request.child_id, http_request)
+    if redirect is not None:
+        return redirect
+
+    chat_engine = container.chat_engine
+
+    async def warm() -> None:
+        try:
+            await chat_engine.warm_session(
+                child_id=request.child_id,
+                session_id=session_id,
+                persona=request.persona,
+                child_name="Child",  # TODO: Get from backend API
+                custom_prompt=request.custom_prompt
+            )
+        except Exception as e:
+            logger.warning("Session warm-up failed", session_id=session_id, error=str(e))
+
+    background_tasks.add_task(warm)
+    return SessionWarmResponse(session_id=session_id)
+
+
 @app.post("/chat/generate_days", response_model=GenerateDaysResponse)
-async def generate_days(request: GenerateDaysRequest):
+async def generate_days(
+    request: GenerateDaysRequest,
+    container: ServiceContainer = Depends(get_container)
+) -> GenerateDaysResponse:
     """Generate 24 personalized daily messages for the advent calendar."""
 
     try:
@@ -119,12 +271,13 @@ async def generate_days(request: GenerateDaysRequest):
             persona=request.persona
         )
 
-        messages = await chat_engine.generate_daily_messages(
+        messages, _ = await container.chat_engine.generate_daily_messages(
             child_id=request.child_id,
             child_name=request.child_name,
             persona=request.persona,
             custom_prompt=request.custom_prompt,
-            theme=request.theme
+            theme=request.theme,
+            bypass_cache=request.regenerate
         )
 
         return GenerateDaysResponse(messages=messages)
@@ -134,25 +287,114 @@ async def generate_days(request: GenerateDaysRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize service on startup."""
-    logger.info("Starting Advent Intelligence Service")
+@app.post("/chat/generate_days/stream")
+async def generate_days_stream(
+    request: GenerateDaysRequest,
+    container: ServiceContainer = Depends(get_container)
+) -> StreamingResponse:
+    """Stream daily messages as NDJSON, one DailyMessage per line as each is ready."""
+
+    logger.info(
+        "Generate days stream request",
+        child_id=request.child_id,
+        child_name=request.child_name,
+        persona=request.persona
+    )
+
+    async def generate_lines() -> AsyncIterator[str]:
+        try:
+            async for message in container.chat_engine.stream_daily_messages(
+                child_id=request.child_id,
+                child_name=request.child_name,
+                persona=request.persona,
+                custom_prompt=request.custom_prompt,
+                theme=request.theme
+            ):
+                yield DailyMessage(**message).model_dump_json() + "\n"
+
+        except Exception as e:
+            logger.error("Generate days stream failed", error=str(e))
+            yield ErrorResponse(error=str(e)).model_dump_json() + "\n"
+
+    return StreamingResponse(
+        generate_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.post("/chat/generate_days/batch", response_model=BatchJobStatus, status_code=202)
+async def generate_days_batch(
+    request: BatchGenerateDaysRequest,
+    container: ServiceContainer = Depends(get_container)
+) -> Optional[Dict[str, Any]]:
+    """Queue calendar generation for many children; poll or stream the job for results."""
+
+    max_requests = container.settings.batch_max_requests
+    if len(request.requests) > max_requests:
+        raise HTTPException(status_code=413, detail=f"At most {max_requests} requests per batch")
+
+    logger.info(
+        "Generate days batch request",
+        account_id=request.account_id,
+        children=len(request.requests)
+    )
+
+    try:
+        job_id = await container.batch_jobs.submit(
+            request.account_id,
+            [item.model_dump(mode="json") for item in request.requests]
+        )
+        return await container.batch_jobs.status(job_id)
+
+    except Exception as e:
+        logger.error("Generate days batch failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/chat/generate_days/batch/{job_id}", response_model=BatchJobStatus)
+async def generate_days_batch_status(
+    job_id: str,
+    container: ServiceContainer = Depends(get_container)
+) -> Dict[str, Any]:
+    """Batch job progress with the per-child results finished so far."""
 
+    job = await container.batch_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch job {job_id}")
+    return job
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Clean up on shutdown."""
-    logger.info("Shutting down Advent Intelligence Service")
+
+@app.get("/chat/generate_days/batch/{job_id}/stream")
+async def generate_days_batch_stream(
+    job_id: str,
+    container: ServiceContainer = Depends(get_container)
+) -> StreamingResponse:
+    """Stream per-child results as NDJSON, one BatchItemResult per line, until the job finishes."""
+
+    batch_jobs = container.batch_jobs
+    if await batch_jobs.status(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch job {job_id}")
+
+    async def generate_lines() -> AsyncIterator[str]:
+        try:
+            async for result in batch_jobs.stream(
+                job_id, poll_interval=container.settings.batch_stream_poll_interval
+            ):
+                yield BatchItemResult(**result).model_dump_json() + "\n"
+
+        except Exception as e:
+            logger.error("Generate days batch stream failed", error=str(e))
+            yield ErrorResponse(error=str(e)).model_dump_json() + "\n"
+
+    return StreamingResponse(
+        generate_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
 
 
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(
-        "http_server:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.debug,
-        log_level=settings.log_level.lower(),
-    )
\ No newline at end of file
+    from .serve import main
+
+    main()
\ No newline at end of file
@@ -35,6 +35,19 @@ class ChatStreamResponse(BaseModel):
     response: str = Field(..., description="AI response content")
 
 
+class SessionWarmRequest(BaseModel):
+    """Request to preload a chat session's context when the chat opens."""
+    child_id: str = Field(..., description="Child identifier")
+    persona: PersonaType = Field(..., description="Chat persona type")
+    custom_prompt: Optional[str] = Field(None, description="Custom prompt for custom persona")
+
+
+class SessionWarmResponse(BaseModel):
+    """Acknowledgement of a session warm-up."""
+    session_id: str = Field(..., description="Chat session identifier")
+    status: str = Field("warming", description="Warm-up runs after the response is sent")
+
+
 class GenerateDaysRequest(BaseModel):
     """Request for generating 24 daily messages."""
     child_id: str = Field(..., description="Child identifier")
@@ -42,6 +55,7 @@ class GenerateDaysRequest(BaseModel):
     persona: PersonaType = Field(..., description="Chat persona type")
     custom_prompt: Optional[str] = Field(None, description="Custom prompt for custom persona")
     theme: str = Field(..., description="Calendar theme")
+    regenerate: bool = Field(False, description="Bypass cached results and generate fresh messages")
 
 
 class DailyMessage(BaseModel):
@@ -57,6 +71,33 @@ class GenerateDaysResponse(BaseModel):
     messages: List[DailyMessage] = Field(..., description="Generated daily messages")
 
 
+class BatchGenerateDaysRequest(BaseModel):
+    """Request for generating calendars for many children in one job."""
+    account_id: str = Field(..., description="Account (school or family) the children belong to")
+    requests: List[GenerateDaysRequest] = Field(..., min_length=1, description="One request per child")
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one child's calendar in a batch job."""
+    index: int = Field(..., description="Position of the request in the batch")
+    child_id: str = Field(..., description="Child identifier")
+    status: str = Field(..., description="'completed', 'degraded' (some placeholder days) or 'failed'")
+    messages: Optional[List[DailyMessage]] = Field(None, description="Generated daily messages")
+    error: Optional[str] = Field(None, description="Failure reason")
+
+
+class BatchJobStatus(BaseModel):
+    """Progress of a batch generation job."""
+    job_id: str = Field(..., description="Batch job identifier")
+    account_id: str = Field(..., description="Account the job belongs to")
+    status: str = Field(..., description="'running' or 'completed'")
+    total: int = Field(..., description="Number of children in the job")
+    completed: int = Field(..., description="Children with generated calendars")
+    degraded: int = Field(0, description="Children given placeholder days for some or all of the calendar")
+    failed: int = Field(..., description="Children whose generation failed")
+    results: List[BatchItemResult] = Field(default_factory=list, description="Results so far, by index")
+
+
 class ErrorResponse(BaseModel):
     """Error response."""
     error: str = Field(..., description="Error message")
@@ -0,0 +1,157 @@
+"""Run the HTTP service with one or more worker processes.
+
+Three layouts:
+
+  - uvicorn (default): `workers` processes sharing one port; the kernel
+    spreads connections across them.
+  - gunicorn: the same, with gunicorn supervising UvicornWorker processes
+    (restarts, graceful reloads, max-requests recycling). Needs the `server`
+    extra.
+  - worker ports: each worker listens on its own port (port + 1 + i) and
+    advertises it, so child affinity can send each child to one worker and
+    keep its in-memory state hot. Put a proxy that hashes the X-Child-Id
+    header in front, or let the workers 307-redirect to the owner
+    (AFFINITY_MODE=redirect, the default in this layout).
+
+With more than one worker, cache invalidation over Redis pub/sub is turned
+on so per-process caches drop entries another worker changed.
+
+Metrics live in each worker's memory, so a /metrics scrape reports only the
+worker that answered it. Scrape each worker port, or sum over several
+scrapes, when running more than one.
+
+    python -m src.api.serve --workers 4
+    python -m src.api.serve --workers 4 --server gunicorn
+    python -m src.api.serve --workers 4 --worker-ports --advertise-host 10.0.0.5
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+APP = "src.api.http_server:app"
+
+
+def run_uvicorn(host: str, port: int, workers: int, log_level: str, reload: bool = False) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=host,
+        port=port,
+        workers=workers if workers > 1 else None,
+        reload=reload and workers == 1,
+        log_level=log_level,
+    )
+
+
+def run_gunicorn(host: str, port: int, workers: int, log_level: str) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    options: Dict[str, Any] = {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "loglevel": log_level,
+        # Chat streams and generate_days calls outlive gunicorn's 30s default
+        "timeout": 180,
+        "graceful_timeout": 30,
+        "keepalive": 5,
+        # Recycle workers now and then; jitter keeps them from restarting together
+        "max_requests": 20000,
+        "max_requests_jitter": 2000,
+        # Each worker builds its own clients in the app lifespan
+        "preload_app": False,
+    }
+
+    class Application(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self) -> Any:
+            from .http_server import app
+            return app
+
+    Application().run()
+
+
+def _serve_worker(host: str, port: int, log_level: str, env: Dict[str, str]) -> None:
+    os.environ.update(env)
+    run_uvicorn(host, port, 1, log_level)
+
+
+def run_worker_ports(host: str, port: int, workers: int, log_level: str, advertise_host: str) -> None:
+    """Supervise one single-process server per port, restarting any that exit."""
+    context = multiprocessing.get_context("spawn")
+    os.environ.setdefault("AFFINITY_MODE", "redirect")
+
+    def spawn(index: int) -> Any:
+        worker_port = port + 1 + index
+        env = {"AFFINITY_ADVERTISE_URL": f"http://{advertise_host}:{worker_port}"}
+        process = context.Process(
+            target=_serve_worker, args=(host, worker_port, log_level, env), name=f"worker-{index}"
+        )
+        process.start()
+        return process
+
+    processes: List[Any] = [spawn(i) for i in range(workers)]
+    stopping = False
+
+    def stop(signum: int, frame: Optional[Any]) -> None:
+        nonlocal stopping
+        stopping = True
+        for process in processes:
+            if process.is_alive():
+                process.terminate()  # uvicorn shuts down gracefully on SIGTERM
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"Serving {workers} workers on ports {port + 1}-{port + workers}", file=sys.stderr)
+
+    while not stopping:
+        for index, process in enumerate(processes):
+            if not process.is_alive() and not stopping:
+                print(f"Worker {index} exited with {process.exitcode}, restarting", file=sys.stderr)
+                processes[index] = spawn(index)
+        time.sleep(1.0)
+
+    for process in processes:
+        process.join()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from ..settings import settings
+
+    parser = argparse.ArgumentParser(description="Run the intelligence HTTP service")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"], default=settings.server)
+    parser.add_argument("--worker-ports", action="store_true", default=settings.worker_ports,
+                        help="One port per worker (port + 1 + i), for child affinity")
+    parser.add_argument("--advertise-host", default="127.0.0.1",
+                        help="Host other workers and callers reach this machine at (worker ports)")
+    args = parser.parse_args(argv)
+    log_level = settings.log_level.lower()
+
+    if args.workers > 1 or args.worker_ports:
+        # Spawned workers read it from the environment; gunicorn forks its
+        # workers from this process, where settings are already loaded
+        os.environ["CACHE_INVALIDATION_ENABLED"] = "true"
+        settings.cache_invalidation_enabled = True
+
+    if args.worker_ports:
+        run_worker_ports(args.host, args.port, args.workers, log_level, args.advertise_host)
+    elif args.server == "gunicorn":
+        run_gunicorn(args.host, args.port, args.workers, log_level)
+    else:
+        run_uvicorn(args.host, args.port, args.workers, log_level, reload=settings.debug)
+
+
+if __name__ == "__main__":
+    main()
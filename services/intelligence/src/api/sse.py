@@ -0,0 +1,171 @@
+"""Server-sent event framing with coalesced flushes, keep-alives and disconnect handling."""
+
+import asyncio
+import re
+import time
+from typing import AsyncIterator, List, Optional
+import structlog
+from starlette.requests import Request
+
+from ..core import metrics
+
+logger = structlog.get_logger(__name__)
+
+sse_client_disconnects = metrics.registry.counter(
+    "sse_client_disconnects_total",
+    "Streams whose client went away before the end; the upstream call is cancelled"
+)
+sse_frames = metrics.registry.counter(
+    "sse_frames_total",
+    "SSE frames written, by kind (data, keepalive)",
+    labelnames=("kind",)
+)
+
+_LINE_BREAKS = re.compile(r"\r\n|\r|\n")
+
+KEEPALIVE_FRAME = ": keep-alive\n\n"
+
+# Marks the end of the upstream stream on the producer queue
+_END = object()
+
+
+def encode_event(data: str, event_id: Optional[str] = None, event: Optional[str] = None) -> str:
+    """Encode one SSE event; each line of `data` gets its own `data:` field.
+
+    Clients join the lines back with "\\n", so tokens containing line breaks
+    arrive intact instead of ending the frame early.
+    """
+    fields = []
+    if event_id is not None:
+        fields.append(f"id: {event_id}")
+    if event is not None:
+        fields.append(f"event: {event}")
+    fields.extend(f"data: {line}" for line in _LINE_BREAKS.split(data))
+    return "\n".join(fields) + "\n\n"
+
+
+class SSEWriter:
+    """Turns a stream of text chunks into SSE frames.
+
+    The first chunk is sent immediately so time to first token is not
+    delayed. After that, chunks are coalesced into one frame per
+    `flush_interval` seconds or `max_frame_bytes`, whichever comes first,
+    which cuts per-frame overhead for fast upstream streams. A keep-alive
+    comment is sent when nothing has been written for `keepalive_interval`
+    seconds, so proxies do not drop slow streams. The upstream is read by a
+    separate task; if the client disconnects, that task is cancelled, which
+    stops the upstream call.
+    """
+
+    def __init__(
+        self,
+        request: Optional[Request] = None,
+        flush_interval: float = 0.05,
+        max_frame_bytes: int = 512,
+        keepalive_interval: float = 15.0
+    ):
+        self.request = request
+        self.flush_interval = flush_interval
+        self.max_frame_bytes = max_frame_bytes
+        self.keepalive_interval = keepalive_interval
+        self.disconnected = False
+        self._next_id = 0
+
+    def event(self, data: str, event: Optional[str] = None) -> str:
+        """Encode an event with the next sequential id."""
+        self._next_id += 1
+        sse_frames.inc(kind="data")
+        return encode_event(data, event_id=str(self._next_id), event=event)
+
+    async def stream(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Yield SSE frames for the chunks; upstream errors propagate after buffered text is sent."""
+        queue: "asyncio.Queue[object]" = asyncio.Queue()
+
+        async def produce() -> None:
+            try:
+                async for chunk in chunks:
+                    await queue.put(chunk)
+                await queue.put(_END)
+            except Exception as e:
+                await queue.put(e)
+            finally:
+                # Cancelled between chunks: close the source, and with it the upstream call
+                close = getattr(chunks, "aclose", None)
+                if close is not None:
+                    await close()
+
+        producer = asyncio.create_task(produce())
+        buffer: List[str] = []
+        buffered_bytes = 0
+        buffer_started = 0.0
+        first = True
+        last_write = time.monotonic()
+
+        try:
+            while True:
+                now = time.monotonic()
+                if buffer:
+                    timeout = max(0.0, buffer_started + self.flush_interval - now)
+                else:
+                    timeout = max(0.0, last_write + self.keepalive_interval - now)
+
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    item = None
+
+                if item is None:
+                    # Woken by the timer, not a token: a cheap moment to check the client
+                    if await self._client_gone():
+                        return
+
+                    if buffer:
+                        yield self.event("".join(buffer))
+                        buffer, buffered_bytes = [], 0
+                    else:
+                        sse_frames.inc(kind="keepalive")
+                        yield KEEPALIVE_FRAME
+                    last_write = time.monotonic()
+                    continue
+
+                if not isinstance(item, str):
+                    # The end of the stream or an upstream error
+                    if buffer:
+                        yield self.event("".join(buffer))
+                    if isinstance(item, Exception):
+                        raise item
+                    return
+
+                if first:
+                    first = False
+                    yield self.event(item)
+                    last_write = time.monotonic()
+                    continue
+
+                if not buffer:
+                    buffer_started = time.monotonic()
+                buffer.append(item)
+                buffered_bytes += len(item.encode("utf-8"))
+                if buffered_bytes >= self.max_frame_bytes:
+                    yield self.event("".join(buffer))
+                    buffer, buffered_bytes = [], 0
+                    last_write = time.monotonic()
+
+        finally:
+            if not producer.done():
+                if not self.disconnected:
+                    # Closed early by the server after a failed write to the client
+                    self._mark_disconnected()
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+    async def _client_gone(self) -> bool:
+        if self.request is None or not await self.request.is_disconnected():
+            return False
+        self._mark_disconnected()
+        return True
+
+    def _mark_disconnected(self) -> None:
+        self.disconnected = True
+        sse_client_disconnects.inc()
+        logger.info("SSE client disconnected, cancelling upstream stream")
@@ -0,0 +1,216 @@
+"""Approximate nearest-neighbour index: IVF lists over int8-quantized vectors."""
+
+import json
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+MAGIC = b"AIVF"
+VERSION = 1
+# magic, version, count, dim, nlist, keys byte length, built_at
+HEADER = struct.Struct("<4sHIIIId")
+ALIGNMENT = 64
+
+# Approximate scores can undershoot the exact cosine by quantization error, so
+# the shortlist admits candidates slightly below the threshold.
+QUANTIZATION_MARGIN = 0.05
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    normalized: np.ndarray = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    return normalized
+
+
+class IVFQuantizedIndex:
+    """Immutable inverted-file index over unit-normalized embeddings.
+
+    Vectors are clustered with spherical k-means into about sqrt(n) lists and
+    stored sorted by list, so each list is a contiguous row range. A search
+    scores the query against the centroids, scans the int8 codes of the
+    `nprobe` closest lists (a quarter of the bytes of float32), and re-ranks
+    the best candidates exactly against the float32 vectors.
+
+    The on-disk format is a header, the keys as JSON, then aligned raw arrays
+    (centroids, list offsets, scales, codes, vectors), so `load` can
+    memory-map it and only the pages a search touches are read.
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        scales: np.ndarray,
+        codes: np.ndarray,
+        vectors: np.ndarray,
+        built_at: float
+    ):
+        self.keys = keys
+        self.centroids = centroids
+        self.offsets = offsets
+        self.scales = scales
+        self.codes = codes
+        self.vectors = vectors
+        self.built_at = built_at
+        self.positions: Dict[str, int] = {key: i for i, key in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1])
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @classmethod
+    def build(
+        cls,
+        keys: Sequence[str],
+        vectors: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = 8,
+        training_sample: int = 20000,
+        seed: int = 0,
+        built_at: Optional[float] = None
+    ) -> "IVFQuantizedIndex":
+        """Cluster, quantize and lay out vectors (rows matching `keys`).
+
+        `built_at` records when the vectors were read (default: now).
+        """
+        unit = _normalize(np.asarray(vectors, dtype=np.float32))
+        count = unit.shape[0]
+        nlist = max(1, min(count, nlist or int(np.sqrt(count))))
+        rng = np.random.default_rng(seed)
+
+        sample = unit[rng.choice(count, min(count, training_sample), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(nlist):
+                members = sample[assignment == list_id]
+                if len(members):
+                    centroids[list_id] = members.sum(axis=0)
+                else:
+                    centroids[list_id] = sample[rng.integers(sample.shape[0])]
+            centroids = _normalize(centroids)
+
+        assignment = np.argmax(unit @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        unit = np.ascontiguousarray(unit[order])
+        offsets = np.searchsorted(assignment[order], np.arange(nlist + 1)).astype(np.int64)
+
+        peaks = np.abs(unit).max(axis=1)
+        scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        codes = np.rint(unit / scales[:, None]).astype(np.int8)
+
+        return cls(
+            [keys[i] for i in order], centroids.astype(np.float32), offsets,
+            scales, codes, unit, built_at or time.time()
+        )
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: int,
+        threshold: float,
+        nprobe: int = 8,
+        rerank_factor: int = 4,
+        alive: Optional[np.ndarray] = None
+    ) -> List[Tuple[str, float]]:
+        """Return up to `limit` (key, cosine) pairs above the threshold, best first.
+
+        `query` must be unit-normalized. Rows where `alive` is False are skipped.
+        """
+        if len(self.keys) == 0 or limit <= 0:
+            return []
+
+        probe = np.argsort(-(self.centroids @ query))[:nprobe]
+        rows = np.concatenate([
+            np.arange(self.offsets[list_id], self.offsets[list_id + 1]) for list_id in probe
+        ])
+        if alive is not None:
+            rows = rows[alive[rows]]
+        if rows.size == 0:
+            return []
+
+        approx = (self.codes[rows].astype(np.float32) @ query) * self.scales[rows]
+        keep = approx > threshold - QUANTIZATION_MARGIN
+        rows, approx = rows[keep], approx[keep]
+
+        shortlist_size = limit * rerank_factor
+        if rows.size > shortlist_size:
+            top = np.argpartition(-approx, shortlist_size - 1)[:shortlist_size]
+            rows = rows[top]
+
+        rows.sort()  # Sequential reads from the memory-mapped vectors
+        exact = self.vectors[rows] @ query
+        ranked = np.argsort(-exact)
+        return [
+            (self.keys[rows[i]], float(exact[i]))
+            for i in ranked[:limit] if exact[i] > threshold
+        ]
+
+    def save(self, path: str) -> int:
+        """Write the index atomically (temp file + rename); returns its size in bytes."""
+        keys_blob = json.dumps(self.keys, separators=(",", ":")).encode("utf-8")
+        arrays = [self.centroids, self.offsets, self.scales, self.codes, self.vectors]
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp.{os.getpid()}"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(HEADER.pack(
+                    MAGIC, VERSION, len(self.keys), self.dim, self.nlist, len(keys_blob), self.built_at
+                ))
+                f.write(keys_blob)
+                for array in arrays:
+                    f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+                    f.write(np.ascontiguousarray(array).tobytes())
+                size = f.tell()
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return size
+
+    @classmethod
+    def load(cls, path: str) -> "IVFQuantizedIndex":
+        """Memory-map a saved index."""
+        with open(path, "rb") as f:
+            magic, version, count, dim, nlist, keys_length, built_at = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Not a version {VERSION} ANN index: {path}")
+            keys = json.loads(f.read(keys_length).decode("utf-8"))
+
+        offset = HEADER.size + keys_length
+        arrays = []
+        for dtype, shape in (
+            (np.float32, (nlist, dim)),
+            (np.int64, (nlist + 1,)),
+            (np.float32, (count,)),
+            (np.int8, (count, dim)),
+            (np.float32, (count, dim)),
+        ):
+            offset = _aligned(offset)
+            arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape))
+            offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+        centroids, offsets, scales, codes, vectors = arrays
+        # The small arrays are read on every search; keep them in RAM
+        return cls(keys, np.array(centroids), np.array(offsets), np.array(scales), codes, vectors, built_at)
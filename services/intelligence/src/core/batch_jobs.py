@@ -0,0 +1,364 @@
+"""Batch calendar generation jobs with fair scheduling and Redis checkpoints."""
+
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+import structlog
+
+from . import metrics
+from ..api.schemas import PersonaType
+
+logger = structlog.get_logger(__name__)
+
+batch_items_total = metrics.registry.counter(
+    "batch_generate_days_items_total",
+    "Batch calendar generations by outcome",
+    labelnames=("status",)
+)
+batch_items_queued = metrics.registry.gauge(
+    "batch_generate_days_items_queued",
+    "Batch calendar generations waiting for a worker"
+)
+
+# Extend a lease only while it still holds this claim's token
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Delete a lease only while it still holds this claim's token
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class BatchItem:
+    """One calendar in a batch job."""
+    job_id: str
+    account_id: str
+    index: int
+    request: Dict[str, Any]
+    lease: str  # Token of the claim the item was queued under
+
+
+class FairScheduler:
+    """Round-robin queue across accounts.
+
+    Each `get` takes the next item from the account that has waited longest,
+    so an account submitting hundreds of children cannot starve one
+    submitting a few.
+    """
+
+    def __init__(self) -> None:
+        self._accounts: "OrderedDict[str, Deque[BatchItem]]" = OrderedDict()
+        self._available = asyncio.Condition()
+        self.size = 0
+
+    async def put(self, item: BatchItem) -> None:
+        async with self._available:
+            self._accounts.setdefault(item.account_id, deque()).append(item)
+            self.size += 1
+            self._available.notify()
+
+    async def get(self) -> BatchItem:
+        async with self._available:
+            await self._available.wait_for(lambda: self.size > 0)
+            account_id, items = next(iter(self._accounts.items()))
+            item = items.popleft()
+            if items:
+                self._accounts.move_to_end(account_id)
+            else:
+                del self._accounts[account_id]
+            self.size -= 1
+            return item
+
+
+class BatchJobManager:
+    """Runs batch generate_days jobs on a shared worker pool.
+
+    Jobs are checkpointed to Redis: the job's requests when it is submitted,
+    and each child's result as soon as it finishes. A process holds a lease on
+    each job it runs and refreshes it periodically. Jobs whose lease has
+    lapsed (after a restart or crash) are claimed by any running process and
+    resume with only the children that have no completed result yet; failed
+    children, and degraded ones given placeholder days, run again. A child that was
+    mid-generation at the crash is generated again; results are written by
+    index, so a repeat overwrites rather than duplicates. A process that finds
+    its lease taken over (it stalled past the lease) drops the job and skips
+    the children it still had queued.
+    """
+
+    def __init__(
+        self,
+        chat_engine: Any,
+        redis_client: Any,
+        workers: int = 8,
+        upstream_concurrency: int = 12,
+        lease_seconds: int = 30,
+        job_ttl_seconds: int = 7 * 24 * 60 * 60
+    ):
+        self.chat_engine = chat_engine
+        self.redis_client = redis_client
+        self.worker_count = workers
+        self.upstream_concurrency = upstream_concurrency
+        self.lease_seconds = lease_seconds
+        self.job_ttl_seconds = job_ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._scheduler: Optional[FairScheduler] = None
+        self._upstream_limit: Optional[asyncio.Semaphore] = None
+        self._remaining: Dict[str, int] = {}  # Owned job id -> children without a result
+        self._leases: Dict[str, str] = {}  # Owned job id -> lease token
+        self._renew_lease = redis_client.register_script(RENEW_LEASE_SCRIPT)
+        self._release_lease = redis_client.register_script(RELEASE_LEASE_SCRIPT)
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the workers and the lease/resume loop on the running event loop."""
+        if self._tasks:
+            return
+
+        scheduler = self._scheduler = FairScheduler()
+        self._upstream_limit = asyncio.Semaphore(self.upstream_concurrency)
+        batch_items_queued.set_function(lambda: scheduler.size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+        logger.info(f"Batch job manager {self.owner} started with {self.worker_count} workers")
+
+    @property
+    def scheduler(self) -> FairScheduler:
+        if self._scheduler is None:
+            raise RuntimeError("Batch job manager is not started")
+        return self._scheduler
+
+    async def stop(self) -> None:
+        """Stop working and release leases so another process can resume the jobs."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        try:
+            for job_id in list(self._leases):
+                await self._release(job_id)
+        except Exception as e:
+            logger.warning(f"Failed to release batch job leases: {e}")
+        self._remaining.clear()
+        self._leases.clear()
+
+    async def submit(self, account_id: str, requests: List[Dict[str, Any]]) -> str:
+        """Checkpoint a new job and queue its children; returns the job id."""
+        job_id = uuid.uuid4().hex
+        lease = self._new_lease()
+
+        metrics.redis_round_trips.inc(operation="batch_submit")
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(self._job_key(job_id), mapping={
+            "account_id": account_id,
+            "total": len(requests),
+            "status": "running",
+            "created_at": time.time(),
+            "requests": json.dumps(requests),
+        })
+        pipe.set(self._lease_key(job_id), lease, ex=self.lease_seconds)
+        pipe.sadd(self._active_key(), job_id)
+        await pipe.execute()
+
+        self._remaining[job_id] = len(requests)
+        self._leases[job_id] = lease
+        for index, request in enumerate(requests):
+            await self.scheduler.put(BatchItem(job_id, account_id, index, request, lease))
+
+        logger.info(f"Batch job {job_id} queued {len(requests)} calendars for account {account_id}")
+        return job_id
+
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job's progress and the results checkpointed so far, or None if unknown."""
+        metrics.redis_round_trips.inc(operation="batch_status")
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hmget(self._job_key(job_id), "account_id", "total", "status")
+        pipe.hvals(self._results_key(job_id))
+        (account_id, total, status), values = await pipe.execute()
+        if account_id is None:
+            return None
+
+        results = sorted((json.loads(value) for value in values), key=lambda r: r["index"])
+        return {
+            "job_id": job_id,
+            "account_id": account_id,
+            "status": status,
+            "total": int(total),
+            "completed": sum(1 for r in results if r["status"] == "completed"),
+            "degraded": sum(1 for r in results if r["status"] == "degraded"),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "results": results,
+        }
+
+    async def stream(self, job_id: str, poll_interval: float = 0.5) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each child's result once, as it is checkpointed, until the job finishes.
+
+        Results are read from Redis, so this works whichever process runs the job.
+        """
+        seen = set()
+        while True:
+            job = await self.status(job_id)
+            if job is None:
+                return
+            for result in job["results"]:
+                if result["index"] not in seen:
+                    seen.add(result["index"])
+                    yield result
+            if len(seen) >= job["total"]:
+                return
+            await asyncio.sleep(poll_interval)
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            item = await self.scheduler.get()
+            try:
+                await self._run_item(item)
+            except Exception as e:
+                logger.error(f"Batch worker {worker_id} failed on job {item.job_id}: {e}")
+
+    async def _run_item(self, item: BatchItem) -> None:
+        if self._leases.get(item.job_id) != item.lease:
+            return  # The job was taken over by another process
+        request = item.request
+        result: Dict[str, Any] = {"index": item.index, "child_id": request["child_id"]}
+        try:
+            result["messages"], generated = await self.chat_engine.generate_daily_messages(
+                child_id=request["child_id"],
+                child_name=request["child_name"],
+                persona=PersonaType(request["persona"]),
+                custom_prompt=request.get("custom_prompt"),
+                theme=request.get("theme", "default"),
+                bypass_cache=request.get("regenerate", False),
+                upstream_limit=self._upstream_limit
+            )
+            # Placeholder days are kept so the child has a calendar, but the
+            # item is not done: a resumed job or a resubmission retries it
+            result["status"] = "completed" if generated else "degraded"
+        except Exception as e:
+            logger.error(f"Batch job {item.job_id} child {request['child_id']} failed: {e}")
+            result["status"] = "failed"
+            result["error"] = str(e)
+        batch_items_total.inc(status=result["status"])
+
+        metrics.redis_round_trips.inc(operation="batch_checkpoint")
+        await self.redis_client.hset(self._results_key(item.job_id), str(item.index), json.dumps(result))
+
+        remaining = self._remaining.get(item.job_id)
+        if remaining is not None and self._leases.get(item.job_id) == item.lease:
+            self._remaining[item.job_id] = remaining - 1
+            if remaining == 1:
+                await self._finish(item.job_id)
+
+    async def _finish(self, job_id: str) -> None:
+        """Mark a job complete and let its keys expire."""
+        del self._remaining[job_id]
+        metrics.redis_round_trips.inc(operation="batch_finish")
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(self._job_key(job_id), "status", "completed")
+        pipe.expire(self._job_key(job_id), self.job_ttl_seconds)
+        pipe.expire(self._results_key(job_id), self.job_ttl_seconds)
+        pipe.srem(self._active_key(), job_id)
+        await pipe.execute()
+        await self._release(job_id)
+        logger.info(f"Batch job {job_id} completed")
+
+    async def _release(self, job_id: str) -> None:
+        lease = self._leases.pop(job_id, None)
+        if lease is not None:
+            await self._release_lease(keys=[self._lease_key(job_id)], args=[lease])
+
+    def _new_lease(self) -> str:
+        return f"{self.owner}:{uuid.uuid4().hex[:8]}"
+
+    async def _maintain(self) -> None:
+        """Keep leases on owned jobs alive and claim jobs whose owner went away."""
+        while True:
+            try:
+                await self._renew_leases()
+                await self._resume_orphaned()
+            except Exception as e:
+                logger.warning(f"Batch job maintenance failed: {e}")
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    async def _renew_leases(self) -> None:
+        """Extend the leases still held; drop jobs another process has taken over."""
+        if not self._leases:
+            return
+        job_ids = list(self._leases)
+        renewed = await asyncio.gather(*[
+            self._renew_lease(keys=[self._lease_key(job_id)], args=[self._leases[job_id], self.lease_seconds])
+            for job_id in job_ids
+        ])
+
+        for job_id, ok in zip(job_ids, renewed):
+            if not int(ok) and job_id in self._leases:
+                # Queued children of this job are skipped; its new owner runs them
+                logger.warning(f"Lost the lease on batch job {job_id}, stopping work on it")
+                self._leases.pop(job_id, None)
+                self._remaining.pop(job_id, None)
+
+    async def _resume_orphaned(self) -> None:
+        job_ids = await self.redis_client.smembers(self._active_key())
+        for job_id in job_ids:
+            if job_id in self._remaining:
+                continue
+            lease = self._new_lease()
+            if not await self.redis_client.set(self._lease_key(job_id), lease, nx=True, ex=self.lease_seconds):
+                continue
+            self._leases[job_id] = lease
+
+            metrics.redis_round_trips.inc(operation="batch_resume")
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hmget(self._job_key(job_id), "account_id", "requests")
+            pipe.hgetall(self._results_key(job_id))
+            (account_id, requests), results = await pipe.execute()
+            if account_id is None:
+                await self.redis_client.srem(self._active_key(), job_id)
+                await self._release(job_id)
+                continue
+
+            requests = json.loads(requests)
+            # Failed and degraded children are run again
+            done = {
+                int(index) for index, result in results.items()
+                if json.loads(result)["status"] == "completed"
+            }
+            self._remaining[job_id] = len(requests) - len(done)
+            if not self._remaining[job_id]:
+                await self._finish(job_id)
+                continue
+
+            for index, request in enumerate(requests):
+                if index not in done:
+                    await self.scheduler.put(BatchItem(job_id, account_id, index, request, lease))
+            logger.info(
+                f"Resumed batch job {job_id} with {self._remaining[job_id]} of {len(requests)} calendars left"
+            )
+
+    def _job_key(self, job_id: str) -> str:
+        return f"batch:{job_id}"
+
+    def _results_key(self, job_id: str) -> str:
+        return f"batch:{job_id}:results"
+
+    def _lease_key(self, job_id: str) -> str:
+        return f"batch:{job_id}:lease"
+
+    def _active_key(self) -> str:
+        return "batch:active"
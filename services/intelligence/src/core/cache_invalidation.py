@@ -0,0 +1,110 @@
+"""Invalidation of per-process caches across workers over Redis pub/sub."""
+
+import asyncio
+import json
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+import redis.asyncio as redis
+import structlog
+
+from . import metrics
+from ..settings import settings
+
+logger = structlog.get_logger(__name__)
+
+invalidations_received = metrics.registry.counter(
+    "cache_invalidations_received_total",
+    "Cache invalidations received from other workers, by kind",
+    labelnames=("kind",)
+)
+
+Handler = Callable[[str], None]
+
+
+class CacheInvalidationBus:
+    """Tells other workers to drop local cache entries when shared state changes.
+
+    Writers add an invalidation to the Redis pipeline that makes the change
+    (`publish_in`), so it costs no extra round trip. Each worker listens on
+    the channel and runs the handlers registered for the message's kind,
+    skipping its own messages. Delivery is best effort: a worker that misses
+    a message keeps a stale entry only until the entry's own expiry or reload.
+    Disabled (a no-op) unless more than one worker shares the state.
+    """
+
+    def __init__(self, redis_url: str, channel: str, enabled: bool = False):
+        self.redis_url = redis_url
+        self.channel = channel
+        self.enabled = enabled
+        self.origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, kind: str, handler: Handler) -> None:
+        """Run `handler(key)` when another worker invalidates `kind`."""
+        self._handlers.setdefault(kind, []).append(handler)
+
+    def publish_in(self, pipe: Any, kind: str, key: str) -> None:
+        """Queue an invalidation on a Redis pipeline that is about to execute."""
+        if self.enabled:
+            pipe.publish(self.channel, self._encode(kind, key))
+
+    def start(self) -> None:
+        """Listen for invalidations on the running event loop."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _encode(self, kind: str, key: str) -> str:
+        return json.dumps({"origin": self.origin, "kind": kind, "key": key}, separators=(",", ":"))
+
+    def _dispatch(self, data: str) -> None:
+        message = json.loads(data)
+        if message.get("origin") == self.origin:
+            return
+        kind = message.get("kind", "")
+        invalidations_received.inc(kind=kind)
+        for handler in self._handlers.get(kind, []):
+            handler(message.get("key", ""))
+
+    async def _listen(self) -> None:
+        client = redis.from_url(self.redis_url, decode_responses=True)
+        backoff = 1.0
+        try:
+            while True:
+                pubsub = client.pubsub()
+                try:
+                    await pubsub.subscribe(self.channel)
+                    logger.info(f"Listening for cache invalidations on {self.channel}")
+                    backoff = 1.0
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        try:
+                            self._dispatch(message["data"])
+                        except Exception as e:
+                            logger.warning(f"Bad cache invalidation message: {e}")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Entries changed while disconnected stay until their own expiry
+                    logger.warning(f"Cache invalidation listener disconnected, retrying in {backoff:.0f}s: {e}")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+                finally:
+                    await pubsub.aclose()
+        finally:
+            await client.aclose()
+
+
+# Global invalidation bus instance
+invalidation_bus = CacheInvalidationBus(
+    settings.redis_url,
+    settings.cache_invalidation_channel,
+    enabled=settings.cache_invalidation_enabled
+)
@@ -1,12 +1,26 @@
 """Chat engine for handling streaming conversations with memory integration."""
 
-from typing import AsyncGenerator, List, Dict, Any, Optional
+import asyncio
+import json
+import time
+from typing import AsyncGenerator, List, Dict, Any, Optional, Tuple
 import structlog
 
+from . import metrics
 from .persona_builder import persona_builder
 from .memory_manager import memory_manager
+from .persistence_queue import PersistenceJob, PersistenceQueue
+from .json_stream import JsonArrayStreamParser
+from .result_cache import ResultCache
+from .response_accumulator import ResponseAccumulator
+from .response_cache import ResponseCache
+from .session_cache import SessionHistoryCache
+from .cache_invalidation import invalidation_bus
+from .context_assembler import ContextAssembler, TokenCounter
 from ..integrations.openai_client import openai_client
-from ..api.schemas import PersonaType
+from ..integrations.circuit_breaker import CircuitOpenError
+from ..api.schemas import DailyMessage, PersonaType
+from ..settings import settings
 
 logger = structlog.get_logger(__name__)
 
@@ -14,6 +28,44 @@ logger = structlog.get_logger(__name__)
 class ChatEngine:
     """Handles chat conversations with streaming responses and memory integration."""
 
+    FALLBACK_REPLY = "I'm having trouble right now, but I love chatting with you!"
+
+    def __init__(self) -> None:
+        self.persistence_queue = PersistenceQueue(
+            self._persist_turn,
+            maxsize=settings.persistence_queue_size,
+            workers=settings.persistence_workers
+        )
+        metrics.persistence_queue_depth.set_function(
+            lambda: self.persistence_queue.metrics()["depth"]
+        )
+        # Entries are {"messages", "generated"}; v1 entries were bare message lists
+        self.generation_cache = ResultCache(
+            "generate_days_v2",
+            memory_manager.redis_client,
+            max_entries=settings.generation_cache_max_entries,
+            ttl_seconds=settings.generation_cache_ttl_seconds
+        )
+        self.response_cache = ResponseCache(
+            memory_manager.redis_client,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+            similarity_threshold=settings.response_cache_similarity_threshold,
+            max_message_chars=settings.response_cache_max_message_chars,
+            history_depth=settings.response_cache_history_depth
+        )
+        self.session_cache = SessionHistoryCache(
+            ttl_seconds=settings.session_cache_ttl_seconds,
+            max_sessions=settings.session_cache_max_sessions,
+            window=settings.short_term_memory_window
+        )
+        # A turn of this session was persisted by another worker
+        invalidation_bus.subscribe("session", self.session_cache.invalidate)
+        self.context_assembler = ContextAssembler(
+            TokenCounter(settings.openai_model),
+            token_budget=settings.context_token_budget,
+            max_memories=settings.context_max_memories
+        )
+
     async def generate_response(
         self,
         child_id: str,
@@ -26,59 +78,372 @@ class ChatEngine:
     ) -> AsyncGenerator[str, None]:
         """Generate a streaming response to a user message."""
 
+        turn_started = time.perf_counter()
+        if not openai_client.available:
+            logger.warning(f"OpenAI circuit open, sending fallback reply to session {session_id}")
+            yield self.FALLBACK_REPLY
+            return
+
+        # Long-term memory retrieval runs while history loads; it is
+        # cancelled if the reply comes from the response cache
+        memory_retrieval = asyncio.ensure_future(self._timed_relevant_memories(child_id, user_message))
         try:
             # Build system prompt
-            system_prompt = persona_builder.build_system_prompt(
-                persona=persona,
-                child_name=child_name,
-                custom_prompt=custom_prompt
-            )
+            with metrics.chat_stage_seconds.time(stage="prompt_build"):
+                system_prompt = persona_builder.build_system_prompt(
+                    persona=persona,
+                    child_name=child_name,
+                    custom_prompt=custom_prompt
+                )
 
             # Load conversation history
             history = conversation_history or []
             if not history:
-                history = await memory_manager.load_short_term_memory(session_id)
+                history = await self._load_history(session_id)
+
+            # Short repeated messages ("I love you Daddy") may have a cached reply
+            cache_scope = None
+            cached_reply = None
+            if settings.response_cache_enabled and self.response_cache.is_cacheable(user_message):
+                cache_scope = self.response_cache.scope(persona.value, child_id, history)
+                with metrics.chat_stage_seconds.time(stage="response_cache"):
+                    cached_reply = await self.response_cache.get(
+                        persona.value,
+                        cache_scope,
+                        user_message,
+                        embed=lambda: self._embed_message(user_message)
+                    )
 
             # Add current user message to history
             history.append({"role": "user", "content": user_message})
 
-            # Retrieve relevant long-term memories
-            relevant_memories = await self._get_relevant_memories(child_id, user_message)
+            if cached_reply is not None:
+                memory_retrieval.cancel()
+                chunks = self.response_cache.replay(
+                    cached_reply, settings.response_cache_replay_delay_ms / 1000
+                )
+            else:
+                # Retrieve relevant long-term memories
+                relevant_memories = await memory_retrieval
 
-            # Build messages for OpenAI
-            messages = self._build_messages(system_prompt, history, relevant_memories)
+                # Build messages for OpenAI
+                with metrics.chat_stage_seconds.time(stage="context_assembly"):
+                    messages = self._build_messages(system_prompt, history, relevant_memories)
+
+                chunks = openai_client.create_chat_completion(messages, stream=True)
 
             # Generate streaming response
-            full_response = ""
-            async for chunk in openai_client.create_chat_completion(messages, stream=True):
-                full_response += chunk
-                yield chunk
+            response = ResponseAccumulator()
+            try:
+                async for chunk in chunks:
+                    response.add(chunk)
+                    if response.token_count == 1 and cached_reply is None and response.ttft is not None:
+                        metrics.chat_stage_seconds.observe(response.ttft, stage="upstream_ttft")
+                    yield chunk
+            finally:
+                # Closed at a yield (the client went away): close the upstream too
+                await chunks.aclose()
+
+            full_response = response.text()
+            if response.first_token_at is not None and cached_reply is None:
+                metrics.chat_stage_seconds.observe(
+                    time.perf_counter() - response.first_token_at, stage="stream"
+                )
+                metrics.chat_max_inter_token_gap_seconds.observe(
+                    response.max_gap, persona=persona.value
+                )
+
+            # Persist the turn, and cache the reply, in the background so the
+            # stream can finish now
+            reply = {"role": "assistant", "content": full_response}
+            history.append(reply)
+            self.session_cache.append(session_id, [history[-2], reply])
+            cached_replies: List[Tuple[str, str, str]] = []
+            if cache_scope is not None and cached_reply is None and full_response:
+                cached_replies.append((cache_scope, user_message, full_response))
+            with metrics.chat_stage_seconds.time(stage="persistence_enqueue"):
+                await self.persistence_queue.enqueue(
+                    PersistenceJob(
+                        child_id=child_id,
+                        session_id=session_id,
+                        new_messages=[history[-2], reply],
+                        cached_replies=cached_replies
+                    )
+                )
+
+            processing_time_ms = int((time.perf_counter() - turn_started) * 1000)
+            metrics.chat_turn_processing_seconds.observe(processing_time_ms / 1000, persona=persona.value)
+            metrics.chat_turn_tokens.observe(response.token_count, persona=persona.value)
+
+            logger.info(
+                f"Generated response for child {child_id}, session {session_id}",
+                processing_time_ms=processing_time_ms,
+                token_count=response.token_count,
+                ttft_ms=int(response.ttft * 1000) if response.ttft is not None else None,
+                max_token_gap_ms=int(response.max_gap * 1000)
+            )
+
+        except Exception as e:
+            logger.error(f"Chat engine error: {e}")
+            yield self.FALLBACK_REPLY
+
+        finally:
+            if not memory_retrieval.done():
+                memory_retrieval.cancel()
+
+    async def warm_session(
+        self,
+        child_id: str,
+        session_id: str,
+        persona: PersonaType,
+        child_name: str,
+        custom_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Preload what a session's first turn needs: history, persona prompt and memory index.
+
+        Called when the chat opens, so the first message only has to embed
+        itself and search in memory before the upstream call starts.
+        """
+        started = time.perf_counter()
+        persona_builder.build_system_prompt(persona=persona, child_name=child_name, custom_prompt=custom_prompt)
+        history, memory_chunks = await asyncio.gather(
+            self._load_history(session_id),
+            memory_manager.preload_long_term_memory(child_id)
+        )
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        logger.info(
+            f"Warmed session {session_id} for child {child_id}",
+            history_messages=len(history),
+            memory_chunks=memory_chunks,
+            elapsed_ms=elapsed_ms
+        )
+        return {"history_messages": len(history), "memory_chunks": memory_chunks, "elapsed_ms": elapsed_ms}
+
+    async def _load_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Session history from the warm cache, or from Redis (shared with any concurrent load)."""
+        async def load() -> List[Dict[str, Any]]:
+            with metrics.chat_stage_seconds.time(stage="history_load"):
+                return await memory_manager.load_short_term_memory(session_id)
+
+        return await self.session_cache.get(session_id, load)
+
+    async def _timed_relevant_memories(self, child_id: str, user_message: str) -> List[Dict[str, Any]]:
+        with metrics.chat_stage_seconds.time(stage="memory_retrieval"):
+            return await self._get_relevant_memories(child_id, user_message)
 
-            # Store updated conversation in short-term memory
-            history.append({"role": "assistant", "content": full_response})
-            await memory_manager.store_short_term_memory(child_id, session_id, history)
+    async def generate_daily_messages(
+        self,
+        child_id: str,
+        child_name: str,
+        persona: PersonaType,
+        custom_prompt: Optional[str] = None,
+        theme: str = "default",
+        bypass_cache: bool = False,
+        upstream_limit: Optional[asyncio.Semaphore] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Generate 24 personalized daily messages for the advent calendar.
+
+        Returns the messages and whether every day was generated (False if
+        any fell back to placeholder messages).
+
+        The days are split into shards that are generated concurrently, so the
+        overall latency is roughly that of the slowest shard. A failed shard is
+        retried on its own and falls back to placeholder messages for just its
+        days if it keeps failing. `upstream_limit` caps concurrent shard calls
+        across callers sharing it; by default each calendar gets its own cap.
+
+        Results are cached by their inputs; identical concurrent requests share
+        one generation. Only fully generated calendars are cached, and
+        `bypass_cache` forces a fresh generation that replaces the cached one.
+        """
+
+        if not openai_client.available:
+            logger.warning(f"OpenAI circuit open, using fallback messages for child {child_id}")
+            return self._get_fallback_messages(child_name), False
 
-            # Store in long-term memory (could be done asynchronously)
-            await self._update_long_term_memory(child_id, history)
+        try:
+            key = self.generation_cache.make_key(
+                child_name=child_name,
+                persona=persona,
+                custom_prompt=custom_prompt,
+                theme=theme,
+                model=settings.openai_model,
+                temperature=settings.openai_temperature
+            )
+
+            async def generate() -> Tuple[Dict[str, Any], bool]:
+                semaphore = upstream_limit or asyncio.Semaphore(settings.generate_days_concurrency)
+                results = await asyncio.gather(*[
+                    self._generate_day_shard(days, child_name, persona, theme, semaphore)
+                    for days in self._day_shards(settings.generate_days_shard_size)
+                ])
+                generated = all(complete for _, complete in results)
+                messages = [message for shard, _ in results for message in shard]
+                # Callers sharing this computation learn whether it fell back too
+                return {"messages": messages, "generated": generated}, generated
 
-            logger.info(f"Generated response for child {child_id}, session {session_id}")
+            calendar = await self.generation_cache.get_or_compute(key, generate, bypass=bypass_cache)
+            return calendar["messages"], calendar["generated"]
 
         except Exception as e:
-            logger.error(f"Chat engine error: {e}")
-            yield "I'm having trouble right now, but I love chatting with you!"
+            logger.error(f"Daily message generation error: {e}")
+            return self._get_fallback_messages(child_name), False
 
-    async def generate_daily_messages(
+    async def stream_daily_messages(
         self,
         child_id: str,
         child_name: str,
         persona: PersonaType,
         custom_prompt: Optional[str] = None,
         theme: str = "default"
-    ) -> List[Dict[str, Any]]:
-        """Generate 24 personalized daily messages for the advent calendar."""
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Yield daily messages as soon as each one has been generated and validated.
+
+        Shards stream concurrently and their messages are yielded in completion
+        order, not day order.
+        """
+        semaphore = asyncio.Semaphore(settings.generate_days_concurrency)
+        queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+
+        async def run_shard(days: List[int]) -> None:
+            try:
+                async for message in self._stream_day_shard(
+                    days, child_name, persona, theme, semaphore
+                ):
+                    await queue.put(message)
+            finally:
+                await queue.put(None)
+
+        tasks = [
+            asyncio.create_task(run_shard(days))
+            for days in self._day_shards(settings.generate_days_shard_size)
+        ]
 
         try:
-            system_prompt = f"""You are creating 24 magical advent calendar messages for {child_name}.
+            remaining = len(tasks)
+            while remaining:
+                message = await queue.get()
+                if message is None:
+                    remaining -= 1
+                else:
+                    yield message
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _stream_day_shard(
+        self,
+        days: List[int],
+        child_name: str,
+        persona: PersonaType,
+        theme: str,
+        semaphore: asyncio.Semaphore
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream one shard, yielding each message once parsed; retries only missing days."""
+        pending = list(days)
+        attempts = settings.generate_days_shard_retries + 1
+
+        for attempt in range(1, attempts + 1):
+            try:
+                async with semaphore:
+                    parser = JsonArrayStreamParser()
+                    async for chunk in openai_client.create_chat_completion(
+                        self._build_daily_prompt(pending, child_name, persona, theme),
+                        stream=True,
+                        response_format=self._daily_response_format(len(pending))
+                    ):
+                        for item in parser.feed(chunk):
+                            message = DailyMessage.model_validate(item).model_dump()
+                            if message["day"] in pending:
+                                pending.remove(message["day"])
+                                yield message
+
+                if not pending:
+                    return
+                raise ValueError(f"Response ended without days {pending}")
+
+            except CircuitOpenError:
+                logger.warning(f"Streaming day shard {days[0]}-{days[-1]} skipped, OpenAI circuit open")
+                break
+
+            except Exception as e:
+                logger.warning(
+                    f"Streaming day shard {days[0]}-{days[-1]} failed "
+                    f"(attempt {attempt}/{attempts}): {e}"
+                )
+                if attempt < attempts:
+                    await asyncio.sleep(0.5 * attempt)
+
+        logger.error(f"Streaming day shard {days[0]}-{days[-1]} failed, using fallback")
+        for message in self._get_fallback_messages(child_name):
+            if message["day"] in pending:
+                yield message
+
+    async def _generate_day_shard(
+        self,
+        days: List[int],
+        child_name: str,
+        persona: PersonaType,
+        theme: str,
+        semaphore: asyncio.Semaphore
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Generate and validate one shard of days, with retries.
+
+        Returns the messages and whether they were generated (False if the
+        shard fell back to placeholders).
+        """
+        messages = self._build_daily_prompt(days, child_name, persona, theme)
+        attempts = settings.generate_days_shard_retries + 1
+
+        for attempt in range(1, attempts + 1):
+            try:
+                async with semaphore:
+                    response = ResponseAccumulator()
+                    async for chunk in openai_client.create_chat_completion(
+                        messages,
+                        stream=False,
+                        response_format=self._daily_response_format(len(days))
+                    ):
+                        response.add(chunk)
+
+                if response.ttft is not None:
+                    metrics.chat_stage_seconds.observe(response.ttft, stage="day_shard_upstream")
+                return self._parse_generated_messages(response.text(), days), True
+
+            except CircuitOpenError:
+                logger.warning(f"Day shard {days[0]}-{days[-1]} skipped, OpenAI circuit open")
+                break
+
+            except Exception as e:
+                logger.warning(
+                    f"Day shard {days[0]}-{days[-1]} failed (attempt {attempt}/{attempts}): {e}"
+                )
+                if attempt < attempts:
+                    await asyncio.sleep(0.5 * attempt)
+
+        logger.error(f"Day shard {days[0]}-{days[-1]} failed, using fallback")
+        fallback = [
+            message for message in self._get_fallback_messages(child_name)
+            if message["day"] in days
+        ]
+        return fallback, False
+
+    def _day_shards(self, shard_size: int) -> List[List[int]]:
+        """Split days 1-24 into consecutive shards."""
+        shard_size = max(1, min(shard_size, 24))
+        return [list(range(start, min(start + shard_size, 25))) for start in range(1, 25, shard_size)]
+
+    def _build_daily_prompt(
+        self,
+        days: List[int],
+        child_name: str,
+        persona: PersonaType,
+        theme: str
+    ) -> List[Dict[str, Any]]:
+        """Build the chat messages asking for one shard of advent messages."""
+        day_range = self._describe_days(days)
+
+        system_prompt = f"""You are creating magical advent calendar messages for {child_name}.
 Each message should be warm, age-appropriate, and personalized.
 Theme: {theme}
 Persona style: {persona.value}
@@ -90,42 +455,76 @@ Create messages that are:
 - Varied in tone and content
 - Suitable for daily reveals throughout December
 
-Return exactly 24 messages, one for each day of advent."""
+Return exactly {len(days)} messages, one for each of {day_range} of advent."""
 
-            prompt = f"""Create 24 unique, magical advent calendar messages for {child_name}.
+        prompt = f"""Create {len(days)} unique, magical advent calendar messages for {child_name}, for {day_range}.
 Each message should be personalized, warm, and exciting.
 Make them varied - some playful, some reflective, some adventurous.
 Keep each message to 2-3 sentences maximum.
 
-Format as a JSON array of objects with 'day', 'title', and 'content' fields."""
+Respond with a JSON object with a 'messages' array of objects with 'day', 'title', 'content' and 'tone' fields."""
 
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ]
-
-            response = ""
-            async for chunk in openai_client.create_chat_completion(messages, stream=False):
-                response += chunk
-
-            # Parse the response (this would need proper JSON parsing in production)
-            # For now, return a structured response
-            return self._parse_generated_messages(response, child_name)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
 
-        except Exception as e:
-            logger.error(f"Daily message generation error: {e}")
-            return self._get_fallback_messages(child_name)
+    def _describe_days(self, days: List[int]) -> str:
+        """Human-readable description of a set of day numbers for prompts."""
+        if len(days) == 1:
+            return f"day {days[0]}"
+        if days == list(range(days[0], days[-1] + 1)):
+            return f"days {days[0]} to {days[-1]}"
+        return "days " + ", ".join(str(day) for day in days)
+
+    def _daily_response_format(self, count: int) -> Dict[str, Any]:
+        """Response format constraining the model to the DailyMessage shape."""
+        if not settings.openai_structured_outputs:
+            return {"type": "json_object"}
+
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "daily_messages",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "messages": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "day": {"type": "integer"},
+                                    "title": {"type": "string"},
+                                    "content": {"type": "string"},
+                                    "tone": {"type": "string"},
+                                },
+                                "required": ["day", "title", "content", "tone"],
+                                "additionalProperties": False,
+                            },
+                        },
+                    },
+                    "required": ["messages"],
+                    "additionalProperties": False,
+                },
+            },
+        }
+
+    async def _embed_message(self, user_message: str) -> List[float]:
+        """Embed a user message; repeats are served from the batcher's cache."""
+        [embedding] = await openai_client.embed([user_message])
+        return embedding
 
     async def _get_relevant_memories(self, child_id: str, user_message: str) -> List[Dict[str, Any]]:
         """Retrieve relevant historical memories for context."""
         try:
-            # In a full implementation, this would:
-            # 1. Create an embedding for the user_message
-            # 2. Search the vector database for similar memories
-            # 3. Return the most relevant chunks
-
-            # For now, return empty list (no long-term memory integration yet)
-            return []
+            query_embedding = await self._embed_message(user_message)
+            chunks = await memory_manager.search_long_term_memory(child_id, query_embedding)
+            return [
+                {"content": memory_manager.format_chunk(chunk.get("messages", []))}
+                for chunk in chunks
+            ]
 
         except Exception as e:
             logger.error(f"Memory retrieval error: {e}")
@@ -137,50 +536,43 @@ Format as a JSON array of objects with 'day', 'title', and 'content' fields."""
         history: List[Dict[str, Any]],
         relevant_memories: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
-        """Build the messages array for OpenAI API."""
-
-        messages = [{"role": "system", "content": system_prompt}]
-
-        # Add relevant historical context if available
-        if relevant_memories:
-            context = "Previous conversations with your child:\n"
-            for memory in relevant_memories[:2]:  # Limit to avoid token limits
-                context += f"{memory.get('content', '')}\n"
-            messages.append({"role": "system", "content": context})
+        """Build the messages array for OpenAI API within the context token budget."""
+        return self.context_assembler.assemble(system_prompt, history, relevant_memories)
 
-        # Add conversation history (limit to recent messages)
-        recent_history = history[-10:] if len(history) > 10 else history
-        messages.extend(recent_history)
-
-        return messages
-
-    async def _update_long_term_memory(self, child_id: str, history: List[Dict[str, Any]]) -> None:
-        """Update long-term memory with new conversation data."""
+    async def _update_long_term_memory(self, child_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Append a turn's new messages to long-term memory."""
         try:
-            # In a full implementation, this would:
-            # 1. Create embeddings for new messages
-            # 2. Store in vector database
-            # 3. Update memory chunks
-
-            # For now, just log that we'd update memory
-            logger.debug(f"Would update long-term memory for child {child_id}")
+            chunks = memory_manager.chunk_messages(messages)
+            embeddings = await openai_client.embed(
+                [memory_manager.format_chunk(chunk) for chunk in chunks]
+            )
+            await memory_manager.store_long_term_memory(child_id, messages, embeddings)
 
         except Exception as e:
             logger.error(f"Long-term memory update error: {e}")
 
-    def _parse_generated_messages(self, response: str, child_name: str) -> List[Dict[str, Any]]:
-        """Parse the AI-generated messages into structured format."""
-        # This is a simplified parser - in production you'd use proper JSON parsing
-        messages = []
-        lines = response.split('\n')
-
-        for i in range(1, 25):  # Days 1-24
-            messages.append({
-                "day": i,
-                "title": f"Day {i}",
-                "content": f"A magical message for {child_name} on day {i}!",
-                "tone": "exciting"
-            })
+    async def _persist_turn(self, job: PersistenceJob) -> None:
+        """Write a completed turn to short-term and long-term memory and the response cache."""
+        with metrics.chat_stage_seconds.time(stage="persistence"):
+            await memory_manager.append_short_term_memory(job.child_id, job.session_id, job.new_messages)
+            await self._update_long_term_memory(job.child_id, job.new_messages)
+            for scope, message, reply in job.cached_replies:
+                # put awaits the embedding, so the lambda sees this iteration's message
+                await self.response_cache.put(
+                    scope, message, reply, embed=lambda: self._embed_message(message)
+                )
+
+    def _parse_generated_messages(self, response: str, days: List[int]) -> List[Dict[str, Any]]:
+        """Parse and validate the AI-generated messages for the expected days."""
+        payload = json.loads(response)
+        items = payload.get("messages", []) if isinstance(payload, dict) else payload
+
+        messages = [DailyMessage.model_validate(item).model_dump() for item in items]
+        messages.sort(key=lambda message: message["day"])
+
+        received = [message["day"] for message in messages]
+        if received != days:
+            raise ValueError(f"Expected days {days}, got {received}")
 
         return messages
 
@@ -0,0 +1,130 @@
+"""Token-budget-aware assembly of the prompt context for chat turns."""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Tokens the chat format adds around each message (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when available, caching counts by text.
+
+    Models tiktoken does not know use cl100k_base. Falls back, with a warning,
+    to a ~4 characters per token estimate if tiktoken or its encoding file is
+    unavailable.
+    """
+
+    def __init__(self, model: str, cache_size: int = 4096):
+        self._encoding = self._load_encoding(model)
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def count(self, text: str) -> int:
+        """Number of tokens in a piece of text."""
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            return cached
+
+        if self._encoding is not None:
+            tokens = len(self._encoding.encode(text, disallowed_special=()))
+        else:
+            tokens = (len(text) + 3) // 4
+
+        self._cache[text] = tokens
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return tokens
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """Tokens for a chat message, memoized on the message as `token_count`."""
+        cached = message.get("token_count")
+        if isinstance(cached, int):
+            return cached
+
+        tokens = self.count(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+        message["token_count"] = tokens
+        return tokens
+
+    def _load_encoding(self, model: str) -> Optional[Any]:
+        try:
+            import tiktoken
+        except ImportError:
+            logger.warning("tiktoken not installed, context budget uses estimated token counts")
+            return None
+
+        try:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The encoding file is downloaded on first use (cached in TIKTOKEN_CACHE_DIR)
+            logger.warning(f"Failed to load tiktoken encoding, context budget uses estimated token counts: {e}")
+            return None
+
+
+class ContextAssembler:
+    """Fills a token budget in priority order: system prompt, memories, recent turns.
+
+    The system prompt and the latest message are always included. Memories are
+    added best first while they fit, then history is added newest first, so
+    the oldest turns are the first to be dropped.
+    """
+
+    def __init__(self, counter: TokenCounter, token_budget: int, max_memories: int = 5):
+        self.counter = counter
+        self.token_budget = token_budget
+        self.max_memories = max_memories
+
+    def assemble(
+        self,
+        system_prompt: str,
+        history: List[Dict[str, Any]],
+        relevant_memories: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Build the OpenAI messages array within the token budget."""
+        messages = [{"role": "system", "content": system_prompt}]
+        remaining = self.token_budget - self.counter.count(system_prompt) - MESSAGE_OVERHEAD_TOKENS
+
+        # Reserve room for the message being answered
+        latest = history[-1:] if history else []
+        for message in latest:
+            remaining -= self.counter.count_message(message)
+
+        # Add relevant historical context if it fits
+        header = "Previous conversations with your child:\n"
+        context = ""
+        context_tokens = self.counter.count(header) + MESSAGE_OVERHEAD_TOKENS
+        for memory in relevant_memories[:self.max_memories]:
+            snippet = f"{memory.get('content', '')}\n"
+            tokens = self.counter.count(snippet)
+            if context_tokens + tokens > remaining:
+                break
+            context += snippet
+            context_tokens += tokens
+
+        if context:
+            messages.append({"role": "system", "content": header + context})
+            remaining -= context_tokens
+
+        # Add conversation history, newest first, while it fits
+        recent: List[Dict[str, Any]] = []
+        for message in reversed(history[:-1]):
+            tokens = self.counter.count_message(message)
+            if tokens > remaining:
+                break
+            recent.append(message)
+            remaining -= tokens
+        recent.reverse()
+
+        messages.extend(self._for_api(message) for message in recent + latest)
+        return messages
+
+    def _for_api(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Strip bookkeeping fields (e.g. token_count) before sending upstream."""
+        return {"role": message["role"], "content": message.get("content") or ""}
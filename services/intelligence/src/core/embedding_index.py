@@ -0,0 +1,469 @@
+"""In-memory vector index over long-term memory chunk embeddings."""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import structlog
+
+from .ann_index import IVFQuantizedIndex
+
+logger = structlog.get_logger(__name__)
+
+
+class ChildEmbeddingIndex:
+    """Contiguous float32 embedding matrix with precomputed norms for one child."""
+
+    _INITIAL_CAPACITY = 16
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors = np.zeros((self._INITIAL_CAPACITY, dim), dtype=np.float32)
+        self._norms = np.zeros(self._INITIAL_CAPACITY, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def upsert(self, key: str, embedding: Sequence[float]) -> bool:
+        """Insert or replace the vector stored under a chunk key."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            logger.warning(
+                f"Skipping embedding for {key}: expected dim {self.dim}, got {vector.shape}"
+            )
+            return False
+
+        position = self._positions.get(key)
+        if position is None:
+            position = len(self._keys)
+            self._ensure_capacity(position + 1)
+            self._keys.append(key)
+            self._positions[key] = position
+
+        self._vectors[position] = vector
+        self._norms[position] = np.linalg.norm(vector)
+        return True
+
+    def remove(self, key: str) -> bool:
+        """Remove a chunk key, moving the last row into its slot."""
+        position = self._positions.pop(key, None)
+        if position is None:
+            return False
+
+        last = len(self._keys) - 1
+        if position != last:
+            last_key = self._keys[last]
+            self._vectors[position] = self._vectors[last]
+            self._norms[position] = self._norms[last]
+            self._keys[position] = last_key
+            self._positions[last_key] = position
+
+        self._keys.pop()
+        return True
+
+    def search(
+        self,
+        query_embedding: Union[Sequence[float], np.ndarray],
+        limit: int,
+        threshold: float
+    ) -> List[Tuple[str, float]]:
+        """Return up to `limit` (key, similarity) pairs above the threshold, best first."""
+        size = len(self._keys)
+        if size == 0 or limit <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape != (self.dim,):
+            logger.warning(f"Query dim {query.shape} does not match index dim {self.dim}")
+            return []
+
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0:
+            return []
+
+        norms = self._norms[:size]
+        dots = self._vectors[:size] @ query
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(norms > 0, dots / (norms * query_norm), 0.0)
+
+        candidates = np.flatnonzero(scores > threshold)
+        if candidates.size > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [(self._keys[i], float(scores[i])) for i in ranked]
+
+    def entries(self) -> Tuple[List[str], np.ndarray]:
+        """Copies of the stored keys and their vectors, row for row."""
+        size = len(self._keys)
+        return list(self._keys), self._vectors[:size].copy()
+
+    def _ensure_capacity(self, required: int) -> None:
+        """Grow the backing arrays geometrically so appends stay amortized O(1)."""
+        capacity = self._vectors.shape[0]
+        if required <= capacity:
+            return
+
+        new_capacity = max(required, capacity * 2)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:capacity] = self._vectors
+        norms = np.zeros(new_capacity, dtype=np.float32)
+        norms[:capacity] = self._norms
+        self._vectors = vectors
+        self._norms = norms
+
+
+class AnnChildIndex:
+    """A child's IVF index plus an exact index of vectors written since it was built.
+
+    The IVF part is immutable: overwritten or removed keys are masked out of
+    it and new vectors go to the exact "delta" index. Once the delta and the
+    masked rows grow past a fraction of the IVF size, EmbeddingIndex rebuilds.
+    """
+
+    def __init__(self, base: IVFQuantizedIndex, nprobe: int = 8, rerank_factor: int = 4):
+        self.base = base
+        self.dim = base.dim
+        self.nprobe = nprobe
+        self.rerank_factor = rerank_factor
+        self.delta = ChildEmbeddingIndex(base.dim)
+        self._alive = np.ones(len(base), dtype=bool)
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self.base) - self._dead + len(self.delta)
+
+    @property
+    def stale_fraction(self) -> float:
+        """Masked plus delta vectors relative to the IVF size."""
+        return (self._dead + len(self.delta)) / max(1, len(self.base))
+
+    def upsert(self, key: str, embedding: Sequence[float]) -> bool:
+        self._mask(key)
+        return self.delta.upsert(key, embedding)
+
+    def remove(self, key: str) -> bool:
+        removed = self.delta.remove(key)
+        return self._mask(key) or removed
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        limit: int,
+        threshold: float
+    ) -> List[Tuple[str, float]]:
+        """Approximate search of the IVF part merged with an exact search of the delta."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape != (self.dim,):
+            logger.warning(f"Query dim {query.shape} does not match index dim {self.dim}")
+            return []
+        norm = float(np.linalg.norm(query))
+        if norm == 0 or limit <= 0:
+            return []
+
+        hits = self.base.search(
+            query / norm, limit, threshold,
+            nprobe=self.nprobe,
+            rerank_factor=self.rerank_factor,
+            alive=self._alive if self._dead else None
+        )
+        if len(self.delta):
+            hits = sorted(hits + self.delta.search(query, limit, threshold), key=lambda hit: -hit[1])
+        return hits[:limit]
+
+    def entries(self) -> Tuple[List[str], np.ndarray]:
+        """Live keys and vectors from both parts, for a rebuild."""
+        rows = np.flatnonzero(self._alive)
+        delta_keys, delta_vectors = self.delta.entries()
+        keys = [self.base.keys[row] for row in rows] + delta_keys
+        return keys, np.concatenate([np.asarray(self.base.vectors[rows]), delta_vectors])
+
+    def _mask(self, key: str) -> bool:
+        row = self.base.positions.get(key)
+        if row is None or not self._alive[row]:
+            return False
+        self._alive[row] = False
+        self._dead += 1
+        return True
+
+
+ChildIndex = Union[ChildEmbeddingIndex, AnnChildIndex]
+
+
+class EmbeddingIndex:
+    """Per-child registry of embedding indexes, loaded lazily from the memory store.
+
+    Children with at least `ann_min_vectors` embeddings get an approximate
+    IVF index; smaller ones are scanned exactly. With `ann_dir` set, IVF
+    indexes are saved there and memory-mapped, both right after a build and
+    on the next load (when only chunks written since the save need to be
+    fetched from Redis). Only the centroids and per-row scales stay on the
+    heap; the codes and the float32 vectors used to re-rank are file pages
+    the kernel can drop. Without `ann_dir` all of it stays on the heap.
+
+    Each process saves under its own `worker-<pid>` subdirectory of `ann_dir`,
+    so workers on one host never share files. A child's file is replaced on
+    rebuild and deleted when the child is dropped; `close` removes the
+    process's directory, and directories left by dead processes are removed
+    on first use.
+    """
+
+    def __init__(
+        self,
+        ann_min_vectors: int = 0,
+        ann_dir: Optional[str] = None,
+        nprobe: int = 8,
+        rerank_factor: int = 4,
+        rebuild_fraction: float = 0.2
+    ):
+        self.ann_min_vectors = ann_min_vectors
+        self.ann_dir = ann_dir
+        self.nprobe = nprobe
+        self.rerank_factor = rerank_factor
+        self.rebuild_fraction = rebuild_fraction
+        self._children: Dict[str, ChildIndex] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._swept_pid: Optional[int] = None
+        # Writes made while a child's rebuild runs, replayed onto the result
+        self._rebuild_writes: Dict[str, List[Tuple[str, Optional[Sequence[float]]]]] = {}
+
+    def is_loaded(self, child_id: str) -> bool:
+        """Whether the child's chunks have already been loaded into memory."""
+        return child_id in self._children
+
+    def size(self, child_id: str) -> int:
+        """Vectors in a loaded child index (0 if not loaded)."""
+        index = self._children.get(child_id)
+        return len(index) if index is not None else 0
+
+    def load_child(
+        self,
+        child_id: str,
+        entries: Sequence[Tuple[str, Optional[Sequence[float]]]],
+        loaded_at: Optional[float] = None
+    ) -> ChildEmbeddingIndex:
+        """Build (or rebuild) a child's exact index from (chunk_key, embedding) pairs.
+
+        `loaded_at` is when the entries were read from the store; a later IVF
+        build records it so chunks rewritten after it are refetched on reload.
+        An IVF index is only built by `rebuild`, off the event loop.
+        """
+        dim = next((len(embedding) for _, embedding in entries if embedding), 0)
+        index = ChildEmbeddingIndex(dim)
+        for key, embedding in entries:
+            if embedding:
+                index.upsert(key, embedding)
+
+        self._children[child_id] = index
+        self._loaded_at[child_id] = loaded_at or time.time()
+        logger.debug(f"Loaded embedding index for child {child_id} with {len(index)} vectors")
+        return index
+
+    def open_persisted(
+        self,
+        child_id: str,
+        written_at: Dict[str, float],
+        loaded_at: Optional[float] = None
+    ) -> Optional[List[str]]:
+        """Memory-map a child's saved IVF index, if there is one.
+
+        `written_at` maps each live chunk key to its write time. Keys the saved
+        index lacks, or that were rewritten after it was built, are returned
+        for the caller to fetch and upsert; keys no longer live are masked.
+        Returns None if no usable index is saved.
+        """
+        path = self._ivf_path(child_id)
+        if path is None or not os.path.exists(path):
+            return None
+
+        try:
+            base = IVFQuantizedIndex.load(path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable ANN index for child {child_id}: {e}")
+            return None
+
+        index = AnnChildIndex(base, nprobe=self.nprobe, rerank_factor=self.rerank_factor)
+        for key in base.keys:
+            if written_at.get(key, float("inf")) > base.built_at:
+                index.remove(key)
+
+        self._children[child_id] = index
+        self._loaded_at[child_id] = loaded_at or time.time()
+        return [
+            key for key, written in written_at.items()
+            if key not in base.positions or written > base.built_at
+        ]
+
+    def upsert(self, child_id: str, key: str, embedding: Optional[Sequence[float]]) -> None:
+        """Keep a loaded child index in sync with a chunk write."""
+        index = self._children.get(child_id)
+        if index is None:
+            # Not loaded yet; the next search will load it from the store.
+            return
+
+        writes = self._rebuild_writes.get(child_id)
+        if writes is not None:
+            writes.append((key, embedding))
+
+        if not embedding:
+            index.remove(key)
+            return
+
+        if len(index) == 0 and index.dim != len(embedding):
+            index = ChildEmbeddingIndex(len(embedding))
+            self._children[child_id] = index
+
+        index.upsert(key, embedding)
+
+    def needs_rebuild(self, child_id: str) -> bool:
+        """Whether a child's index should be (re)built as IVF."""
+        index = self._children.get(child_id)
+        if index is None or not self.ann_min_vectors or child_id in self._rebuild_writes:
+            return False
+        if isinstance(index, AnnChildIndex):
+            return index.stale_fraction > self.rebuild_fraction
+        return len(index) >= self.ann_min_vectors
+
+    async def rebuild(self, child_id: str) -> None:
+        """Rebuild a child's IVF index off the event loop from its live vectors."""
+        current = self._children.get(child_id)
+        if current is None:
+            return
+
+        built_at = self._loaded_at.get(child_id, time.time())
+        keys, vectors = current.entries()
+        if not keys:
+            return
+
+        writes = self._rebuild_writes[child_id] = []
+        try:
+            base = await asyncio.get_running_loop().run_in_executor(
+                None, self._build_ivf, child_id, keys, vectors, built_at
+            )
+        finally:
+            del self._rebuild_writes[child_id]
+
+        if self._children.get(child_id) is not current:
+            # Evicted or reloaded while building
+            return
+
+        index = AnnChildIndex(base, nprobe=self.nprobe, rerank_factor=self.rerank_factor)
+        for key, embedding in writes:
+            if embedding:
+                index.upsert(key, embedding)
+            else:
+                index.remove(key)
+        self._children[child_id] = index
+
+    def search(
+        self,
+        child_id: str,
+        query_embedding: Sequence[float],
+        limit: int,
+        threshold: float
+    ) -> List[Tuple[str, float]]:
+        """Score a query against a loaded child index."""
+        index = self._children.get(child_id)
+        if index is None:
+            return []
+        return index.search(query_embedding, limit, threshold)
+
+    def evict(self, child_id: str) -> None:
+        """Drop a child's index from memory; a saved IVF index is reopened on reload."""
+        self._children.pop(child_id, None)
+        self._loaded_at.pop(child_id, None)
+
+    def drop(self, child_id: str) -> None:
+        """Drop a child's index from memory and delete its saved IVF index."""
+        self.evict(child_id)
+        path = self._ivf_path(child_id)
+        if path is not None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to delete ANN index for child {child_id}: {e}")
+
+    def close(self) -> None:
+        """Drop every index and delete this process's saved IVF indexes."""
+        self._children.clear()
+        self._loaded_at.clear()
+        directory = self._process_dir()
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _build_ivf(
+        self,
+        child_id: str,
+        keys: List[str],
+        vectors: np.ndarray,
+        built_at: float
+    ) -> IVFQuantizedIndex:
+        """Build an IVF index; when persisting, save it and return the memory-mapped copy."""
+        started = time.perf_counter()
+        base = IVFQuantizedIndex.build(keys, vectors, built_at=built_at)
+
+        path = self._ivf_path(child_id)
+        size = None
+        if path is not None:
+            try:
+                size = base.save(path)
+                base = IVFQuantizedIndex.load(path)
+            except OSError as e:
+                logger.warning(f"Keeping ANN index for child {child_id} in memory, save failed: {e}")
+
+        logger.info(
+            f"Built ANN index for child {child_id}",
+            vectors=len(keys),
+            lists=base.nlist,
+            bytes=size,
+            build_ms=int((time.perf_counter() - started) * 1000)
+        )
+        return base
+
+    def _process_dir(self) -> Optional[str]:
+        # Resolved per call: the index may be created before the worker forks
+        if not self.ann_dir:
+            return None
+        return os.path.join(self.ann_dir, f"worker-{os.getpid()}")
+
+    def _ivf_path(self, child_id: str) -> Optional[str]:
+        directory = self._process_dir()
+        if directory is None:
+            return None
+        self._sweep_dead_process_dirs()
+        name = hashlib.sha256(child_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(directory, f"{name}.ivf")
+
+    def _sweep_dead_process_dirs(self) -> None:
+        """Once per process, delete directories left by processes that have exited."""
+        pid = os.getpid()
+        if not self.ann_dir or self._swept_pid == pid:
+            return
+        self._swept_pid = pid
+        try:
+            names = os.listdir(self.ann_dir)
+        except OSError:
+            return
+
+        for name in names:
+            owner = name[len("worker-"):]
+            if not name.startswith("worker-") or not owner.isdigit():
+                continue
+            if int(owner) == pid:
+                # A previous process with our pid (e.g. a restarted container)
+                shutil.rmtree(os.path.join(self.ann_dir, name), ignore_errors=True)
+                continue
+            try:
+                os.kill(int(owner), 0)
+            except ProcessLookupError:
+                shutil.rmtree(os.path.join(self.ann_dir, name), ignore_errors=True)
+            except OSError:
+                pass  # Alive, owned by another user
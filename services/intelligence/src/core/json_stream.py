@@ -0,0 +1,70 @@
+"""Incremental parsing of JSON arrays from streamed model output."""
+
+import json
+from typing import Any, List, Optional
+
+
+class JsonArrayStreamParser:
+    """Extracts elements of the first JSON array in a stream as soon as each completes.
+
+    Text is fed in arbitrary fragments (e.g. streamed tokens). Only the element
+    currently being read is buffered, so the full response is never held in
+    memory. The array may be top-level or nested in a wrapper object such as
+    ``{"messages": [...]}``. Object and array elements are supported; scalar
+    elements are skipped.
+    """
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._array_depth: Optional[int] = None
+        self._in_string = False
+        self._escaped = False
+        self._element: List[str] = []
+        self._capturing = False
+        self.done = False
+
+    def feed(self, text: str) -> List[Any]:
+        """Consume a fragment and return any elements it completed."""
+        completed: List[Any] = []
+
+        for char in text:
+            if self.done:
+                break
+
+            if self._capturing:
+                self._element.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+
+            elif char in "{[":
+                if self._array_depth is None and char == "[":
+                    self._depth += 1
+                    self._array_depth = self._depth
+                    continue
+
+                if self._depth == self._array_depth and not self._capturing:
+                    self._capturing = True
+                    self._element = [char]
+                self._depth += 1
+
+            elif char in "}]":
+                self._depth -= 1
+
+                if self._capturing and self._depth == self._array_depth:
+                    completed.append(json.loads("".join(self._element)))
+                    self._element = []
+                    self._capturing = False
+                elif self._array_depth is not None and self._depth < self._array_depth:
+                    self.done = True
+
+        return completed
@@ -0,0 +1,246 @@
+"""Background compaction of long-term memory into summarized chunks."""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+import structlog
+
+from . import metrics
+
+logger = structlog.get_logger(__name__)
+
+compaction_chunks = metrics.registry.counter(
+    "memory_compaction_chunks_total",
+    "Long-term memory chunks removed by compaction, by action (merged, evicted, expired)",
+    labelnames=("action",)
+)
+compaction_reclaimed_bytes = metrics.registry.counter(
+    "memory_compaction_reclaimed_bytes_total",
+    "Redis bytes freed by compaction, net of the summaries written"
+)
+
+# Delete the lock only while it still holds this run's token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+SUMMARY_PROMPT = (
+    "You keep the long-term memory of a parent persona chatting with their child. "
+    "Summarize the conversations below in a short paragraph. Keep names, likes and "
+    "dislikes, worries, events, plans and promises; drop greetings and small talk."
+)
+
+
+@dataclass
+class CompactionReport:
+    """What a compaction pass did."""
+    children: int = 0
+    merged: int = 0  # Chunks folded into summaries
+    summaries: int = 0
+    evicted: int = 0  # Chunks dropped to keep a child under the cap
+    expired: int = 0  # Index entries of chunks Redis had already expired
+    reclaimed_bytes: int = 0
+
+    def add(self, other: "CompactionReport") -> None:
+        self.children += other.children
+        self.merged += other.merged
+        self.summaries += other.summaries
+        self.evicted += other.evicted
+        self.expired += other.expired
+        self.reclaimed_bytes += other.reclaimed_bytes
+
+
+class MemoryCompactor:
+    """Periodically merges old, rarely retrieved chunks into summaries.
+
+    For each child, chunks older than `min_age_seconds` that searches have
+    returned at most `max_access_count` times, other than earlier summaries,
+    are taken oldest first, in groups of `group_size`. Each group is
+    summarized by the chat model, the summary is embedded and stored as a new
+    chunk, and then the group is deleted. If a child still has more than `max_chunks` chunks, the least
+    retrieved (then oldest) are dropped. This keeps each child's Redis
+    footprint and in-memory index, and so search cost, bounded.
+
+    A per-child Redis lock keeps workers from compacting the same child at
+    once. A run that outlives its lock stops before its next group, and only
+    releases the lock if it still holds it. The summary is written before the
+    originals are deleted, so an interrupted pass can duplicate but never
+    lose memories.
+    """
+
+    def __init__(
+        self,
+        memory_manager: Any,
+        openai_client: Any,
+        interval_seconds: float = 3600.0,
+        min_age_seconds: float = 7 * 24 * 60 * 60,
+        max_access_count: int = 1,
+        group_size: int = 8,
+        max_chunks: int = 500,
+        summary_max_tokens: int = 300,
+        lock_seconds: int = 300
+    ):
+        self.memory_manager = memory_manager
+        self.openai_client = openai_client
+        self.interval_seconds = interval_seconds
+        self.min_age_seconds = min_age_seconds
+        self.max_access_count = max_access_count
+        self.group_size = max(2, group_size)
+        self.max_chunks = max_chunks
+        self.summary_max_tokens = summary_max_tokens
+        self.lock_seconds = lock_seconds
+        self._release_lock = memory_manager.redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Run compaction passes periodically on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Memory compactor started, every {self.interval_seconds:.0f}s")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> CompactionReport:
+        """Prune expired index entries, then compact every child with long-term memory."""
+        started = time.perf_counter()
+        report = CompactionReport(expired=await self.memory_manager.cleanup_expired_memory())
+        compaction_chunks.inc(report.expired, action="expired")
+
+        async for child_id, _ in self.memory_manager.iter_children():
+            try:
+                report.add(await self.compact_child(child_id))
+            except Exception as e:
+                logger.error(f"Memory compaction failed for child {child_id}: {e}")
+
+        logger.info(
+            "Memory compaction pass finished",
+            children=report.children,
+            merged=report.merged,
+            summaries=report.summaries,
+            evicted=report.evicted,
+            expired=report.expired,
+            reclaimed_bytes=report.reclaimed_bytes,
+            elapsed_s=round(time.perf_counter() - started, 2)
+        )
+        return report
+
+    async def compact_child(self, child_id: str) -> CompactionReport:
+        """Merge and cap one child's chunks; does nothing if another worker holds its lock."""
+        report = CompactionReport()
+        lock_key = f"memory:{child_id}:compaction_lock"
+        token = uuid.uuid4().hex
+        redis_client = self.memory_manager.redis_client
+        if not await redis_client.set(lock_key, token, nx=True, ex=self.lock_seconds):
+            return report
+
+        try:
+            stats = await self.memory_manager.chunk_stats(child_id)
+            cutoff = time.time() - self.min_age_seconds
+            eligible = [
+                chunk.chunk_id for chunk in stats
+                if chunk.written_at <= cutoff and chunk.access_count <= self.max_access_count
+            ]
+            # Summaries are not summarized again, which would blur them a little
+            # more on every pass; expired chunks have nothing to merge
+            candidates = [
+                (chunk_id, chunk)
+                for chunk_id, chunk in zip(eligible, await self.memory_manager.get_chunks(child_id, eligible))
+                if chunk and chunk.get("kind") != "summary"
+            ]
+
+            merged_ids: Set[str] = set()
+            for start in range(0, len(candidates) - 1, self.group_size):
+                group = candidates[start:start + self.group_size]
+                if len(group) < 2:
+                    break
+                if await redis_client.get(lock_key) != token:
+                    logger.warning(f"Compaction lock for child {child_id} expired mid-run, stopping")
+                    break
+                group_ids = [chunk_id for chunk_id, _ in group]
+                written = await self._merge(child_id, group_ids, [chunk for _, chunk in group])
+                if written is None:
+                    continue
+                freed = await self.memory_manager.delete_chunks(child_id, group_ids)
+                merged_ids.update(group_ids)
+                report.merged += len(group)
+                report.summaries += 1
+                report.reclaimed_bytes += freed - written
+
+            remaining = len(stats) - len(merged_ids) + report.summaries
+            if remaining > self.max_chunks and await redis_client.get(lock_key) == token:
+                survivors = [chunk for chunk in stats if chunk.chunk_id not in merged_ids]
+                survivors.sort(key=lambda chunk: (chunk.access_count, chunk.written_at))
+                evicted = [chunk.chunk_id for chunk in survivors[:remaining - self.max_chunks]]
+                report.reclaimed_bytes += await self.memory_manager.delete_chunks(child_id, evicted)
+                report.evicted += len(evicted)
+
+        finally:
+            await self._release_lock(keys=[lock_key], args=[token])
+
+        if report.merged or report.evicted:
+            report.children = 1
+            compaction_chunks.inc(report.merged, action="merged")
+            compaction_chunks.inc(report.evicted, action="evicted")
+            compaction_reclaimed_bytes.inc(max(0, report.reclaimed_bytes))
+            logger.info(
+                f"Compacted long-term memory for child {child_id}",
+                merged=report.merged,
+                summaries=report.summaries,
+                evicted=report.evicted,
+                reclaimed_bytes=report.reclaimed_bytes
+            )
+        return report
+
+    async def _merge(
+        self,
+        child_id: str,
+        chunk_ids: List[str],
+        chunks: List[Dict[str, Any]]
+    ) -> Optional[int]:
+        """Summarize and store a group of chunks as one; returns the bytes written."""
+        text = "\n\n".join(self.memory_manager.format_chunk(chunk.get("messages", [])) for chunk in chunks)
+        summary = await self._summarize(text)
+        if not summary:
+            return None
+
+        [embedding] = await self.openai_client.embed([summary])
+        written: int = await self.memory_manager.store_long_term_memory(
+            child_id,
+            [{"role": "summary", "content": summary}],
+            [embedding],
+            metadata={
+                "kind": "summary",
+                "summary_of": chunk_ids,
+                "first_created_at": min(chunk.get("created_at", "") for chunk in chunks)
+            }
+        )
+        return written
+
+    async def _summarize(self, text: str) -> str:
+        messages: List[Dict[str, Any]] = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": text}
+        ]
+        parts = []
+        async for part in self.openai_client.create_chat_completion(
+            messages, stream=False, max_tokens=self.summary_max_tokens
+        ):
+            parts.append(part)
+        return "".join(parts).strip()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Memory compaction pass failed: {e}")
@@ -1,100 +1,301 @@
 """Manages short-term and long-term memory for chat sessions."""
 
+import asyncio
 import json
-from typing import List, Dict, Any, Optional
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Dict, Any, Optional, Set, Tuple
 import redis.asyncio as redis
 import structlog
 
 from ..settings import settings
+from . import metrics
+from .cache_invalidation import invalidation_bus
+from .embedding_index import EmbeddingIndex
+from .session_codec import SessionSerializer
+from ..integrations.embedding_batcher import content_hash
 
 logger = structlog.get_logger(__name__)
 
+# Reserves ARGV[1] consecutive chunk ids for a child. A missing counter is
+# seeded past the highest id in the chunk index; if the index is empty too,
+# returns nil so the caller can backfill it from a SCAN and retry.
+ALLOCATE_CHUNK_IDS_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    local ids = redis.call('zrange', KEYS[2], 0, -1)
+    if #ids == 0 and ARGV[3] == '0' then
+        return false
+    end
+    local highest = -1
+    for _, id in ipairs(ids) do
+        local n = tonumber(id)
+        if n and n > highest then highest = n end
+    end
+    redis.call('set', KEYS[1], highest + 1)
+end
+local next_id = redis.call('incrby', KEYS[1], ARGV[1])
+redis.call('expire', KEYS[1], ARGV[2])
+return next_id
+"""
+
+
+@dataclass
+class ChunkStats:
+    """Bookkeeping for one long-term memory chunk."""
+    chunk_id: str
+    key: str
+    written_at: float
+    access_count: int
+    size: int  # Stored bytes
+
 
 class MemoryManager:
     """Manages chat memory using Redis for short-term and long-term storage."""
 
-    def __init__(self):
-        self.redis_client = redis.from_url(settings.redis_url, decode_responses=True)
-
-    async def store_short_term_memory(
+    MGET_BATCH_SIZE = 500
+    SCAN_COUNT = 1000
+
+    def __init__(self) -> None:
+        self.redis_client: Any = redis.from_url(settings.redis_url, decode_responses=True)
+        # Session records are binary encoded, so they use a non-decoding client
+        self.binary_redis_client: Any = redis.from_url(settings.redis_url)
+        self.session_serializer = SessionSerializer(format=settings.session_format)
+        self.embedding_index = EmbeddingIndex(
+            ann_min_vectors=settings.ann_min_vectors,
+            ann_dir=settings.ann_index_dir or None,
+            nprobe=settings.ann_nprobe,
+            rerank_factor=settings.ann_rerank_factor,
+            rebuild_fraction=settings.ann_rebuild_fraction
+        )
+        self._rebuild_tasks: Set["asyncio.Task[None]"] = set()
+        self._index_loads: Dict[str, "asyncio.Future[None]"] = {}
+        # Another worker changed a child's chunks: reload its index on next use
+        invalidation_bus.subscribe("memory_index", self.embedding_index.evict)
+        self._allocate_chunk_ids_script = self.redis_client.register_script(ALLOCATE_CHUNK_IDS_SCRIPT)
+
+    async def close(self) -> None:
+        """Cancel index rebuilds, delete saved indexes and close the Redis connection pools."""
+        for task in list(self._rebuild_tasks):
+            task.cancel()
+        await asyncio.gather(*self._rebuild_tasks, return_exceptions=True)
+        self.embedding_index.close()
+        await self.redis_client.aclose()
+        await self.binary_redis_client.aclose()
+
+    async def append_short_term_memory(
         self,
         child_id: str,
         session_id: str,
-        messages: List[Dict[str, Any]]
+        new_messages: List[Dict[str, Any]]
     ) -> None:
-        """Store the last 5 messages for a chat session."""
-        try:
-            # Keep only the last 5 messages
-            recent_messages = messages[-5:] if len(messages) > 5 else messages
-
-            key = f"session:{session_id}"
-            data = {
-                "child_id": child_id,
-                "messages": recent_messages,
-                "updated_at": self._get_timestamp()
-            }
-
-            await self.redis_client.setex(
-                key,
-                settings.memory_ttl_days * 24 * 60 * 60,  # Convert days to seconds
-                json.dumps(data)
-            )
+        """Append a turn's new messages to the session log, keeping a rolling window.
 
-            logger.debug(f"Stored short-term memory for session {session_id}")
+        The messages and the session metadata are written in one pipeline, so
+        concurrent turns on the same session append rather than overwrite.
+        """
+        try:
+            ttl = settings.memory_ttl_days * 24 * 60 * 60  # Convert days to seconds
+            log_key = self.session_log_key(session_id)
+            meta_key = self.session_meta_key(session_id)
+
+            pipe = self.binary_redis_client.pipeline(transaction=True)
+            if new_messages:
+                pipe.rpush(log_key, *[self.session_serializer.dumps(m) for m in new_messages])
+                pipe.ltrim(log_key, -settings.short_term_memory_window, -1)
+                pipe.expire(log_key, ttl)
+            pipe.hset(meta_key, mapping={"child_id": child_id, "updated_at": self._get_timestamp()})
+            pipe.expire(meta_key, ttl)
+            invalidation_bus.publish_in(pipe, "session", session_id)
+            metrics.redis_round_trips.inc(operation="session_append")
+            await pipe.execute()
+
+            logger.debug(f"Appended {len(new_messages)} messages to session {session_id}")
 
         except Exception as e:
             logger.error(f"Failed to store short-term memory: {e}")
             raise
 
-    async def load_short_term_memory(self, session_id: str) -> List[Dict[str, Any]]:
-        """Load recent messages for a chat session."""
+    async def load_short_term_memory(
+        self,
+        session_id: str,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Load up to `limit` of the most recent messages for a chat session."""
         try:
-            key = f"session:{session_id}"
-            data = await self.redis_client.get(key)
-
-            if data:
-                parsed = json.loads(data)
-                return parsed.get("messages", [])
-            else:
-                return []
+            limit = limit or settings.short_term_memory_window
+
+            # Read the log and any pre-log session blob in one round trip
+            pipe = self.binary_redis_client.pipeline(transaction=False)
+            pipe.lrange(self.session_log_key(session_id), -limit, -1)
+            pipe.get(self._legacy_session_key(session_id))
+            metrics.redis_round_trips.inc(operation="session_load")
+            entries, legacy = await pipe.execute()
+
+            if entries:
+                records = (self.session_serializer.loads(entry) for entry in entries)
+                return [record for record in records if record is not None]
+            if legacy:
+                # Written before the append-only log; see src.tools.migrate_sessions
+                record = self.session_serializer.loads(legacy) or {}
+                messages: List[Dict[str, Any]] = record.get("messages", [])
+                return messages[-limit:]
+            return []
 
         except Exception as e:
             logger.error(f"Failed to load short-term memory: {e}")
             return []
 
+    def session_log_key(self, session_id: str) -> str:
+        """Redis list of a session's recent messages, oldest first."""
+        return f"session:{session_id}:messages"
+
+    def session_meta_key(self, session_id: str) -> str:
+        """Redis hash of session metadata (child_id, updated_at)."""
+        return f"session:{session_id}:meta"
+
+    def _legacy_session_key(self, session_id: str) -> str:
+        """Whole-session blob written before the append-only log."""
+        return f"session:{session_id}"
+
     async def store_long_term_memory(
         self,
         child_id: str,
         messages: List[Dict[str, Any]],
-        embeddings: Optional[List[List[float]]] = None
-    ) -> None:
-        """Store historical chat data for long-term memory retrieval."""
+        embeddings: Optional[List[List[float]]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Append historical chat data as new chunks for long-term memory retrieval.
+
+        Chunks get ids from a per-child counter, so earlier chunks are never
+        overwritten. `metadata` is added to every chunk. Returns the bytes written.
+        """
+        # Store as chunks for better retrieval
+        return await self.store_chunks(child_id, self.chunk_messages(messages), embeddings, metadata)
+
+    async def store_chunks(
+        self,
+        child_id: str,
+        chunks: List[List[Dict[str, Any]]],
+        embeddings: Optional[List[List[float]]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Append already chunked messages (embeddings row for row); returns the bytes written."""
         try:
-            # Store as chunks for better retrieval
-            chunks = self._chunk_messages(messages)
-
-            for i, chunk in enumerate(chunks):
-                key = f"memory:{child_id}:chunk:{i}"
+            if not chunks:
+                return 0
+            ttl = settings.memory_ttl_days * 24 * 60 * 60
+            created_at = self._get_timestamp()
+            index_key = self._chunk_index_key(child_id)
+            chunk_ids = await self._allocate_chunk_ids(child_id, len(chunks))
+
+            # Write every chunk and its index entry in a single round trip
+            pipe = self.redis_client.pipeline(transaction=True)
+            stored = []
+            written = 0
+            now = time.time()
+            for i, (chunk_id, chunk) in enumerate(zip(chunk_ids, chunks)):
+                key = self._chunk_key(child_id, chunk_id)
                 data = {
+                    **(metadata or {}),
                     "child_id": child_id,
-                    "chunk_id": i,
+                    "chunk_id": chunk_id,
                     "messages": chunk,
+                    "content_hash": content_hash(self.format_chunk(chunk)),
                     "embedding": embeddings[i] if embeddings and i < len(embeddings) else None,
-                    "created_at": self._get_timestamp()
+                    "created_at": created_at
                 }
 
-                await self.redis_client.setex(
-                    key,
-                    settings.memory_ttl_days * 24 * 60 * 60,
-                    json.dumps(data)
-                )
+                payload = json.dumps(data)
+                written += len(payload)
+                pipe.setex(key, ttl, payload)
+                pipe.zadd(index_key, {str(chunk_id): now})
+                stored.append((key, data["embedding"]))
+
+            pipe.expire(index_key, ttl)
+            pipe.zadd(self._children_key(), {child_id: now})
+            invalidation_bus.publish_in(pipe, "memory_index", child_id)
+            metrics.redis_round_trips.inc(operation="chunk_store")
+            await pipe.execute()
+
+            for key, embedding in stored:
+                self.embedding_index.upsert(child_id, key, embedding)
+            self._maybe_rebuild_index(child_id)
 
             logger.debug(f"Stored {len(chunks)} long-term memory chunks for child {child_id}")
+            return written
 
         except Exception as e:
             logger.error(f"Failed to store long-term memory: {e}")
             raise
 
+    async def _allocate_chunk_ids(self, child_id: str, count: int) -> List[int]:
+        """Reserve `count` new, never reused chunk ids for a child."""
+        keys = [self._chunk_counter_key(child_id), self._chunk_index_key(child_id)]
+        ttl = settings.memory_ttl_days * 24 * 60 * 60
+        metrics.redis_round_trips.inc(operation="chunk_id_allocate")
+        next_id = await self._allocate_chunk_ids_script(keys=keys, args=[count, ttl, 0])
+        if next_id is None:
+            # No counter and no chunk index yet: index chunks written before
+            # either existed so their ids are not reused
+            await self._list_chunk_keys(child_id)
+            metrics.redis_round_trips.inc(operation="chunk_id_allocate")
+            next_id = await self._allocate_chunk_ids_script(keys=keys, args=[count, ttl, 1])
+        next_id = int(next_id)
+        return list(range(next_id - count, next_id))
+
+    async def chunk_stats(self, child_id: str) -> List[ChunkStats]:
+        """Write time, access count and size of each of a child's chunks, oldest first."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zrange(self._chunk_index_key(child_id), 0, -1, withscores=True)
+        pipe.hgetall(self._chunk_access_key(child_id))
+        metrics.redis_round_trips.inc(operation="chunk_stats")
+        chunk_ids, access = await pipe.execute()
+        if not chunk_ids:
+            return []
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for chunk_id, _ in chunk_ids:
+            pipe.strlen(self._chunk_key(child_id, chunk_id))
+        metrics.redis_round_trips.inc(operation="chunk_stats")
+        sizes = await pipe.execute()
+
+        return [
+            ChunkStats(
+                chunk_id=chunk_id,
+                key=self._chunk_key(child_id, chunk_id),
+                written_at=written_at,
+                access_count=int(access.get(chunk_id, 0)),
+                size=size
+            )
+            for (chunk_id, written_at), size in zip(chunk_ids, sizes)
+        ]
+
+    async def delete_chunks(self, child_id: str, chunk_ids: List[str]) -> int:
+        """Delete chunks and their index entries; returns the bytes freed."""
+        if not chunk_ids:
+            return 0
+
+        keys = [self._chunk_key(child_id, chunk_id) for chunk_id in chunk_ids]
+        pipe = self.redis_client.pipeline(transaction=True)
+        for key in keys:
+            pipe.strlen(key)
+        pipe.delete(*keys)
+        pipe.zrem(self._chunk_index_key(child_id), *chunk_ids)
+        pipe.hdel(self._chunk_access_key(child_id), *chunk_ids)
+        invalidation_bus.publish_in(pipe, "memory_index", child_id)
+        metrics.redis_round_trips.inc(operation="chunk_delete")
+        results = await pipe.execute()
+
+        for key in keys:
+            self.embedding_index.upsert(child_id, key, None)
+        self._maybe_rebuild_index(child_id)
+        return sum(results[:len(keys)])
+
+    async def iter_children(self, batch_size: int = 500) -> AsyncIterator[Tuple[str, float]]:
+        """Yield (child_id, last long-term write time) for every child with chunks."""
+        async for child_id, written_at in self.redis_client.zscan_iter(self._children_key(), count=batch_size):
+            yield child_id, written_at
+
     async def search_long_term_memory(
         self,
         child_id: str,
@@ -103,62 +304,246 @@ class MemoryManager:
     ) -> List[Dict[str, Any]]:
         """Search for relevant historical memories using embeddings."""
         try:
-            # Get all memory chunks for this child
-            pattern = f"memory:{child_id}:chunk:*"
-            keys = await self.redis_client.keys(pattern)
+            await self._ensure_embedding_index(child_id)
+
+            matches = self.embedding_index.search(
+                child_id,
+                query_embedding,
+                limit=limit,
+                threshold=0.7  # Relevance threshold
+            )
 
+            keys = [key for key, _ in matches]
             relevant_chunks = []
+            for key, parsed in zip(keys, await self._read_hits(child_id, keys)):
+                if parsed:
+                    relevant_chunks.append(parsed)
+                else:
+                    # Chunk expired in Redis since the index was loaded
+                    self.embedding_index.upsert(child_id, key, None)
 
-            for key in keys:
-                data = await self.redis_client.get(key)
-                if data:
-                    parsed = json.loads(data)
-                    embedding = parsed.get("embedding")
-
-                    if embedding:
-                        # Calculate cosine similarity
-                        similarity = self._cosine_similarity(query_embedding, embedding)
-                        if similarity > 0.7:  # Relevance threshold
-                            relevant_chunks.append({
-                                "chunk": parsed,
-                                "similarity": similarity
-                            })
-
-            # Sort by similarity and return top results
-            relevant_chunks.sort(key=lambda x: x["similarity"], reverse=True)
-            return [chunk["chunk"] for chunk in relevant_chunks[:limit]]
+            return relevant_chunks
 
         except Exception as e:
             logger.error(f"Failed to search long-term memory: {e}")
             return []
 
-    def _chunk_messages(self, messages: List[Dict[str, Any]], chunk_size: int = 10) -> List[List[Dict[str, Any]]]:
+    async def preload_long_term_memory(self, child_id: str) -> int:
+        """Load a child's embedding index ahead of a search; returns its size."""
+        await self._ensure_embedding_index(child_id)
+        return self.embedding_index.size(child_id)
+
+    async def _ensure_embedding_index(self, child_id: str) -> None:
+        """Load a child's embedding index once, sharing the load between concurrent callers."""
+        if self.embedding_index.is_loaded(child_id):
+            return
+        load = self._index_loads.get(child_id)
+        if load is None:
+            load = asyncio.ensure_future(self._load_embedding_index(child_id))
+            self._index_loads[child_id] = load
+            load.add_done_callback(lambda _: self._index_loads.pop(child_id, None))
+        await asyncio.shield(load)
+
+    async def _load_embedding_index(self, child_id: str) -> None:
+        """Load a child's chunk embeddings into the in-memory index.
+
+        If a saved ANN index exists, only chunks written since it was built
+        are fetched from Redis.
+        """
+        loaded_at = time.time()
+        written_at = await self._list_chunk_keys(child_id)
+
+        missing = self.embedding_index.open_persisted(child_id, written_at, loaded_at=loaded_at)
+        if missing is not None:
+            for key, parsed in zip(missing, await self._mget_json(missing)):
+                self.embedding_index.upsert(child_id, key, parsed.get("embedding") if parsed else None)
+            logger.debug(f"Opened saved ANN index for child {child_id}, fetched {len(missing)} newer chunks")
+        else:
+            keys = list(written_at)
+            entries = []
+            for key, parsed in zip(keys, await self._mget_json(keys)):
+                if parsed:
+                    entries.append((key, parsed.get("embedding")))
+            self.embedding_index.load_child(child_id, entries, loaded_at=loaded_at)
+
+        self._maybe_rebuild_index(child_id)
+
+    def _maybe_rebuild_index(self, child_id: str) -> None:
+        """Start a background ANN rebuild once a child's index has grown or changed enough.
+
+        Searches keep using the current index until the rebuild swaps in.
+        """
+        if not self.embedding_index.needs_rebuild(child_id):
+            return
+        task = asyncio.create_task(self._rebuild_index(child_id))
+        self._rebuild_tasks.add(task)
+        task.add_done_callback(self._rebuild_tasks.discard)
+
+    async def _rebuild_index(self, child_id: str) -> None:
+        try:
+            await self.embedding_index.rebuild(child_id)
+        except Exception as e:
+            logger.warning(f"Failed to rebuild ANN index for child {child_id}: {e}")
+
+    async def _list_chunk_keys(self, child_id: str) -> Dict[str, float]:
+        """Map a child's chunk keys to their write times, backfilling the chunk index if missing."""
+        index_key = self._chunk_index_key(child_id)
+        metrics.redis_round_trips.inc(operation="chunk_index_read")
+        chunk_ids = await self.redis_client.zrange(index_key, 0, -1, withscores=True)
+        if chunk_ids:
+            return {self._chunk_key(child_id, chunk_id): score for chunk_id, score in chunk_ids}
+
+        # Chunks written before the index existed: find them with a non-blocking
+        # SCAN once, then record them so later loads skip the scan.
+        prefix = self._chunk_key(child_id, "")
+        keys: List[str] = []
+        cursor = None
+        while cursor != 0:
+            metrics.redis_round_trips.inc(operation="scan")
+            cursor, page = await self.redis_client.scan(
+                cursor or 0, match=f"{prefix}*", count=self.SCAN_COUNT
+            )
+            keys.extend(page)
+        if not keys:
+            return {}
+
+        # Score each chunk by when it was written, so compaction sees its real age
+        now = time.time()
+        written_at = {
+            key: self._parse_timestamp(chunk.get("created_at"), default=now)
+            for key, chunk in zip(keys, await self._mget_json(keys))
+            if chunk is not None
+        }
+        if written_at:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.zadd(index_key, {key[len(prefix):]: score for key, score in written_at.items()})
+            pipe.expire(index_key, settings.memory_ttl_days * 24 * 60 * 60)
+            metrics.redis_round_trips.inc(operation="chunk_index_backfill")
+            await pipe.execute()
+
+        return written_at
+
+    async def _read_hits(self, child_id: str, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch search hits and count the access, in one round trip."""
+        if not keys:
+            return []
+
+        access_key = self._chunk_access_key(child_id)
+        prefix = self._chunk_key(child_id, "")
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.mget(keys)
+        for key in keys:
+            pipe.hincrby(access_key, key[len(prefix):], 1)
+        pipe.expire(access_key, settings.memory_ttl_days * 24 * 60 * 60)
+        metrics.redis_round_trips.inc(operation="chunk_mget")
+        values = (await pipe.execute())[0]
+        return [json.loads(value) if value else None for value in values]
+
+    async def get_chunks(self, child_id: str, chunk_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch chunks by id, row for row (None where a chunk has expired)."""
+        return await self._mget_json([self._chunk_key(child_id, chunk_id) for chunk_id in chunk_ids])
+
+    async def _mget_json(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch and decode many JSON values, one MGET per batch of keys."""
+        results: List[Optional[Dict[str, Any]]] = []
+        for start in range(0, len(keys), self.MGET_BATCH_SIZE):
+            batch = keys[start:start + self.MGET_BATCH_SIZE]
+            metrics.redis_round_trips.inc(operation="chunk_mget")
+            values = await self.redis_client.mget(batch)
+            results.extend(json.loads(value) if value else None for value in values)
+        return results
+
+    def _chunk_key(self, child_id: str, chunk_id: Any) -> str:
+        """Redis key holding a single long-term memory chunk."""
+        return f"memory:{child_id}:chunk:{chunk_id}"
+
+    def _chunk_index_key(self, child_id: str) -> str:
+        """Redis sorted set of a child's chunk ids, scored by write time."""
+        return f"memory:{child_id}:chunks"
+
+    def _chunk_counter_key(self, child_id: str) -> str:
+        """Redis counter holding a child's next chunk id."""
+        return f"memory:{child_id}:next_chunk_id"
+
+    def _chunk_access_key(self, child_id: str) -> str:
+        """Redis hash of chunk id -> times returned by a search."""
+        return f"memory:{child_id}:access"
+
+    def _children_key(self) -> str:
+        """Redis sorted set of children with long-term memory, scored by last write."""
+        return "memory:children"
+
+    def format_chunk(self, messages: List[Dict[str, Any]]) -> str:
+        """Render a chunk of messages as the text that gets embedded."""
+        return "\n".join(
+            f"{message.get('role', 'user')}: {message.get('content', '')}" for message in messages
+        )
+
+    def chunk_messages(self, messages: List[Dict[str, Any]], chunk_size: int = 10) -> List[List[Dict[str, Any]]]:
         """Split messages into chunks for better storage and retrieval."""
         return [messages[i:i + chunk_size] for i in range(0, len(messages), chunk_size)]
 
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        import math
-
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        norm1 = math.sqrt(sum(a * a for a in vec1))
-        norm2 = math.sqrt(sum(b * b for b in vec2))
-
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-
-        return dot_product / (norm1 * norm2)
-
     def _get_timestamp(self) -> str:
         """Get current timestamp in ISO format."""
         from datetime import datetime
         return datetime.utcnow().isoformat()
 
+    def _parse_timestamp(self, value: Any, default: float) -> float:
+        """Epoch seconds of a `_get_timestamp` value, or `default` if it is missing or invalid."""
+        from datetime import datetime, timezone
+        try:
+            parsed = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return default
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
     async def cleanup_expired_memory(self) -> int:
-        """Clean up expired memory entries (handled automatically by Redis TTL)."""
-        # Redis handles TTL automatically, but we can add custom cleanup logic here
-        logger.info("Memory cleanup completed (Redis TTL handles expiration)")
-        return 0
+        """Prune index entries of chunks that Redis has expired; returns how many.
+
+        Chunks expire by TTL, but their ids stay in the chunk index and access
+        counts until removed here. Children with no chunks left are dropped
+        from the children registry.
+        """
+        removed = 0
+        ttl = settings.memory_ttl_days * 24 * 60 * 60
+        children_key = self._children_key()
+        # Children with no write for a whole TTL have nothing left
+        cutoff = time.time() - ttl
+        for child_id in await self.redis_client.zrangebyscore(children_key, "-inf", cutoff):
+            self.embedding_index.drop(child_id)
+        await self.redis_client.zremrangebyscore(children_key, "-inf", cutoff)
+
+        async for child_id, _ in self.iter_children():
+            chunk_ids = await self.redis_client.zrange(self._chunk_index_key(child_id), 0, -1)
+            pipe = self.redis_client.pipeline(transaction=False)
+            for chunk_id in chunk_ids:
+                pipe.exists(self._chunk_key(child_id, chunk_id))
+            metrics.redis_round_trips.inc(operation="chunk_cleanup")
+            present = await pipe.execute() if chunk_ids else []
+
+            expired = [chunk_id for chunk_id, exists in zip(chunk_ids, present) if not exists]
+            if not expired and chunk_ids:
+                continue
+
+            pipe = self.redis_client.pipeline(transaction=True)
+            if expired:
+                pipe.zrem(self._chunk_index_key(child_id), *expired)
+                pipe.hdel(self._chunk_access_key(child_id), *expired)
+            if len(expired) == len(chunk_ids):
+                pipe.zrem(children_key, child_id)
+            await pipe.execute()
+
+            if len(expired) == len(chunk_ids):
+                self.embedding_index.drop(child_id)
+            else:
+                for chunk_id in expired:
+                    self.embedding_index.upsert(child_id, self._chunk_key(child_id, chunk_id), None)
+            removed += len(expired)
+
+        logger.info(f"Memory cleanup removed {removed} expired chunk index entries")
+        return removed
 
 
 # Global memory manager instance
@@ -0,0 +1,148 @@
+"""Bounded write-behind queue for persisting chat turns off the request path."""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class PersistenceJob:
+    """A pending write of a session's new messages and any replies to cache."""
+    child_id: str
+    session_id: str
+    new_messages: List[Dict[str, Any]] = field(default_factory=list)
+    cached_replies: List[Tuple[str, str, str]] = field(default_factory=list)  # (scope, message, reply)
+
+    def merge(self, newer: "PersistenceJob") -> "PersistenceJob":
+        """Combine with a later job for the same session.
+
+        New messages from both are kept in order so no appended turn is lost.
+        """
+        return PersistenceJob(
+            child_id=newer.child_id,
+            session_id=newer.session_id,
+            new_messages=self.new_messages + newer.new_messages,
+            cached_replies=self.cached_replies + newer.cached_replies
+        )
+
+
+PersistenceHandler = Callable[[PersistenceJob], Awaitable[None]]
+
+
+class PersistenceQueue:
+    """Write-behind queue with a worker pool and per-session coalescing.
+
+    A job for a session that already has one waiting is merged into it, so a
+    burst of turns becomes a single write. Jobs for the same session never
+    run concurrently, so writes land in order. When the queue is full,
+    `enqueue` waits for room, applying backpressure to producers.
+    """
+
+    def __init__(self, handler: PersistenceHandler, maxsize: int = 1000, workers: int = 4):
+        self._handler = handler
+        self._maxsize = maxsize
+        self._worker_count = workers
+        self._queue: Optional["asyncio.Queue[str]"] = None
+        self._pending: Dict[str, PersistenceJob] = {}
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._workers: List[asyncio.Task] = []
+        self._running = False
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        """Start the worker pool on the running event loop."""
+        if self._running:
+            return
+
+        queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=self._maxsize)
+        self._queue = queue
+        self._workers = [
+            asyncio.create_task(self._worker(queue)) for _ in range(self._worker_count)
+        ]
+        self._running = True
+        logger.info(f"Persistence queue started with {self._worker_count} workers")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop accepting jobs, drain what is queued, then stop the workers."""
+        if not self._running or self._queue is None:
+            return
+
+        self._running = False
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Persistence queue drain timed out with {len(self._pending)} jobs pending"
+            )
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Persistence queue stopped", **self.metrics())
+
+    async def enqueue(self, job: PersistenceJob) -> None:
+        """Queue a job, merging it into any not-yet-started job for the same session."""
+        if not self._running or self._queue is None:
+            # No workers (e.g. outside the server lifecycle): persist inline.
+            await self._run(job)
+            return
+
+        self.enqueued += 1
+        pending = self._pending.get(job.session_id)
+        if pending is not None:
+            self._pending[job.session_id] = pending.merge(job)
+            self.coalesced += 1
+            return
+
+        self._pending[job.session_id] = job
+        await self._queue.put(job.session_id)
+
+    def metrics(self) -> Dict[str, int]:
+        """Queue depth and throughput counters."""
+        return {
+            "depth": self._queue.qsize() if self._queue else 0,
+            "capacity": self._maxsize,
+            "pending_sessions": len(self._pending),
+            "workers": len(self._workers),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    async def _worker(self, queue: "asyncio.Queue[str]") -> None:
+        """Process queued sessions until cancelled."""
+        while True:
+            session_id = await queue.get()
+            try:
+                lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+                async with lock:
+                    job = self._pending.pop(session_id, None)
+                    if job is not None:
+                        await self._run(job)
+
+                if not lock.locked() and session_id not in self._pending:
+                    self._session_locks.pop(session_id, None)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job: PersistenceJob) -> None:
+        """Run the handler for one job, recording the outcome."""
+        try:
+            await self._handler(job)
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Persistence failed for session {job.session_id}: {e}")
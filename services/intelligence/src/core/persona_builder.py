@@ -1,21 +1,58 @@
 """Builds persona-specific prompts for chat interactions."""
 
-import os
+import hashlib
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 import structlog
 
 from ..api.schemas import PersonaType
+from ..settings import settings
 
 logger = structlog.get_logger(__name__)
 
+# Filename -> modification time in nanoseconds (None when missing)
+FileSignature = Dict[str, Optional[int]]
+
+
+class PromptTemplates:
+    """An immutable snapshot of the prompt files and the per-persona prefixes built from them."""
+
+    def __init__(self, contents: Dict[str, str], signature: FileSignature):
+        self.contents = contents
+        self.signature = signature
+        self.prefixes = {
+            persona: f"{contents['base.md']}\n\n{contents[f'{persona.value}_variant.md']}"
+            for persona in PersonaType
+        }
+
 
 class PersonaBuilder:
-    """Builds chat prompts based on persona type and child information."""
+    """Builds chat prompts based on persona type and child information.
+
+    Prompt files are loaded and combined into one prefix per persona up front.
+    Rendered prompts are memoized per (persona, child name, custom prompt).
+    The prompts directory is polled by modification time at most every
+    `reload_interval` seconds; changed files are loaded into a new snapshot
+    that replaces the old one in a single assignment, so a turn never sees a
+    half-reloaded set of templates.
+    """
 
-    def __init__(self):
-        self.prompts_dir = Path(__file__).parent.parent / "prompts" / "parent_chat"
-        self._prompt_cache: Dict[str, str] = {}
+    FILENAMES = ("base.md",) + tuple(f"{persona.value}_variant.md" for persona in PersonaType)
+
+    def __init__(
+        self,
+        prompts_dir: Optional[Path] = None,
+        reload_interval: float = 5.0,
+        cache_size: int = 1024
+    ):
+        self.prompts_dir = prompts_dir or Path(__file__).parent.parent / "prompts" / "parent_chat"
+        self.reload_interval = reload_interval
+        self.cache_size = cache_size
+        self._rendered: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self._templates = self._load_templates(self._file_signature(), None)
+        self._checked_at = time.monotonic()
 
     def build_system_prompt(
         self,
@@ -25,51 +62,94 @@ class PersonaBuilder:
     ) -> str:
         """Build a complete system prompt for the chat persona."""
 
-        base_prompt = self._load_base_prompt()
+        self._maybe_reload()
 
-        if persona == PersonaType.CUSTOM and custom_prompt:
-            persona_prompt = custom_prompt
+        custom = custom_prompt if persona == PersonaType.CUSTOM and custom_prompt else None
+        custom_hash = hashlib.sha256(custom.encode("utf-8")).hexdigest() if custom else ""
+        key = (persona.value, child_name, custom_hash)
+
+        system_prompt = self._rendered.get(key)
+        if system_prompt is not None:
+            self._rendered.move_to_end(key)
+            return system_prompt
+
+        if custom:
+            prefix = f"{self._templates.contents['base.md']}\n\n{custom}"
         else:
-            persona_prompt = self._load_persona_prompt(persona)
+            prefix = self._templates.prefixes[persona]
 
         # Combine prompts with child personalization
-        system_prompt = f"""{base_prompt}
-
-{persona_prompt}
+        system_prompt = f"""{prefix}
 
 Child's name: {child_name}
 
 Remember to be warm, loving, and age-appropriate in your responses."""
 
+        self._rendered[key] = system_prompt
+        while len(self._rendered) > self.cache_size:
+            self._rendered.popitem(last=False)
         return system_prompt
 
-    def _load_base_prompt(self) -> str:
-        """Load the base chat prompt template."""
-        return self._load_prompt_file("base.md")
-
-    def _load_persona_prompt(self, persona: PersonaType) -> str:
-        """Load persona-specific prompt."""
-        filename = f"{persona.value}_variant.md"
-        return self._load_prompt_file(filename)
-
-    def _load_prompt_file(self, filename: str) -> str:
+    def persona_prefix(self, persona: PersonaType) -> str:
+        """The child-independent start of a persona's system prompt.
+
+        Every prompt for the persona begins with this exact text, so upstream
+        prompt prefix caching can reuse it across children.
+        """
+        self._maybe_reload()
+        return self._templates.prefixes[persona]
+
+    def reload(self) -> bool:
+        """Reload the templates if any prompt file changed; returns whether it did."""
+        self._checked_at = time.monotonic()
+        signature = self._file_signature()
+        if signature == self._templates.signature:
+            return False
+
+        self._templates = self._load_templates(signature, self._templates)
+        self._rendered = OrderedDict()
+        logger.info(f"Reloaded persona prompt templates from {self.prompts_dir}")
+        return True
+
+    def _maybe_reload(self) -> None:
+        if time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+
+    def _file_signature(self) -> FileSignature:
+        signature: FileSignature = {}
+        for filename in self.FILENAMES:
+            try:
+                signature[filename] = (self.prompts_dir / filename).stat().st_mtime_ns
+            except OSError:
+                signature[filename] = None
+        return signature
+
+    def _load_templates(
+        self,
+        signature: FileSignature,
+        previous: Optional[PromptTemplates]
+    ) -> PromptTemplates:
+        """Read every prompt file, keeping the previous content for files that fail to read."""
+        contents = {}
+        for filename in self.FILENAMES:
+            content = self._load_prompt_file(filename)
+            if content is None:
+                content = previous.contents[filename] if previous else self._get_fallback_prompt(filename)
+            contents[filename] = content
+        return PromptTemplates(contents, signature)
+
+    def _load_prompt_file(self, filename: str) -> Optional[str]:
         """Load a prompt file from the prompts directory."""
-        if filename in self._prompt_cache:
-            return self._prompt_cache[filename]
-
         prompt_path = self.prompts_dir / filename
 
         try:
             with open(prompt_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                self._prompt_cache[filename] = content
-                return content
+                return f.read().strip()
         except FileNotFoundError:
-            logger.warning(f"Prompt file not found: {filename}, using fallback")
-            return self._get_fallback_prompt(filename)
+            logger.warning(f"Prompt file not found: {filename}, using fallback until it appears")
         except Exception as e:
             logger.error(f"Error loading prompt file {filename}: {e}")
-            return self._get_fallback_prompt(filename)
+        return None
 
     def _get_fallback_prompt(self, filename: str) -> str:
         """Provide fallback prompts when files are missing."""
@@ -94,4 +174,7 @@ Adapt your communication style to be warm, supportive, and engaging."""
 
 
 # Global persona builder instance
-persona_builder = PersonaBuilder()
\ No newline at end of file
+persona_builder = PersonaBuilder(
+    reload_interval=settings.prompt_reload_interval_seconds,
+    cache_size=settings.prompt_cache_size
+)
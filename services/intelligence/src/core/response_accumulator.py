@@ -0,0 +1,70 @@
+"""Accumulates streamed response chunks and times the stream."""
+
+import time
+from typing import Callable, List, Optional
+
+
+class ResponseAccumulator:
+    """Collects chunks in a list (joined once) and tracks token timing.
+
+    Appending is O(1) per chunk, unlike repeated string concatenation, which
+    can copy the whole response on every token. Time to first token is
+    measured from construction; inter-token gaps are kept as a running count,
+    sum and maximum so tracking them costs nothing per token beyond a clock
+    read.
+    """
+
+    __slots__ = (
+        "_chunks", "_clock", "started_at", "first_token_at",
+        "last_token_at", "token_count", "gap_total", "max_gap"
+    )
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._chunks: List[str] = []
+        self._clock = clock
+        self.started_at = clock()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.token_count = 0
+        self.gap_total = 0.0
+        self.max_gap = 0.0
+
+    def add(self, chunk: str) -> None:
+        """Record one streamed chunk."""
+        now = self._clock()
+        last = self.last_token_at
+        if last is None:
+            self.first_token_at = now
+        else:
+            gap = now - last
+            self.gap_total += gap
+            if gap > self.max_gap:
+                self.max_gap = gap
+        self.last_token_at = now
+        self.token_count += 1
+        self._chunks.append(chunk)
+
+    def text(self) -> str:
+        """The full response so far."""
+        if len(self._chunks) != 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0]
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from construction to the first chunk, if one arrived."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def stream_duration(self) -> Optional[float]:
+        """Seconds from the first chunk to the last."""
+        if self.first_token_at is None or self.last_token_at is None:
+            return None
+        return self.last_token_at - self.first_token_at
+
+    @property
+    def mean_gap(self) -> float:
+        """Mean seconds between consecutive chunks."""
+        return self.gap_total / (self.token_count - 1) if self.token_count > 1 else 0.0
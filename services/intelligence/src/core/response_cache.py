@@ -0,0 +1,212 @@
+"""Semantic cache of chat replies for short, frequently repeated child messages."""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Sequence
+import structlog
+
+from . import metrics
+from .embedding_index import ChildEmbeddingIndex
+
+logger = structlog.get_logger(__name__)
+
+response_cache_lookups = metrics.registry.counter(
+    "chat_response_cache_lookups_total",
+    "Chat response cache lookups by persona and result (exact, semantic, miss)",
+    labelnames=("persona", "result")
+)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_TOKEN_PIECES = re.compile(r"\S+\s*")
+
+
+def normalize_message(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ("I love you Daddy!!" -> "i love you daddy")."""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+class _Scope:
+    """Near-duplicate lookup for one (persona, child, history) scope, oldest evicted first."""
+
+    def __init__(self, dim: int):
+        self.index = ChildEmbeddingIndex(dim)
+        self.keys: "OrderedDict[str, float]" = OrderedDict()  # key -> expires_at
+
+
+class ResponseCache:
+    """Replies cached by persona, child, normalized message and a coarse history fingerprint.
+
+    Exact matches are looked up in Redis so every worker shares them. Near
+    duplicates ("how are you daddy" / "how r u daddy") fall back to cosine
+    similarity against the message embeddings this process has seen for the
+    same scope. Entries expire after `ttl_seconds` so replies stay fresh as
+    the child's memories change.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        ttl_seconds: int = 60 * 60,
+        similarity_threshold: float = 0.95,
+        max_message_chars: int = 80,
+        history_depth: int = 2,
+        max_scopes: int = 10000,
+        max_entries_per_scope: int = 32
+    ):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.max_message_chars = max_message_chars
+        self.history_depth = history_depth
+        self.max_scopes = max_scopes
+        self.max_entries_per_scope = max_entries_per_scope
+        self._scopes: "OrderedDict[str, _Scope]" = OrderedDict()
+        self._lookups: Dict[str, Dict[str, int]] = {}
+
+    def is_cacheable(self, message: str) -> bool:
+        """Only short, greeting-style messages are worth caching."""
+        normalized = normalize_message(message)
+        return bool(normalized) and len(normalized) <= self.max_message_chars
+
+    def scope(self, persona: str, child_id: str, history: Sequence[Dict[str, Any]]) -> str:
+        """Scope id from persona, child and the last few history messages."""
+        recent = [
+            (message.get("role", ""), normalize_message(message.get("content", "")))
+            for message in history[-self.history_depth:]
+        ] if self.history_depth > 0 else []
+        fingerprint = json.dumps([persona, child_id, recent], separators=(",", ":"))
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:32]
+
+    def make_key(self, scope: str, message: str) -> str:
+        digest = hashlib.sha256(normalize_message(message).encode("utf-8")).hexdigest()[:32]
+        return f"{scope}:{digest}"
+
+    async def get(
+        self,
+        persona: str,
+        scope: str,
+        message: str,
+        embed: Optional[Callable[[], Awaitable[Sequence[float]]]] = None
+    ) -> Optional[str]:
+        """Return a cached reply for an exact or near-duplicate message, if fresh.
+
+        `embed` is only called when there is no exact match and this scope has
+        near-duplicate candidates.
+        """
+        key = self.make_key(scope, message)
+        reply = await self._read(key)
+        if reply is not None:
+            self._count(persona, "exact")
+            return reply
+
+        if embed is not None and self._has_candidates(scope):
+            for similar_key in self._similar_keys(scope, await embed()):
+                reply = await self._read(similar_key)
+                if reply is not None:
+                    self._count(persona, "semantic")
+                    return reply
+                self._forget(scope, similar_key)
+
+        self._count(persona, "miss")
+        return None
+
+    async def put(
+        self,
+        scope: str,
+        message: str,
+        reply: str,
+        embed: Optional[Callable[[], Awaitable[Sequence[float]]]] = None
+    ) -> None:
+        """Cache a reply in Redis and remember the message embedding for near-duplicate lookups.
+
+        Failures are logged and ignored; the reply has already been sent.
+        """
+        key = self.make_key(scope, message)
+        try:
+            metrics.redis_round_trips.inc(operation="response_cache_set")
+            await self.redis_client.setex(
+                self._redis_key(key),
+                self.ttl_seconds,
+                json.dumps({"message": normalize_message(message), "reply": reply})
+            )
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
+            return
+
+        if embed is not None:
+            try:
+                self._remember(scope, key, await embed())
+            except Exception as e:
+                logger.warning(f"Response cache embedding failed: {e}")
+
+    async def replay(self, reply: str, token_delay: float = 0.0) -> AsyncGenerator[str, None]:
+        """Yield a cached reply in word-sized pieces, like an upstream token stream."""
+        for piece in _TOKEN_PIECES.findall(reply):
+            await asyncio.sleep(token_delay)
+            yield piece
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Per-persona lookup counts and hit rates."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for persona, counts in self._lookups.items():
+            lookups = sum(counts.values())
+            hits = counts["exact"] + counts["semantic"]
+            totals[persona] = {**counts, "hit_rate": hits / lookups if lookups else 0.0}
+        return totals
+
+    def _count(self, persona: str, result: str) -> None:
+        response_cache_lookups.inc(persona=persona, result=result)
+        counts = self._lookups.setdefault(persona, {"exact": 0, "semantic": 0, "miss": 0})
+        counts[result] += 1
+
+    async def _read(self, key: str) -> Optional[str]:
+        try:
+            metrics.redis_round_trips.inc(operation="response_cache_get")
+            data = await self.redis_client.get(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+        return json.loads(data)["reply"] if data else None
+
+    def _has_candidates(self, scope_id: str) -> bool:
+        scope = self._scopes.get(scope_id)
+        return scope is not None and bool(scope.keys)
+
+    def _similar_keys(self, scope_id: str, embedding: Sequence[float]) -> List[str]:
+        scope = self._scopes.get(scope_id)
+        if scope is None:
+            return []
+
+        now = time.monotonic()
+        for key, expires_at in list(scope.keys.items()):
+            if expires_at <= now:
+                self._forget(scope_id, key)
+
+        return [key for key, _ in scope.index.search(embedding, 3, self.similarity_threshold)]
+
+    def _remember(self, scope_id: str, key: str, embedding: Sequence[float]) -> None:
+        scope = self._scopes.get(scope_id)
+        if scope is None:
+            scope = self._scopes[scope_id] = _Scope(len(embedding))
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+        self._scopes.move_to_end(scope_id)
+
+        if scope.index.upsert(key, embedding):
+            scope.keys[key] = time.monotonic() + self.ttl_seconds
+            scope.keys.move_to_end(key)
+            while len(scope.keys) > self.max_entries_per_scope:
+                oldest, _ = scope.keys.popitem(last=False)
+                scope.index.remove(oldest)
+
+    def _forget(self, scope_id: str, key: str) -> None:
+        scope = self._scopes.get(scope_id)
+        if scope is not None and scope.keys.pop(key, None) is not None:
+            scope.index.remove(key)
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:response:{key}"
@@ -0,0 +1,177 @@
+"""Two-tier content-addressed cache for expensive generation results."""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import structlog
+
+from .metrics import redis_round_trips
+
+logger = structlog.get_logger(__name__)
+
+# Returns the computed value and whether it is complete enough to cache
+ComputeFunction = Callable[[], Awaitable[Tuple[Any, bool]]]
+
+
+class _LeaderCancelled(Exception):
+    """Set on an in-flight computation whose caller was cancelled."""
+
+
+class ResultCache:
+    """In-process LRU in front of Redis, with single-flight computation.
+
+    Keys are hashes of normalized inputs, so identical requests share entries
+    across processes. Concurrent misses for the same key wait on one shared
+    computation instead of each calling upstream. Values must be
+    JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        redis_client: Any,
+        max_entries: int = 512,
+        ttl_seconds: int = 24 * 60 * 60
+    ):
+        self.namespace = namespace
+        self.redis_client = redis_client
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def make_key(self, **inputs: Any) -> str:
+        """Hash normalized inputs into a cache key."""
+        normalized = {name: self._normalize(value) for name, value in inputs.items()}
+        encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    async def get_or_compute(self, key: str, compute: ComputeFunction, bypass: bool = False) -> Any:
+        """Return the cached value for a key, computing it at most once if missing.
+
+        With `bypass`, cached values are ignored and the fresh result replaces them.
+        If the caller computing a value is cancelled, one of the callers waiting
+        on it takes over the computation.
+        """
+        while not bypass:
+            value = await self._get(key)
+            if value is not None:
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.shared += 1
+            try:
+                return await asyncio.shield(inflight)
+            except _LeaderCancelled:
+                continue
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        if not bypass:
+            self._inflight[key] = future
+
+        try:
+            value, cacheable = await compute()
+            if cacheable:
+                await self._set(key, value)
+            future.set_result(value)
+            return value
+
+        except asyncio.CancelledError:
+            # Only this caller was cancelled: hand the computation to a waiter
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure does not log a warning
+            future.exception()
+            raise
+
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def invalidate(self, key: str) -> None:
+        """Drop a key from both tiers."""
+        self._local.pop(key, None)
+        try:
+            await self.redis_client.delete(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Result cache invalidate failed for {self.namespace}: {e}")
+
+    def metrics(self) -> Dict[str, int]:
+        """Hit and miss counters."""
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "local_entries": len(self._local),
+        }
+
+    async def _get(self, key: str) -> Optional[Any]:
+        """Look a key up locally, then in Redis, promoting Redis hits."""
+        entry = self._local.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._local.move_to_end(key)
+                self.local_hits += 1
+                return value
+            del self._local[key]
+
+        try:
+            redis_round_trips.inc(operation="result_cache_get")
+            data = await self.redis_client.get(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Result cache read failed for {self.namespace}: {e}")
+            return None
+
+        if data is None:
+            return None
+
+        value = json.loads(data)
+        self._remember(key, value)
+        self.redis_hits += 1
+        return value
+
+    async def _set(self, key: str, value: Any) -> None:
+        """Write a value to both tiers."""
+        self._remember(key, value)
+        try:
+            redis_round_trips.inc(operation="result_cache_set")
+            await self.redis_client.setex(self._redis_key(key), self.ttl_seconds, json.dumps(value))
+        except Exception as e:
+            logger.warning(f"Result cache write failed for {self.namespace}: {e}")
+
+    def _remember(self, key: str, value: Any) -> None:
+        """Store a value in the local LRU, evicting the least recently used."""
+        self._local[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    def _normalize(self, value: Any) -> Any:
+        """Collapse insignificant differences (whitespace, enum wrappers) in inputs."""
+        if hasattr(value, "value"):
+            value = value.value
+        if isinstance(value, str):
+            return " ".join(value.split())
+        return value
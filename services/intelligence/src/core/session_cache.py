@@ -0,0 +1,75 @@
+"""Short-lived in-process cache of chat session history."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from . import metrics
+
+session_cache_lookups = metrics.registry.counter(
+    "chat_session_cache_lookups_total",
+    "Session history lookups by result (hit, joined an in-flight load, miss)",
+    labelnames=("result",)
+)
+
+History = List[Dict[str, Any]]
+
+
+class SessionHistoryCache:
+    """Recent messages per session, kept for `ttl_seconds` after a load or turn.
+
+    Filled by a session warm-up or the first turn, and updated with each
+    turn's messages as soon as the reply finishes, so the next turn neither
+    waits on Redis nor misses a turn that is still being persisted.
+    Concurrent loads of one session share a single Redis read. Entries
+    expire quickly, which bounds staleness if another worker serves the
+    session.
+    """
+
+    def __init__(self, ttl_seconds: float = 120.0, max_sessions: int = 10000, window: int = 5):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.window = window
+        self._entries: "OrderedDict[str, Tuple[float, History]]" = OrderedDict()
+        self._loading: Dict[str, "asyncio.Future[History]"] = {}
+
+    async def get(self, session_id: str, load: Callable[[], Awaitable[History]]) -> History:
+        """Return a copy of the session's history, loading it at most once at a time."""
+        entry = self._entries.get(session_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(session_id)
+            session_cache_lookups.inc(result="hit")
+            return list(entry[1])
+
+        pending = self._loading.get(session_id)
+        if pending is not None:
+            session_cache_lookups.inc(result="joined")
+            return list(await asyncio.shield(pending))
+
+        session_cache_lookups.inc(result="miss")
+        future = asyncio.ensure_future(load())
+        self._loading[session_id] = future
+        try:
+            history = await asyncio.shield(future)
+        finally:
+            if self._loading.get(session_id) is future:
+                del self._loading[session_id]
+        self._store(session_id, history)
+        return list(history)
+
+    def append(self, session_id: str, messages: History) -> None:
+        """Add a finished turn's messages to a cached session."""
+        entry = self._entries.get(session_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return
+        self._store(session_id, (entry[1] + messages)[-self.window:])
+
+    def invalidate(self, session_id: str) -> None:
+        self._entries.pop(session_id, None)
+
+    def _store(self, session_id: str, history: History) -> None:
+        self._entries[session_id] = (time.monotonic() + self.ttl_seconds, list(history))
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_sessions:
+            self._entries.popitem(last=False)
@@ -0,0 +1,104 @@
+"""Compact, versioned binary encoding for short-term session records."""
+
+import json
+import zlib
+from typing import Any, Dict, Optional
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore[assignment]
+
+
+# Header byte: low nibble is the payload format, high nibble the compression.
+# Legacy records are plain JSON text and start with "{" (0x7B), which never
+# collides with a header built from the values below.
+FORMAT_JSON = 0x01
+FORMAT_MSGPACK = 0x02
+COMPRESSION_NONE = 0x00
+COMPRESSION_ZLIB = 0x10
+COMPRESSION_ZSTD = 0x20
+
+_FORMATS = {"json": FORMAT_JSON, "msgpack": FORMAT_MSGPACK}
+
+
+class SessionSerializer:
+    """Encodes session log entries and metadata as msgpack or JSON.
+
+    Each session log entry is a single message of a few hundred bytes at
+    most, too small for zlib or zstd to shrink, so records are written
+    uncompressed; msgpack's compact encoding and cheaper decoding are the
+    win. Every record starts with a header byte naming its format and
+    compression, so records written before compression was dropped (zlib,
+    or zstd with the `codecs` extra) and legacy headerless JSON can still
+    be decoded.
+    """
+
+    def __init__(self, format: str = "msgpack"):
+        if format not in _FORMATS:
+            raise ValueError(f"Unknown session format: {format}")
+
+        if format == "msgpack" and msgpack is None:
+            logger.warning("msgpack not installed, encoding sessions as JSON")
+            format = "json"
+
+        self.format = _FORMATS[format]
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        """Encode a session record."""
+        payload: bytes
+        if self.format == FORMAT_MSGPACK:
+            payload = msgpack.packb(data, use_bin_type=True)
+        else:
+            payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        return bytes([self.format | COMPRESSION_NONE]) + payload
+
+    def loads(self, raw: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        """Decode a session record written by any serializer version."""
+        if not raw:
+            return None
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+
+        record: Dict[str, Any]
+        header = raw[0]
+        if header == ord("{"):
+            record = json.loads(raw)
+            return record
+
+        payload_format = header & 0x0F
+        payload = self._decompress(header & 0xF0, raw[1:])
+
+        if payload_format == FORMAT_MSGPACK:
+            if msgpack is None:
+                raise RuntimeError("Session record is msgpack encoded but msgpack is not installed")
+            record = msgpack.unpackb(payload, raw=False)
+        elif payload_format == FORMAT_JSON:
+            record = json.loads(payload)
+        else:
+            raise ValueError(f"Unknown session record header: {header:#04x}")
+        return record
+
+    def is_current(self, raw: bytes) -> bool:
+        """Whether a record was written in this serializer's format."""
+        return bool(raw) and raw[0] == self.format | COMPRESSION_NONE
+
+    def _decompress(self, compression: int, payload: bytes) -> bytes:
+        if compression == COMPRESSION_NONE:
+            return payload
+        if compression == COMPRESSION_ZLIB:
+            return zlib.decompress(payload)
+        if compression == COMPRESSION_ZSTD:
+            if self._zstd_decompressor is None:
+                raise RuntimeError("Session record is zstd compressed but zstandard is not installed")
+            return self._zstd_decompressor.decompress(payload)
+        raise ValueError(f"Unknown session compression: {compression:#04x}")
@@ -0,0 +1,85 @@
+"""Circuit breaker for failing fast when an upstream is unhealthy."""
+
+import time
+from typing import Dict
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over consecutive upstream failures.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail immediately with CircuitOpenError. Once `reset_timeout` seconds have
+    passed, one trial call at a time is let through (half-open): a success
+    closes the circuit, a failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls would currently be rejected."""
+        if self.state == self.OPEN:
+            return time.monotonic() - self._opened_at < self.reset_timeout
+        return self.state == self.HALF_OPEN and self._trial_pending()
+
+    def before_call(self) -> None:
+        """Admit a call or raise CircuitOpenError."""
+        if self.state == self.CLOSED:
+            return
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+            logger.info(f"{self.name} circuit half-open, allowing a trial call")
+
+        if self._trial_pending():
+            raise CircuitOpenError(f"{self.name} circuit is half-open with a trial in flight")
+        self._trial_in_flight = True
+        self._trial_started_at = time.monotonic()
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"{self.name} circuit closed")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"{self.name} circuit opened after {self._failures} failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def _trial_pending(self) -> bool:
+        """Whether a trial call is outstanding (abandoned trials expire)."""
+        return (
+            self._trial_in_flight
+            and time.monotonic() - self._trial_started_at < self.reset_timeout
+        )
+
+    def metrics(self) -> Dict[str, object]:
+        return {"state": self.state, "consecutive_failures": self._failures}
@@ -0,0 +1,141 @@
+"""Micro-batching and content-hash deduplication for embedding requests."""
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+EmbedFunction = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of text content, as stored in memory_embedding.content_hash."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into batched upstream calls.
+
+    Texts submitted from any caller are collected until either `max_batch_size`
+    distinct texts are waiting or `max_wait_ms` has passed, then sent as one
+    request. Identical texts share a single in-flight result, and recent
+    results are kept in a bounded LRU keyed by content hash.
+    """
+
+    def __init__(
+        self,
+        embed_fn: EmbedFunction,
+        max_batch_size: int = 256,
+        max_wait_ms: float = 20.0,
+        cache_size: int = 10000
+    ):
+        self._embed_fn = embed_fn
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._batch: Dict[str, str] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.cache_hits = 0
+        self.batches = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, sharing upstream calls with concurrent callers."""
+        if not texts:
+            return []
+        # Shielded: cancelling this caller must not cancel a result other
+        # callers of the same text are waiting on
+        futures = [asyncio.shield(self._submit(text)) for text in texts]
+        return list(await asyncio.gather(*futures))
+
+    def _submit(self, text: str) -> asyncio.Future:
+        """Return a future for one text's embedding, batching it if needed."""
+        loop = asyncio.get_running_loop()
+        key = content_hash(text)
+        self.requests += 1
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            future = loop.create_future()
+            future.set_result(cached)
+            return future
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.cache_hits += 1
+            return pending
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        self._batch[key] = text
+
+        if len(self._batch) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self._flush)
+
+        return future
+
+    def _flush(self) -> None:
+        """Send everything collected so far as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._batch:
+            return
+
+        batch, self._batch = self._batch, {}
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: Dict[str, str]) -> None:
+        """Embed one batch and resolve the waiting futures."""
+        keys = list(batch)
+        self.batches += 1
+        try:
+            vectors = await self._embed_fn([batch[key] for key in keys])
+            if len(vectors) != len(keys):
+                raise ValueError(f"Expected {len(keys)} embeddings, got {len(vectors)}")
+
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+                future = self._inflight.pop(key)
+                if not future.done():
+                    future.set_result(vector)
+
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(keys)} texts failed: {e}")
+            for key in keys:
+                pending = self._inflight.pop(key, None)
+                if pending is not None and not pending.done():
+                    pending.set_exception(e)
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        """Add a result to the LRU cache, evicting the oldest entries."""
+        if self._cache_size <= 0:
+            return
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def metrics(self) -> Dict[str, int]:
+        """Request, dedupe and batch counters."""
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "batches": self.batches,
+            "cached": len(self._cache),
+            "waiting": len(self._batch),
+        }
@@ -0,0 +1,159 @@
+"""Deterministic local stand-in for the OpenAI API, for load and latency testing."""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional
+
+import httpx
+import openai
+
+WORDS = (
+    "twinkle snow magic star cocoa sleigh reindeer cookie mitten lantern "
+    "wonder giggle cosy ribbon sparkle adventure hug dream gift candle"
+).split()
+
+
+class FakeStream:
+    """Mimics `openai.AsyncStream`: async-iterable chunks and an async `close`."""
+
+    def __init__(self, chunks: AsyncGenerator[Any, None], owner: "FakeAsyncOpenAI"):
+        self._chunks = chunks
+        self._owner = owner
+        self.closed = False
+        owner.open_streams += 1
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self._chunks
+
+    async def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._owner.open_streams -= 1
+            await self._chunks.aclose()
+
+
+class FakeAsyncOpenAI:
+    """Mimics the parts of `openai.AsyncOpenAI` that OpenAIClient uses.
+
+    Streams tokens with a configurable time to first token, per-token latency
+    and jitter, and fails a configurable fraction of requests, either before
+    the first token or mid-stream. Output and failures come from a seeded RNG,
+    so runs are reproducible. Requests with a `response_format` get JSON
+    daily messages for the days named in the prompt.
+    """
+
+    def __init__(
+        self,
+        ttft_ms: float = 300.0,
+        token_latency_ms: float = 30.0,
+        jitter_ms: float = 10.0,
+        error_rate: float = 0.0,
+        mid_stream_error_rate: float = 0.0,
+        tokens: int = 60,
+        embedding_dim: int = 1536,
+        seed: int = 0
+    ):
+        self.ttft = ttft_ms / 1000
+        self.token_latency = token_latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.mid_stream_error_rate = mid_stream_error_rate
+        self.tokens = tokens
+        self.embedding_dim = embedding_dim
+        self.open_streams = 0  # Streams returned and not yet closed
+        self._rng = random.Random(seed)
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_chat_completion))
+        self.completions = SimpleNamespace(create=self._create_completion)
+        self.embeddings = SimpleNamespace(create=self._create_embeddings)
+
+    async def _create_chat_completion(self, **kwargs: Any) -> Any:
+        await self._sleep(self.ttft)
+        self._maybe_fail(self.error_rate)
+
+        pieces = self._reply_pieces(kwargs.get("messages", []), kwargs.get("response_format"))
+        if kwargs.get("stream"):
+            return FakeStream(self._stream(pieces), self)
+
+        await self._sleep(self.token_latency * (len(pieces) - 1))
+        message = SimpleNamespace(content="".join(pieces))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def _stream(self, pieces: List[str]) -> AsyncGenerator[Any, None]:
+        fail_at = len(pieces) // 2 if self._rng.random() < self.mid_stream_error_rate else None
+        for i, piece in enumerate(pieces):
+            if i:
+                await self._sleep(self.token_latency)
+            if i == fail_at:
+                self._maybe_fail(1.0)
+            delta = SimpleNamespace(content=piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    async def _create_completion(self, **kwargs: Any) -> Any:
+        await self._sleep(self.ttft)
+        self._maybe_fail(self.error_rate)
+        text = "".join(self._words(self.tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(text=text)])
+
+    async def _create_embeddings(self, model: str, input: List[str], **kwargs: Any) -> Any:
+        await self._sleep(self.ttft)
+        self._maybe_fail(self.error_rate)
+        data = [
+            SimpleNamespace(index=i, embedding=self._embedding(text))
+            for i, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=data)
+
+    def _reply_pieces(self, messages: List[Dict[str, Any]], response_format: Optional[Dict[str, Any]]) -> List[str]:
+        """Token-sized pieces of the reply."""
+        if not response_format:
+            return self._words(self.tokens)
+
+        prompt = messages[-1].get("content", "") if messages else ""
+        payload = json.dumps({
+            "messages": [
+                {
+                    "day": day,
+                    "title": f"Day {day}",
+                    "content": "".join(self._words(24)).strip(),
+                    "tone": self._rng.choice(["playful", "warm", "adventurous"]),
+                }
+                for day in self._requested_days(prompt)
+            ]
+        })
+        return [payload[i:i + 4] for i in range(0, len(payload), 4)]
+
+    def _requested_days(self, prompt: str) -> List[int]:
+        """Day numbers named in a day-generation prompt ("days 5 to 8", "days 6, 7")."""
+        match = re.search(r"\bdays? (\d+(?:(?: to |, )\d+)*)", prompt)
+        if not match:
+            return list(range(1, 25))
+        numbers = [int(n) for n in re.findall(r"\d+", match.group(1))]
+        if " to " in match.group(1):
+            return list(range(numbers[0], numbers[-1] + 1))
+        return numbers
+
+    def _words(self, count: int) -> List[str]:
+        return [f"{self._rng.choice(WORDS)} " for _ in range(count)]
+
+    def _embedding(self, text: str) -> List[float]:
+        """Deterministic pseudo-random vector derived from the text."""
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        return [rng.gauss(0.0, 1.0) for _ in range(self.embedding_dim)]
+
+    async def _sleep(self, base: float) -> None:
+        delay = base + self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _maybe_fail(self, rate: float) -> None:
+        if rate and self._rng.random() < rate:
+            raise openai.APIConnectionError(
+                message="Injected upstream failure",
+                request=httpx.Request("POST", "https://fake-openai.local/v1/chat/completions")
+            )
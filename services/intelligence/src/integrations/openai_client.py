@@ -1,27 +1,110 @@
 """OpenAI client for chat completions and streaming."""
 
+import asyncio
+import random
+import httpx
 import openai
-from typing import AsyncGenerator, List, Dict, Any
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, Tuple, TypeVar
 import structlog
 
 from ..settings import settings
+from ..core import metrics
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .embedding_batcher import EmbeddingBatcher
 
 logger = structlog.get_logger(__name__)
 
+T = TypeVar("T")
+
+# Transient upstream errors worth retrying (APITimeoutError is a connection error)
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+openai_retries = metrics.registry.counter(
+    "openai_retries_total",
+    "Upstream OpenAI calls retried after a transient error",
+    labelnames=("operation",)
+)
+openai_circuit_open = metrics.registry.gauge(
+    "openai_circuit_open",
+    "1 while the OpenAI circuit breaker is rejecting calls"
+)
+
 
 class OpenAIClient:
     """Client for OpenAI API interactions."""
 
-    def __init__(self):
-        self.client = openai.AsyncOpenAI(
+    def __init__(self, client: Optional[Any] = None):
+        # Any object with the AsyncOpenAI surface can be injected, e.g. the
+        # FakeAsyncOpenAI stand-in for load tests
+        self.client = client or self._create_client()
+        self.circuit_breaker = CircuitBreaker(
+            "openai",
+            failure_threshold=settings.openai_circuit_failure_threshold,
+            reset_timeout=settings.openai_circuit_reset_seconds
+        )
+        openai_circuit_open.set_function(lambda: float(self.circuit_breaker.is_open))
+        self.embedding_batcher = EmbeddingBatcher(
+            self.create_embeddings,
+            max_batch_size=settings.embedding_batch_size,
+            max_wait_ms=settings.embedding_batch_wait_ms,
+            cache_size=settings.embedding_cache_size
+        )
+
+    def _create_client(self) -> Any:
+        """Build the upstream client, or the local stand-in if configured."""
+        if settings.openai_fake_upstream:
+            from .fake_openai import FakeAsyncOpenAI
+
+            logger.warning("Using fake OpenAI upstream")
+            return FakeAsyncOpenAI(
+                ttft_ms=settings.fake_upstream_ttft_ms,
+                token_latency_ms=settings.fake_upstream_token_latency_ms,
+                jitter_ms=settings.fake_upstream_jitter_ms,
+                error_rate=settings.fake_upstream_error_rate,
+                tokens=settings.fake_upstream_tokens
+            )
+
+        http_client = httpx.AsyncClient(
+            http2=settings.openai_http2,
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+                keepalive_expiry=settings.openai_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.openai_connect_timeout,
+                read=settings.openai_read_timeout,
+                write=settings.openai_write_timeout,
+                pool=settings.openai_pool_timeout
+            )
+        )
+
+        return openai.AsyncOpenAI(
             api_key=settings.openai_api_key,
+            http_client=http_client,
+            max_retries=0,  # Retries are handled here, before the first token only
         )
 
+    @property
+    def available(self) -> bool:
+        """False while the circuit breaker is failing calls fast."""
+        return not self.circuit_breaker.is_open
+
+    async def close(self) -> None:
+        """Close the pooled HTTP connections (the fake upstream has none)."""
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
     async def create_chat_completion(
         self,
         messages: List[Dict[str, Any]],
         stream: bool = False,
-        **kwargs
+        **kwargs: Any
     ) -> AsyncGenerator[str, None]:
         """Create a chat completion, optionally streaming the response."""
 
@@ -37,10 +120,18 @@ class OpenAIClient:
 
         try:
             if stream:
-                async for chunk in self._stream_completion(completion_kwargs):
-                    yield chunk
+                chunks = self._stream_completion(completion_kwargs)
+                try:
+                    async for chunk in chunks:
+                        yield chunk
+                finally:
+                    # Reached when closed at a yield too, so the upstream closes with us
+                    await chunks.aclose()
             else:
-                response = await self.client.chat.completions.create(**completion_kwargs)
+                response = await self._call_with_retries(
+                    "chat_completion",
+                    lambda: self.client.chat.completions.create(**completion_kwargs)
+                )
                 content = response.choices[0].message.content or ""
                 yield content
 
@@ -49,31 +140,152 @@ class OpenAIClient:
             raise
 
     async def _stream_completion(self, kwargs: Dict[str, Any]) -> AsyncGenerator[str, None]:
-        """Handle streaming completion responses."""
-        async for chunk in await self.client.chat.completions.create(**kwargs):
-            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
-                content = chunk.choices[0].delta.content
+        """Handle streaming completion responses.
+
+        Failures before the first token are retried with backoff. Once a token
+        has been yielded, errors propagate, since the caller has already
+        forwarded part of the response. The upstream stream is closed however
+        this generator ends, including when the caller closes or cancels it,
+        so the HTTP response goes back to the pool and generation stops.
+        """
+        attempts = max(1, settings.openai_max_retries + 1)
+
+        for attempt in range(attempts):
+            self.circuit_breaker.before_call()
+            try:
+                stream, chunks, first = await self._open_stream(kwargs)
+                self.circuit_breaker.record_success()
+                break
+            except RETRYABLE_ERRORS as e:
+                self.circuit_breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                await self._backoff("chat_stream", attempt, e)
+            except openai.APIStatusError:
+                # The upstream answered; it is healthy even if the request is not
+                self.circuit_breaker.record_success()
+                raise
+
+        try:
+            if first is None:
+                return
+            yield first
+
+            while True:
+                content = await self._next_content(chunks)
+                if content is None:
+                    return
                 yield content
+        except RETRYABLE_ERRORS:
+            self.circuit_breaker.record_failure()
+            raise
+        finally:
+            await stream.close()
+
+    async def _open_stream(self, kwargs: Dict[str, Any]) -> Tuple[Any, AsyncIterator[Any], Optional[str]]:
+        """Start a completion stream and read its first content delta, closing it if that fails."""
+        stream = await self.client.chat.completions.create(**kwargs)
+        try:
+            chunks = stream.__aiter__()
+            return stream, chunks, await self._next_content(chunks)
+        except BaseException:
+            await stream.close()
+            raise
+
+    async def _next_content(self, chunks: AsyncIterator[Any]) -> Optional[str]:
+        """Advance a completion stream to the next non-empty content delta."""
+        async for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                content: str = chunk.choices[0].delta.content
+                return content
+        return None
+
+    async def _call_with_retries(self, operation: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Run an upstream call through the circuit breaker, retrying transient errors."""
+        attempts = max(1, settings.openai_max_retries + 1)
+
+        for attempt in range(attempts):
+            self.circuit_breaker.before_call()
+            try:
+                result = await call()
+                self.circuit_breaker.record_success()
+                return result
+            except RETRYABLE_ERRORS as e:
+                self.circuit_breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                await self._backoff(operation, attempt, e)
+            except openai.APIStatusError:
+                self.circuit_breaker.record_success()
+                raise
+
+        # Unreachable: the last attempt returns or raises
+        raise RuntimeError(f"OpenAI {operation} call made no attempts")
+
+    async def _backoff(self, operation: str, attempt: int, error: Exception) -> None:
+        """Sleep with full-jitter exponential backoff before a retry."""
+        ceiling = min(settings.openai_retry_max_delay, settings.openai_retry_base_delay * 2 ** attempt)
+        delay = random.uniform(0, ceiling)
+        openai_retries.inc(operation=operation)
+        logger.warning(
+            "Retrying OpenAI call",
+            operation=operation,
+            attempt=attempt + 1,
+            delay_s=round(delay, 3),
+            error=str(error)
+        )
+        await asyncio.sleep(delay)
 
     async def create_completion(
         self,
         prompt: str,
-        **kwargs
+        **kwargs: Any
     ) -> str:
         """Create a simple completion (non-chat)."""
         try:
-            response = await self.client.completions.create(
-                model=settings.openai_model,
-                prompt=prompt,
-                temperature=settings.openai_temperature,
-                max_tokens=settings.openai_max_tokens,
-                **kwargs
+            response = await self._call_with_retries(
+                "completion",
+                lambda: self.client.completions.create(
+                    model=settings.openai_model,
+                    prompt=prompt,
+                    temperature=settings.openai_temperature,
+                    max_tokens=settings.openai_max_tokens,
+                    **kwargs
+                )
             )
             return response.choices[0].text or ""
         except Exception as e:
             logger.error("OpenAI completion error", error=str(e))
             raise
 
+    async def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts directly, one embeddings request per batch of inputs."""
+        embeddings: List[List[float]] = []
+        try:
+            for start in range(0, len(texts), settings.embedding_batch_size):
+                batch = texts[start:start + settings.embedding_batch_size]
+                response = await self._call_with_retries(
+                    "embeddings",
+                    lambda: self.client.embeddings.create(
+                        model=settings.openai_embedding_model,
+                        input=batch
+                    )
+                )
+                ordered = sorted(response.data, key=lambda item: item.index)
+                embeddings.extend(item.embedding for item in ordered)
+            return embeddings
+        except Exception as e:
+            logger.error("OpenAI embeddings error", error=str(e), batch_size=len(texts))
+            raise
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts through the shared micro-batcher.
+
+        Concurrent calls from different sessions are merged into one request,
+        and repeated content is served from the content-hash cache.
+        """
+        return await self.embedding_batcher.embed(texts)
+
 
 # Global client instance
 openai_client = OpenAIClient()
\ No newline at end of file
@@ -1,6 +1,8 @@
 """Settings for the Advent Intelligence service."""
 
-from pydantic import BaseSettings
+import os
+import tempfile
+from pydantic_settings import BaseSettings
 from typing import Optional
 
 
@@ -12,15 +14,139 @@ class Settings(BaseSettings):
     openai_model: str = "gpt-4-turbo-preview"
     openai_temperature: float = 0.7
     openai_max_tokens: int = 1000
+    openai_embedding_model: str = "text-embedding-ada-002"
+    openai_structured_outputs: bool = True  # Requires a model with json_schema support
+
+    # OpenAI HTTP transport and resilience
+    openai_max_connections: int = 200
+    openai_max_keepalive_connections: int = 50
+    openai_keepalive_expiry: float = 30.0
+    openai_http2: bool = False  # Requires the h2 package
+    openai_connect_timeout: float = 5.0
+    openai_read_timeout: float = 60.0
+    openai_write_timeout: float = 10.0
+    openai_pool_timeout: float = 5.0
+    openai_max_retries: int = 3
+    openai_retry_base_delay: float = 0.25
+    openai_retry_max_delay: float = 4.0
+    openai_circuit_failure_threshold: int = 5
+    openai_circuit_reset_seconds: float = 30.0
+
+    # Persona prompt templates
+    prompt_reload_interval_seconds: float = 5.0  # How often prompt file mtimes are checked
+    prompt_cache_size: int = 1024  # Rendered system prompts kept
+
+    # Chat context assembly
+    context_token_budget: int = 3000  # Prompt tokens per chat turn
+    context_max_memories: int = 5
+
+    # Daily message generation
+    generate_days_shard_size: int = 4
+    generate_days_concurrency: int = 6
+    generate_days_shard_retries: int = 2
+    generation_cache_max_entries: int = 512
+    generation_cache_ttl_seconds: int = 7 * 24 * 60 * 60
+
+    # Batch calendar generation
+    batch_max_requests: int = 500  # Children per job
+    batch_workers: int = 8  # Calendars generated concurrently
+    batch_upstream_concurrency: int = 12  # Shard calls in flight across all batch jobs
+    batch_lease_seconds: int = 30
+    batch_job_ttl_seconds: int = 7 * 24 * 60 * 60
+    batch_stream_poll_interval: float = 0.5
+
+    # Semantic cache of replies to short, repeated chat messages
+    response_cache_enabled: bool = False
+    response_cache_ttl_seconds: int = 60 * 60
+    response_cache_similarity_threshold: float = 0.95
+    response_cache_max_message_chars: int = 80
+    response_cache_history_depth: int = 2  # Prior messages in the history fingerprint
+    response_cache_replay_delay_ms: float = 15.0  # Per replayed token
+
+    # Embedding micro-batching
+    embedding_batch_size: int = 256
+    embedding_batch_wait_ms: float = 20.0
+    embedding_cache_size: int = 10000
+
+    # Local OpenAI stand-in for load testing (never enable in production)
+    openai_fake_upstream: bool = False
+    fake_upstream_ttft_ms: float = 300.0
+    fake_upstream_token_latency_ms: float = 30.0
+    fake_upstream_jitter_ms: float = 10.0
+    fake_upstream_error_rate: float = 0.0
+    fake_upstream_tokens: int = 60
 
     # Redis/Document Store Configuration
     redis_url: str = "redis://localhost:6379"
     memory_ttl_days: int = 365  # Keep memories for a year
+    short_term_memory_window: int = 5  # Messages kept per session
+    session_cache_ttl_seconds: float = 120.0  # In-process session history after a warm-up or turn
+    session_cache_max_sessions: int = 10000
 
-    # Server Configuration
+    # Short-term session encoding: "msgpack" or "json"
+    session_format: str = "msgpack"
+
+    # Approximate long-term memory search: children with at least
+    # ann_min_vectors chunk embeddings get an IVF index (0 disables). It is
+    # saved under ann_index_dir and memory-mapped, so its float32 re-rank
+    # vectors sit in the page cache, not the heap. Each worker process uses
+    # its own subdirectory, deleted on shutdown; a child's file is deleted
+    # when its memory expires. "" keeps the index in RAM, which then holds
+    # the float32 vectors plus the int8 codes (~1.25x the exact index).
+    ann_min_vectors: int = 2000
+    ann_index_dir: str = os.path.join(tempfile.gettempdir(), "advent-intelligence-ann")
+    ann_nprobe: int = 8  # Lists scanned per query
+    ann_rerank_factor: int = 4  # Exact re-rank candidates per result
+    ann_rebuild_fraction: float = 0.2  # Rebuild once this share of the index has changed
+
+    # Long-term memory compaction: chunks older than the minimum age that
+    # searches returned at most max_access times are merged into summaries
+    memory_compaction_enabled: bool = True
+    memory_compaction_interval_seconds: int = 3600
+    memory_compaction_min_age_days: float = 7.0
+    memory_compaction_max_access: int = 1
+    memory_compaction_group_size: int = 8  # Chunks merged per summary
+    memory_max_chunks_per_child: int = 500  # Least retrieved beyond this are dropped
+    memory_summary_max_tokens: int = 300
+
+    # Background persistence of chat turns
+    persistence_queue_size: int = 1000
+    persistence_workers: int = 4
+    persistence_drain_timeout: float = 10.0
+
+    # SSE framing: tokens after the first are coalesced per interval or size
+    sse_flush_interval_ms: float = 50.0
+    sse_max_frame_bytes: int = 512
+    sse_keepalive_seconds: float = 15.0
+
+    # Chat stream admission: global concurrency cap with a bounded wait queue,
+    # and token buckets (burst, refill per minute) shared across workers via Redis
+    stream_max_concurrent: int = 200
+    stream_max_waiting: int = 100
+    stream_wait_timeout: float = 2.0  # Seconds
+    child_rate_burst: int = 10
+    child_rate_per_minute: float = 20.0
+    session_rate_burst: int = 5
+    session_rate_per_minute: float = 12.0
+
+    # Server Configuration (see src.api.serve)
     host: str = "0.0.0.0"
     port: int = 8001
     debug: bool = False
+    workers: int = 1  # Server processes
+    server: str = "uvicorn"  # "uvicorn" or "gunicorn" (server extra)
+    worker_ports: bool = False  # Give each worker its own port (port + 1 + i) for child affinity
+
+    # Child affinity: children are owned by workers via a consistent hash over
+    # the live workers; mode "off", "report" (count misses) or "redirect" (307)
+    affinity_mode: str = "off"
+    affinity_advertise_url: str = ""  # This worker's base URL as callers reach it
+    affinity_heartbeat_seconds: float = 5.0
+
+    # Cross-worker invalidation of in-process caches over Redis pub/sub
+    # (enabled automatically by src.api.serve when running several workers)
+    cache_invalidation_enabled: bool = False
+    cache_invalidation_channel: str = "cache:invalidate"
 
     # Logging
     log_level: str = "INFO"
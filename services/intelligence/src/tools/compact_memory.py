@@ -0,0 +1,58 @@
+"""Run one long-term memory compaction pass and report what it reclaimed.
+
+Prunes index entries of expired chunks, merges old, rarely retrieved chunks
+into summaries and caps each child's chunk count, as the server's
+background compactor does every `memory_compaction_interval_seconds`.
+
+    python -m src.tools.compact_memory [--child-id ID] [--min-age-days 7]
+"""
+
+import argparse
+import asyncio
+from dataclasses import asdict
+from typing import Optional
+
+import structlog
+
+from ..core.memory_compaction import MemoryCompactor
+from ..core.memory_manager import memory_manager
+from ..integrations.openai_client import openai_client
+from ..settings import settings
+
+logger = structlog.get_logger(__name__)
+
+
+async def compact_memory(child_id: Optional[str] = None, min_age_days: Optional[float] = None) -> None:
+    """Compact one child, or every child with long-term memory."""
+    if min_age_days is None:
+        min_age_days = settings.memory_compaction_min_age_days
+    compactor = MemoryCompactor(
+        memory_manager,
+        openai_client,
+        min_age_seconds=min_age_days * 24 * 60 * 60,
+        max_access_count=settings.memory_compaction_max_access,
+        group_size=settings.memory_compaction_group_size,
+        max_chunks=settings.memory_max_chunks_per_child,
+        summary_max_tokens=settings.memory_summary_max_tokens
+    )
+    try:
+        if child_id:
+            report = await compactor.compact_child(child_id)
+        else:
+            report = await compactor.run_once()
+        logger.info("Memory compaction report", **asdict(report))
+    finally:
+        await openai_client.close()
+        await memory_manager.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compact long-term memory chunks into summaries")
+    parser.add_argument("--child-id", help="Compact only this child")
+    parser.add_argument("--min-age-days", type=float, help="Override memory_compaction_min_age_days")
+    args = parser.parse_args()
+    asyncio.run(compact_memory(child_id=args.child_id, min_age_days=args.min_age_days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Bulk import chat transcripts into long-term memory.
+
+Reads JSON array files (like `chat_sessions/*.json`) and NDJSON exports, one
+message per element/line, with bounded memory. Consecutive messages of the
+same child and session are chunked with `MemoryManager.chunk_messages`, the
+chunks are embedded in large batches and appended to the memory store with
+one pipeline per child per batch. Several workers embed and write in
+parallel while the reader streams ahead, up to a bounded queue.
+
+Accepted records:
+
+  - `{"timestamp": ..., "message": {"role": ..., "content": ...}}`
+    (chat_sessions files; the file name is the session id, and the child
+    comes from --child-id)
+  - `{"child_id": ..., "session_id": ..., "sender": ..., "content": ...,
+    "created_at": ...}`, e.g. a Postgres export ordered by child, session
+    and time:
+
+        \\copy (SELECT row_to_json(t) FROM (SELECT s.child_id, m.session_id,
+            m.sender, m.content, m.created_at FROM chat_message_v2 m
+            JOIN chat_session_v2 s USING (session_id)
+            ORDER BY s.child_id, m.session_id, m.created_at) t) TO 'messages.ndjson'
+
+Progress is checkpointed per file in Redis as the number of records fully
+written, so an interrupted run resumes where it stopped. Batches that
+finished after the last checkpoint are imported again on resume, so a crash
+can duplicate up to about workers x batch size chunks.
+
+    python -m src.tools.import_history chat_sessions/*.json --child-id CHILD
+    python -m src.tools.import_history messages.ndjson --workers 8 --run-name backfill
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import structlog
+
+from ..core.json_stream import JsonArrayStreamParser
+from ..core.memory_manager import memory_manager
+from ..integrations.openai_client import openai_client
+
+logger = structlog.get_logger(__name__)
+
+READ_BLOCK_SIZE = 64 * 1024
+SENDER_ROLES = {"child": "user", "parent_agent": "assistant", "system": "system"}
+
+# (child_id, session_id, message)
+Record = Tuple[str, str, Dict[str, Any]]
+
+
+@dataclass
+class ImportBatch:
+    """Chunks to embed and write, ending at a record offset in their source file."""
+    source: str
+    seq: int
+    end_offset: int
+    chunks: List[Tuple[str, List[Dict[str, Any]]]] = field(default_factory=list)  # (child_id, messages)
+
+
+@dataclass
+class ImportStats:
+    records: int = 0
+    skipped: int = 0  # Records without a child or content
+    resumed: int = 0  # Records before a checkpoint
+    chunks: int = 0
+    bytes_written: int = 0
+    failed_batches: int = 0
+
+
+class SourceCheckpoint:
+    """Tracks finished batches of one file and advances its contiguous offset."""
+
+    def __init__(self, offset: int):
+        self.offset = offset
+        self._next_seq = 0
+        self._finished: Dict[int, int] = {}  # seq -> end offset
+
+    def finish(self, seq: int, end_offset: int) -> bool:
+        """Record a finished batch; returns True if the offset advanced."""
+        self._finished[seq] = end_offset
+        advanced = False
+        while self._next_seq in self._finished:
+            self.offset = self._finished.pop(self._next_seq)
+            self._next_seq += 1
+            advanced = True
+        return advanced
+
+
+def normalize_record(
+    record: Any,
+    default_child_id: Optional[str],
+    default_session_id: str
+) -> Optional[Record]:
+    """Map either accepted record shape to (child_id, session_id, message)."""
+    if not isinstance(record, dict):
+        return None
+    nested = record.get("message")
+    if not isinstance(nested, dict):
+        nested = {}
+    content = nested.get("content", record.get("content"))
+    child_id = record.get("child_id") or default_child_id
+    if not content or not child_id:
+        return None
+
+    role = nested.get("role") or record.get("role") or SENDER_ROLES.get(record.get("sender", ""), "user")
+    message = {"role": role, "content": content}
+    timestamp = record.get("timestamp") or record.get("created_at")
+    if timestamp:
+        message["timestamp"] = timestamp
+    return str(child_id), str(record.get("session_id") or default_session_id), message
+
+
+def iter_records(path: str) -> Iterator[Any]:
+    """Yield the elements of a JSON array file, or the lines of an NDJSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+
+        if head == "[":
+            parser = JsonArrayStreamParser()
+            block = head
+            while block:
+                yield from parser.feed(block)
+                block = f.read(READ_BLOCK_SIZE)
+            return
+
+        f.seek(0)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class HistoryImporter:
+    """Streams sources into batches and runs embedding/write workers over them."""
+
+    def __init__(
+        self,
+        run_name: str = "default",
+        workers: int = 4,
+        batch_chunks: int = 256,
+        chunk_size: int = 10,
+        child_id: Optional[str] = None,
+        dry_run: bool = False,
+        report_interval: float = 10.0
+    ):
+        self.run_name = run_name
+        self.worker_count = workers
+        self.batch_chunks = batch_chunks
+        self.chunk_size = chunk_size
+        self.child_id = child_id
+        self.dry_run = dry_run
+        self.report_interval = report_interval
+        self.stats = ImportStats()
+        self._checkpoints: Dict[str, SourceCheckpoint] = {}
+        self._started = 0.0
+
+    async def run(self, paths: List[str]) -> ImportStats:
+        """Import every file, resuming each from its checkpoint."""
+        self._started = time.perf_counter()
+        queue: "asyncio.Queue[Optional[ImportBatch]]" = asyncio.Queue(maxsize=self.worker_count * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.worker_count)]
+        reporter = asyncio.create_task(self._report_periodically())
+
+        try:
+            for path in paths:
+                async for batch in self._batches(path):
+                    await queue.put(batch)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(reporter, *workers, return_exceptions=True)
+
+        self._report("History import finished")
+        return self.stats
+
+    async def _batches(self, path: str) -> AsyncIterator[ImportBatch]:
+        """Group a file's records into per-session chunks and batch them."""
+        source = os.path.abspath(path)
+        checkpoint = SourceCheckpoint(await self._load_checkpoint(source))
+        self._checkpoints[source] = checkpoint
+        default_session_id = os.path.splitext(os.path.basename(path))[0]
+
+        seq = 0
+        batch = ImportBatch(source, seq, checkpoint.offset)
+        session: Optional[Tuple[str, str]] = None
+        pending: List[Dict[str, Any]] = []
+
+        def flush_session() -> None:
+            if session is not None:
+                for chunk in memory_manager.chunk_messages(pending, self.chunk_size):
+                    batch.chunks.append((session[0], chunk))
+            pending.clear()
+
+        offset = 0
+        for offset, raw in enumerate(iter_records(path), start=1):
+            if offset <= checkpoint.offset:
+                self.stats.resumed += 1
+                continue
+            self.stats.records += 1
+
+            record = normalize_record(raw, self.child_id, default_session_id)
+            if record is None:
+                self.stats.skipped += 1
+                continue
+
+            child_id, session_id, message = record
+            if (child_id, session_id) != session or len(pending) >= self.chunk_size:
+                flush_session()
+                session = (child_id, session_id)
+                if len(batch.chunks) >= self.batch_chunks:
+                    # Records up to, not including, this one are in the batch
+                    batch.end_offset = offset - 1
+                    yield batch
+                    seq += 1
+                    batch = ImportBatch(source, seq, offset - 1)
+            pending.append(message)
+
+            if offset % 10000 == 0:
+                await asyncio.sleep(0)  # Let workers run between large blocks
+
+        flush_session()
+        batch.end_offset = max(offset, checkpoint.offset)
+        yield batch
+
+    async def _worker(self, queue: "asyncio.Queue[Optional[ImportBatch]]") -> None:
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return
+            try:
+                await self._write(batch)
+            except Exception as e:
+                # Leave the checkpoint behind this batch so a rerun retries it
+                self.stats.failed_batches += 1
+                logger.error(f"History import batch {batch.seq} of {batch.source} failed: {e}")
+                continue
+
+            if self._checkpoints[batch.source].finish(batch.seq, batch.end_offset):
+                await self._save_checkpoint(batch.source)
+
+    async def _write(self, batch: ImportBatch) -> None:
+        """Embed a batch's chunks in one go, then write each child's chunks in one pipeline."""
+        if not batch.chunks:
+            return
+        if self.dry_run:
+            self.stats.chunks += len(batch.chunks)
+            return
+
+        embeddings = await openai_client.create_embeddings(
+            [memory_manager.format_chunk(chunk) for _, chunk in batch.chunks]
+        )
+
+        by_child: Dict[str, Tuple[List[List[Dict[str, Any]]], List[List[float]]]] = {}
+        for (child_id, chunk), embedding in zip(batch.chunks, embeddings):
+            chunks, child_embeddings = by_child.setdefault(child_id, ([], []))
+            chunks.append(chunk)
+            child_embeddings.append(embedding)
+
+        written = await asyncio.gather(*[
+            memory_manager.store_chunks(child_id, chunks, child_embeddings, metadata={"source": "import"})
+            for child_id, (chunks, child_embeddings) in by_child.items()
+        ])
+        self.stats.chunks += len(batch.chunks)
+        self.stats.bytes_written += sum(written)
+
+    def _checkpoint_key(self) -> str:
+        """Redis hash of source path -> records imported, per run."""
+        return f"import:history:{self.run_name}"
+
+    async def _load_checkpoint(self, source: str) -> int:
+        value = await memory_manager.redis_client.hget(self._checkpoint_key(), source)
+        return int(value or 0)
+
+    async def _save_checkpoint(self, source: str) -> None:
+        if not self.dry_run:
+            offset = self._checkpoints[source].offset
+            await memory_manager.redis_client.hset(self._checkpoint_key(), source, offset)
+
+    async def _report_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self._report("History import progress")
+
+    def _report(self, event: str) -> None:
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        logger.info(
+            event,
+            records=self.stats.records,
+            chunks=self.stats.chunks,
+            skipped=self.stats.skipped,
+            resumed=self.stats.resumed,
+            failed_batches=self.stats.failed_batches,
+            mb_written=round(self.stats.bytes_written / 1e6, 1),
+            records_per_s=round(self.stats.records / elapsed, 1),
+            chunks_per_s=round(self.stats.chunks / elapsed, 1),
+            elapsed_s=round(elapsed, 1)
+        )
+
+
+async def import_history(paths: List[str], **options: Any) -> ImportStats:
+    """Run an import and close the clients afterwards."""
+    try:
+        return await HistoryImporter(**options).run(paths)
+    finally:
+        await openai_client.close()
+        await memory_manager.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import chat transcripts into long-term memory")
+    parser.add_argument("paths", nargs="+", help="JSON array or NDJSON transcript files")
+    parser.add_argument("--child-id", help="Child for records that do not name one")
+    parser.add_argument("--run-name", default="default", help="Checkpoint namespace; reuse to resume")
+    parser.add_argument("--workers", type=int, default=4, help="Batches embedded and written concurrently")
+    parser.add_argument("--batch-chunks", type=int, default=256, help="Chunks per embedding batch")
+    parser.add_argument("--chunk-size", type=int, default=10, help="Messages per chunk")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and chunk only; no embedding or writes")
+    args = parser.parse_args()
+    asyncio.run(import_history(
+        args.paths,
+        run_name=args.run_name,
+        workers=args.workers,
+        batch_chunks=args.batch_chunks,
+        chunk_size=args.chunk_size,
+        child_id=args.child_id,
+        dry_run=args.dry_run
+    ))
+
+
+if __name__ == "__main__":
+    main()
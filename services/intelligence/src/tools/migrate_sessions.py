@@ -0,0 +1,116 @@
+"""Migrate whole-session blobs into the append-only session log.
+
+Scans legacy `session:{id}` keys (any encoding, including plain JSON), moves
+their messages into the `session:{id}:messages` list and their metadata into
+the `session:{id}:meta` hash, then deletes the blob. Messages already
+appended to the log since the deploy are kept after the migrated ones. Keys
+keep their remaining TTL.
+
+    python -m src.tools.migrate_sessions [--dry-run] [--batch-size 500]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import structlog
+
+from ..core.memory_manager import memory_manager
+from ..settings import settings
+
+logger = structlog.get_logger(__name__)
+
+LOG_SUFFIXES = (b":messages", b":meta")
+
+
+async def migrate_sessions(batch_size: int = 500, dry_run: bool = False) -> None:
+    """Move every legacy session blob into the session log layout."""
+    client = memory_manager.binary_redis_client
+    serializer = memory_manager.session_serializer
+    window = settings.short_term_memory_window
+
+    scanned = migrated = failed = bytes_before = bytes_after = 0
+    started = time.perf_counter()
+
+    async def process(keys: List[bytes]) -> None:
+        nonlocal scanned, migrated, failed, bytes_before, bytes_after
+        scanned += len(keys)
+
+        read = client.pipeline(transaction=False)
+        for key in keys:
+            read.get(key)
+            read.pttl(key)
+            read.exists(key + b":messages")
+        results = await read.execute()
+
+        write = client.pipeline(transaction=False)
+        for i, key in enumerate(keys):
+            raw, ttl_ms, has_log = results[i * 3:i * 3 + 3]
+            if not raw:
+                continue
+            try:
+                record = serializer.loads(raw) or {}
+            except Exception as e:
+                failed += 1
+                logger.error(f"Could not decode session record {key!r}: {e}")
+                continue
+
+            session_id = key.decode("utf-8")[len("session:"):]
+            log_key = memory_manager.session_log_key(session_id)
+            meta_key = memory_manager.session_meta_key(session_id)
+            encoded = [serializer.dumps(message) for message in record.get("messages", [])]
+
+            bytes_before += len(raw)
+            bytes_after += sum(len(entry) for entry in encoded)
+            migrated += 1
+
+            if encoded:
+                # Legacy messages are older than anything already in the log
+                write.lpush(log_key, *reversed(encoded))
+                write.ltrim(log_key, -window, -1)
+            write.hsetnx(meta_key, "child_id", record.get("child_id", ""))
+            write.hsetnx(meta_key, "updated_at", record.get("updated_at", ""))
+            if ttl_ms > 0:
+                if not has_log:
+                    write.pexpire(log_key, ttl_ms)
+                write.pexpire(meta_key, ttl_ms)
+            write.delete(key)
+
+        if not dry_run and len(write):
+            await write.execute()
+
+    batch: List[bytes] = []
+    async for key in client.scan_iter(match="session:*", count=batch_size):
+        if key.endswith(LOG_SUFFIXES):
+            continue
+        batch.append(key)
+        if len(batch) >= batch_size:
+            await process(batch)
+            batch = []
+    if batch:
+        await process(batch)
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Session migration finished",
+        dry_run=dry_run,
+        scanned=scanned,
+        migrated=migrated,
+        failed=failed,
+        bytes_before=bytes_before,
+        bytes_after=bytes_after,
+        elapsed_s=round(elapsed, 2)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate session blobs into the session log")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report without writing")
+    args = parser.parse_args()
+    asyncio.run(migrate_sessions(batch_size=args.batch_size, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# Settings require an API key at import; tests never call the real API
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,98 @@
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+import fakeredis.aioredis
+import pytest
+from starlette.requests import Request
+
+from src.api.affinity import HOP_PARAM, ChildAffinity, HashRing
+from src.api.container import ServiceContainer
+
+NODES = [f"http://10.0.0.{i}:8001" for i in range(4)]
+CHILDREN = [f"child-{i}" for i in range(20000)]
+
+
+def request(query: bytes = b"") -> Request:
+    return Request({
+        "type": "http", "method": "POST", "path": "/chat/stream", "query_string": query,
+        "headers": [], "server": ("10.0.0.0", 8001), "scheme": "http",
+    })
+
+
+def test_ring_spreads_children_across_nodes():
+    ring = HashRing(NODES)
+    counts = Counter(ring.node_for(child) for child in CHILDREN)
+
+    assert set(counts) == set(NODES)
+    assert min(counts.values()) > len(CHILDREN) / len(NODES) * 0.6
+
+
+def test_removing_a_node_moves_only_its_children():
+    before = HashRing(NODES)
+    after = HashRing(NODES[:-1])
+    moved = [child for child in CHILDREN if before.node_for(child) != after.node_for(child)]
+
+    assert all(before.node_for(child) == NODES[-1] for child in moved)
+    assert len(moved) < len(CHILDREN) * 0.35
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing().node_for("child-1") is None
+
+
+def affinity(mode: str) -> ChildAffinity:
+    routed = ChildAffinity(None, NODES[0] + "/", mode=mode)
+    routed.ring = HashRing(NODES)
+    return routed
+
+
+def remote_child() -> str:
+    ring = HashRing(NODES)
+    return next(child for child in CHILDREN if ring.node_for(child) != NODES[0])
+
+
+def test_redirects_to_owner_once():
+    routed = affinity("redirect")
+    child = remote_child()
+
+    response = routed.route(child, request(b"trace=1"))
+    assert response.status_code == 307
+    assert response.headers["location"] == f"{routed.owner(child)}/chat/stream?trace=1&{HOP_PARAM}=1"
+
+    assert routed.route(child, request(f"{HOP_PARAM}=1".encode())) is None
+
+
+def test_local_children_and_other_modes_are_served_here():
+    ring = HashRing(NODES)
+    local = next(child for child in CHILDREN if ring.node_for(child) == NODES[0])
+
+    assert affinity("redirect").route(local, request()) is None
+    assert affinity("report").route(remote_child(), request()) is None
+    assert affinity("off").route(remote_child(), request()) is None
+    assert ChildAffinity(None, "", mode="redirect").mode == "off"
+
+
+async def test_heartbeat_joins_and_leaves_the_ring():
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    workers = [ChildAffinity(redis_client, url, mode="redirect", heartbeat_interval=0.01) for url in NODES[:2]]
+    for worker in workers:
+        worker.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert workers[0].ring.nodes == sorted(NODES[:2])
+
+        await workers[1].stop()
+        await asyncio.sleep(0.05)
+        assert workers[0].ring.nodes == [NODES[0]]
+    finally:
+        await workers[0].stop()
+
+
+@pytest.mark.parametrize("mode,advertise_url", [("off", "http://10.0.0.1:8001"), ("redirect", "")])
+def test_container_skips_affinity_when_not_configured(mode, advertise_url):
+    container = ServiceContainer()
+    container.__dict__["settings"] = SimpleNamespace(affinity_mode=mode, affinity_advertise_url=advertise_url)
+
+    assert container.route_child(remote_child(), request()) is None
+    assert not container.is_created("child_affinity")
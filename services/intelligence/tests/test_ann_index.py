@@ -0,0 +1,134 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from src.core.ann_index import IVFQuantizedIndex
+from src.core.embedding_index import AnnChildIndex, EmbeddingIndex
+
+
+def clustered_vectors(count=2000, dim=64, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    vectors = centers[rng.integers(clusters, size=count)] + 0.3 * rng.standard_normal((count, dim))
+    return [f"memory:c1:chunk:{i}" for i in range(count)], vectors.astype(np.float32)
+
+
+def exact_top(keys, vectors, query, limit):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = unit @ query
+    return [keys[i] for i in np.argsort(-scores)[:limit]]
+
+
+def unit(vector):
+    return vector / np.linalg.norm(vector)
+
+
+def test_search_recall_against_exact():
+    keys, vectors = clustered_vectors()
+    index = IVFQuantizedIndex.build(keys, vectors)
+    rng = np.random.default_rng(1)
+
+    found = 0
+    for row in rng.choice(len(keys), 50, replace=False):
+        query = unit(vectors[row] + 0.05 * rng.standard_normal(vectors.shape[1]).astype(np.float32))
+        hits = [key for key, _ in index.search(query, 5, threshold=-1.0, nprobe=8)]
+        found += len(set(hits) & set(exact_top(keys, vectors, query, 5)))
+
+    assert found / 250 >= 0.9
+
+
+def test_save_and_load_round_trip(tmp_path):
+    keys, vectors = clustered_vectors(count=500)
+    index = IVFQuantizedIndex.build(keys, vectors, built_at=123.0)
+    path = str(tmp_path / "child.ivf")
+    size = index.save(path)
+
+    loaded = IVFQuantizedIndex.load(path)
+    query = unit(vectors[7])
+
+    assert size == (tmp_path / "child.ivf").stat().st_size
+    assert loaded.built_at == 123.0
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.search(query, 3, 0.5) == index.search(query, 3, 0.5)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "bad.ivf"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        IVFQuantizedIndex.load(str(path))
+
+
+def test_masked_and_delta_vectors():
+    keys, vectors = clustered_vectors(count=500)
+    index = AnnChildIndex(IVFQuantizedIndex.build(keys, vectors))
+
+    index.remove(keys[3])
+    assert keys[3] not in [key for key, _ in index.search(vectors[3], 5, 0.0)]
+
+    index.upsert("memory:c1:chunk:new", vectors[3])
+    assert index.search(vectors[3], 1, 0.0)[0][0] == "memory:c1:chunk:new"
+    assert len(index) == 500
+    assert index.stale_fraction == pytest.approx(2 / 500)
+
+
+async def test_rebuild_memory_maps_the_saved_index(tmp_path):
+    keys, vectors = clustered_vectors(count=300)
+    embeddings = EmbeddingIndex(ann_min_vectors=100, ann_dir=str(tmp_path))
+    embeddings.load_child("c1", list(zip(keys, vectors.tolist())))
+
+    assert embeddings.needs_rebuild("c1")
+    await embeddings.rebuild("c1")
+
+    child = embeddings._children["c1"]
+    assert isinstance(child, AnnChildIndex)
+    assert isinstance(child.base.vectors, np.memmap)
+    assert embeddings.search("c1", vectors[5], 1, 0.5)[0][0] == keys[5]
+
+
+async def test_saved_index_files_are_per_process_and_cleaned_up(tmp_path):
+    keys, vectors = clustered_vectors(count=300)
+    embeddings = EmbeddingIndex(ann_min_vectors=100, ann_dir=str(tmp_path), rebuild_fraction=0.01)
+    embeddings.load_child("c1", list(zip(keys, vectors.tolist())))
+    await embeddings.rebuild("c1")
+
+    process_dir = tmp_path / f"worker-{os.getpid()}"
+    saved = list(process_dir.iterdir())
+    assert len(saved) == 1
+
+    # A rebuild replaces the child's file rather than adding one
+    for key in keys[:10]:
+        embeddings.upsert("c1", key, None)
+    assert embeddings.needs_rebuild("c1")
+    await embeddings.rebuild("c1")
+    assert list(process_dir.iterdir()) == saved
+
+    embeddings.drop("c1")
+    assert not embeddings.is_loaded("c1")
+    assert list(process_dir.iterdir()) == []
+
+    embeddings.load_child("c2", list(zip(keys, vectors.tolist())))
+    await embeddings.rebuild("c2")
+    embeddings.close()
+    assert not process_dir.exists()
+
+
+async def test_directories_of_exited_processes_are_removed(tmp_path):
+    exited = subprocess.Popen([sys.executable, "-c", ""])
+    exited.wait()
+    (tmp_path / f"worker-{exited.pid}").mkdir()
+    (tmp_path / f"worker-{exited.pid}" / "stale.ivf").write_bytes(b"x")
+    (tmp_path / f"worker-{os.getppid()}").mkdir()
+
+    keys, vectors = clustered_vectors(count=300)
+    embeddings = EmbeddingIndex(ann_min_vectors=100, ann_dir=str(tmp_path))
+    embeddings.load_child("c1", list(zip(keys, vectors.tolist())))
+    await embeddings.rebuild("c1")
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        [f"worker-{os.getppid()}", f"worker-{os.getpid()}"]
+    )
+    embeddings.close()
@@ -0,0 +1,131 @@
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+
+from src.core.batch_jobs import BatchJobManager
+
+
+class BlockingEngine:
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = []
+
+    async def generate_daily_messages(self, child_id, **kwargs):
+        self.calls.append(child_id)
+        await self.release.wait()
+        return [{"day": 1, "message": f"Hello {child_id}"}], True
+
+
+class FallbackEngine:
+    """Falls back to placeholder days for the children in `degraded`."""
+
+    def __init__(self, degraded):
+        self.degraded = set(degraded)
+        self.calls = []
+
+    async def generate_daily_messages(self, child_id, **kwargs):
+        self.calls.append(child_id)
+        return [{"day": 1, "message": "Placeholder"}], child_id not in self.degraded
+
+
+def requests(count):
+    return [{"child_id": f"c{i}", "child_name": f"Child {i}", "persona": "mummy"} for i in range(count)]
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+
+async def wait_until(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def test_job_runs_to_completion(redis_client):
+    engine = BlockingEngine()
+    engine.release.set()
+    manager = BatchJobManager(engine, redis_client, workers=2)
+    manager.start()
+    try:
+        job_id = await manager.submit("account", requests(3))
+        await wait_until(lambda: job_id not in manager._remaining)
+        status = await manager.status(job_id)
+    finally:
+        await manager.stop()
+
+    assert status["status"] == "completed"
+    assert status["completed"] == 3
+    assert await redis_client.exists(manager._lease_key(job_id)) == 0
+
+
+async def test_lost_lease_stops_work_and_is_not_renewed_or_released(redis_client):
+    engine = BlockingEngine()
+    manager = BatchJobManager(engine, redis_client, workers=1)
+    manager.start()
+    try:
+        job_id = await manager.submit("account", requests(3))
+        await wait_until(lambda: engine.calls)
+
+        # Another process claims the job after this one stalled past its lease
+        lease_key = manager._lease_key(job_id)
+        await redis_client.set(lease_key, "other-process", ex=30)
+        await manager._renew_leases()
+        assert job_id not in manager._remaining
+
+        engine.release.set()
+        await asyncio.sleep(0.05)
+        assert engine.calls == ["c0"]  # Queued children were skipped
+    finally:
+        await manager.stop()
+
+    assert await redis_client.get(lease_key) == "other-process"
+    assert (await manager.status(job_id))["status"] == "running"
+
+
+async def test_renewal_extends_own_lease(redis_client):
+    engine = BlockingEngine()
+    manager = BatchJobManager(engine, redis_client, workers=1, lease_seconds=30)
+    manager.start()
+    try:
+        job_id = await manager.submit("account", requests(1))
+        await redis_client.expire(manager._lease_key(job_id), 5)
+        await manager._renew_leases()
+        assert await redis_client.ttl(manager._lease_key(job_id)) > 5
+        assert job_id in manager._remaining
+    finally:
+        engine.release.set()
+        await manager.stop()
+
+
+async def test_fallback_calendars_are_degraded_and_rerun_on_resume(redis_client):
+    engine = FallbackEngine(degraded={"c1"})
+    manager = BatchJobManager(engine, redis_client, workers=1)
+    manager.start()
+    try:
+        job_id = await manager.submit("account", requests(3))
+        await wait_until(lambda: job_id not in manager._remaining)
+        status = await manager.status(job_id)
+    finally:
+        await manager.stop()
+
+    assert (status["completed"], status["degraded"], status["failed"]) == (2, 1, 0)
+    assert [r["status"] for r in status["results"]] == ["completed", "degraded", "completed"]
+
+    # Another process resumes the job (as after a crash) once upstream recovers
+    await redis_client.hset(manager._job_key(job_id), "status", "running")
+    await redis_client.sadd(manager._active_key(), job_id)
+    engine = FallbackEngine(degraded=set())
+    resumed = BatchJobManager(engine, redis_client, workers=1)
+    resumed.start()
+    try:
+        await wait_until(lambda: engine.calls and job_id not in resumed._remaining)
+        status = await resumed.status(job_id)
+    finally:
+        await resumed.stop()
+
+    assert engine.calls == ["c1"]
+    assert status["completed"] == 3 and status["degraded"] == 0
@@ -0,0 +1,67 @@
+import asyncio
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from src.core import cache_invalidation
+from src.core.cache_invalidation import CacheInvalidationBus
+
+
+class RecordingPipe:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, data):
+        self.published.append((channel, data))
+
+
+def test_disabled_bus_publishes_nothing():
+    pipe = RecordingPipe()
+    CacheInvalidationBus("redis://unused", "ch", enabled=False).publish_in(pipe, "session", "s1")
+    assert pipe.published == []
+
+
+def test_handlers_run_for_other_workers_only():
+    writer = CacheInvalidationBus("redis://unused", "ch", enabled=True)
+    reader = CacheInvalidationBus("redis://unused", "ch", enabled=True)
+    seen = []
+    reader.subscribe("session", seen.append)
+    reader.subscribe("memory_index", lambda key: seen.append(f"index:{key}"))
+    writer.subscribe("session", lambda key: seen.append("own message"))
+
+    pipe = RecordingPipe()
+    writer.publish_in(pipe, "session", "s1")
+    writer.publish_in(pipe, "memory_index", "c1")
+    for _, data in pipe.published:
+        reader._dispatch(data)
+        writer._dispatch(data)
+
+    assert seen == ["s1", "index:c1"]
+
+
+async def test_invalidations_travel_over_pubsub(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        cache_invalidation.redis, "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(server=server, **kwargs)
+    )
+    writer = CacheInvalidationBus("redis://fake", "ch", enabled=True)
+    reader = CacheInvalidationBus("redis://fake", "ch", enabled=True)
+    received = asyncio.Event()
+    reader.subscribe("session", lambda key: received.set() if key == "s1" else None)
+    reader.start()
+    try:
+        client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+        for _ in range(50):
+            pipe = client.pipeline()
+            writer.publish_in(pipe, "session", "s1")
+            await pipe.execute()
+            try:
+                await asyncio.wait_for(received.wait(), timeout=0.02)
+                break
+            except asyncio.TimeoutError:
+                continue  # Listener not subscribed yet
+        assert received.is_set()
+    finally:
+        await reader.stop()
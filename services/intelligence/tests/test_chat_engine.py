@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import fakeredis.aioredis
+import pytest
+
+from src.api.schemas import PersonaType
+from src.api.sse import SSEWriter
+from src.core import chat_engine as chat_engine_module
+from src.core.chat_engine import ChatEngine
+from src.integrations.fake_openai import FakeAsyncOpenAI
+from src.integrations.openai_client import OpenAIClient
+from src.settings import settings
+
+
+@pytest.fixture
+def engine():
+    engine = ChatEngine()
+    engine.generation_cache.redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    return engine
+
+
+def generated(days):
+    return [{"day": day, "title": f"Day {day}", "content": "Snow!", "tone": "playful"} for day in days]
+
+
+async def test_generate_days_reports_a_failed_shard(engine, monkeypatch):
+    async def shard(days, child_name, persona, theme, semaphore):
+        if 1 in days:
+            return engine._get_fallback_messages(child_name)[:len(days)], False
+        return generated(days), True
+
+    monkeypatch.setattr(engine, "_generate_day_shard", shard)
+
+    messages, complete = await engine.generate_daily_messages("c1", "Ada", PersonaType.MUMMY)
+
+    assert len(messages) == 24 and not complete
+    assert engine.generation_cache.metrics()["local_entries"] == 0  # Not cached
+
+
+async def test_generate_days_reports_complete_calendars_from_cache(engine, monkeypatch):
+    async def shard(days, child_name, persona, theme, semaphore):
+        return generated(days), True
+
+    monkeypatch.setattr(engine, "_generate_day_shard", shard)
+
+    first = await engine.generate_daily_messages("c1", "Ada", PersonaType.MUMMY)
+    second = await engine.generate_daily_messages("c1", "Ada", PersonaType.MUMMY)
+
+    assert first[1] and second == first
+    assert engine.generation_cache.local_hits == 1
+
+
+async def test_generate_days_reports_an_open_circuit(engine, monkeypatch):
+    monkeypatch.setattr(chat_engine_module, "openai_client", SimpleNamespace(available=False))
+
+    messages, complete = await engine.generate_daily_messages("c1", "Ada", PersonaType.MUMMY)
+
+    assert len(messages) == 24 and not complete
+
+
+@pytest.mark.parametrize("through_sse", [True, False])
+async def test_closing_a_chat_stream_closes_the_upstream(engine, monkeypatch, through_sse):
+    upstream = FakeAsyncOpenAI(ttft_ms=0, token_latency_ms=50, jitter_ms=0, tokens=100)
+    monkeypatch.setattr(chat_engine_module, "openai_client", OpenAIClient(client=upstream))
+    monkeypatch.setattr(settings, "response_cache_enabled", False)
+
+    async def no_memories(child_id, user_message):
+        return []
+
+    monkeypatch.setattr(engine, "_timed_relevant_memories", no_memories)
+
+    chunks = engine.generate_response(
+        child_id="c1",
+        session_id="s1",
+        user_message="Hello!",
+        persona=PersonaType.MUMMY,
+        child_name="Ada",
+        conversation_history=[{"role": "assistant", "content": "Hi Ada"}]
+    )
+    frames = SSEWriter(flush_interval=10.0).stream(chunks) if through_sse else chunks
+    await frames.__anext__()
+    assert upstream.open_streams == 1
+
+    await frames.aclose()  # Closed at a yield, as when the client goes away
+
+    assert upstream.open_streams == 0
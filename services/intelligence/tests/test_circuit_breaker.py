@@ -0,0 +1,66 @@
+import pytest
+
+from src.integrations import circuit_breaker
+from src.integrations.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("openai", failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()  # Resets the streak
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN and breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_allows_one_trial_then_closes(clock):
+    breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock[0] += 31
+    assert not breaker.is_open
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # Second caller while the trial is in flight
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_abandoned_trial_expires(clock):
+    breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    breaker.before_call()  # Trial never reports back
+
+    clock[0] += 31
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
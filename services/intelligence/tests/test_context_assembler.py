@@ -0,0 +1,87 @@
+import pytest
+
+from src.core.context_assembler import MESSAGE_OVERHEAD_TOKENS, ContextAssembler, TokenCounter
+
+
+class EstimatingCounter(TokenCounter):
+    """Four characters per token, so sizes below are exact."""
+
+    def _load_encoding(self, model):
+        return None
+
+
+def text(tokens):
+    return "abcd" * tokens
+
+
+def message(role, tokens):
+    return {"role": role, "content": text(tokens)}
+
+
+@pytest.fixture
+def counter():
+    return EstimatingCounter("test")
+
+
+def history_cost(messages):
+    return sum(len(m["content"]) // 4 + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+@pytest.mark.parametrize("slack,kept", [(0, 3), (-1, 2)])
+def test_history_fills_the_budget_exactly_then_drops_the_oldest(counter, slack, kept):
+    history = [message("user", 10), message("assistant", 20), message("user", 5), message("user", 3)]
+    system = text(50)
+    budget = 50 + MESSAGE_OVERHEAD_TOKENS + history_cost(history) + slack
+
+    messages = ContextAssembler(counter, budget).assemble(system, history, [])
+
+    assert messages[0] == {"role": "system", "content": system}
+    assert [m["content"] for m in messages[1:]] == [m["content"] for m in history[-(kept + 1):]]
+
+
+def test_stops_at_the_first_history_message_that_does_not_fit(counter):
+    # The 20-token turn does not fit, so the 1-token turn before it is dropped too
+    history = [message("user", 1), message("assistant", 20), message("user", 5), message("user", 3)]
+    budget = 10 + MESSAGE_OVERHEAD_TOKENS + history_cost(history[2:]) + 10
+
+    messages = ContextAssembler(counter, budget).assemble(text(10), history, [])
+
+    assert [m["content"] for m in messages[1:]] == [text(5), text(3)]
+
+
+@pytest.mark.parametrize("slack,snippets", [(0, 2), (-1, 1)])
+def test_memories_fill_the_budget_at_the_boundary(counter, slack, snippets):
+    header = counter.count("Previous conversations with your child:\n") + MESSAGE_OVERHEAD_TOKENS
+    # Each snippet is its content plus a newline: 4n + 1 characters, n + 1 tokens
+    memories = [{"content": text(7)}, {"content": text(11)}, {"content": text(1)}]
+    latest = [message("user", 2)]
+    budget = 10 + MESSAGE_OVERHEAD_TOKENS + history_cost(latest) + header + 8 + 12 + slack
+
+    messages = ContextAssembler(counter, budget).assemble(text(10), [message("user", 9)] + latest, memories)
+
+    context = messages[1]["content"]
+    assert context.count("\n") - 1 == snippets
+    # Memories are added best first and stop at the first that does not fit
+    assert text(1) not in context.split("\n")
+    # No room left for history once memories take it
+    assert messages[-1]["content"] == text(2) and len(messages) == 3
+
+
+def test_system_prompt_and_latest_message_are_kept_over_budget(counter):
+    history = [message("user", 5), message("user", 100)]
+
+    messages = ContextAssembler(counter, token_budget=10).assemble(text(100), history, [{"content": "x"}])
+
+    assert [m["content"] for m in messages] == [text(100), text(100)]
+
+
+def test_token_counts_are_memoized_on_messages_but_not_sent(counter):
+    history = [message("user", 3), message("assistant", 4)]
+
+    messages = ContextAssembler(counter, 1000).assemble("system", history, [])
+
+    assert [m.get("token_count") for m in history] == [3 + MESSAGE_OVERHEAD_TOKENS, 4 + MESSAGE_OVERHEAD_TOKENS]
+    assert all(set(m) == {"role", "content"} for m in messages)
+
+    history[0]["token_count"] = 10_000  # A stored count is trusted
+    assert len(ContextAssembler(counter, 1000).assemble("system", history, [])) == 2
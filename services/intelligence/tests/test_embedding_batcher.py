@@ -0,0 +1,54 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from src.integrations.embedding_batcher import EmbeddingBatcher
+
+
+class SlowEmbedder:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls: List[List[str]] = []
+
+    async def __call__(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        await asyncio.sleep(self.delay)
+        return [[float(len(text))] for text in texts]
+
+
+async def test_concurrent_callers_share_one_batch():
+    embedder = SlowEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_wait_ms=5)
+
+    results = await asyncio.gather(batcher.embed(["a", "bb"]), batcher.embed(["bb", "ccc"]))
+
+    assert results == [[[1.0], [2.0]], [[2.0], [3.0]]]
+    assert embedder.calls == [["a", "bb", "ccc"]]
+
+
+async def test_cancelling_one_caller_leaves_others_waiting_on_same_text():
+    embedder = SlowEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_wait_ms=5)
+
+    cancelled = asyncio.create_task(batcher.embed(["shared"]))
+    survivor = asyncio.create_task(batcher.embed(["shared"]))
+    await asyncio.sleep(0.01)  # Both waiting on the in-flight batch
+    cancelled.cancel()
+
+    assert await survivor == [[6.0]]
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    # The result still lands in the cache for later callers
+    assert await batcher.embed(["shared"]) == [[6.0]]
+    assert len(embedder.calls) == 1
+
+
+async def test_batch_failure_reaches_every_caller():
+    async def failing(texts: List[str]) -> List[List[float]]:
+        raise RuntimeError("upstream down")
+
+    batcher = EmbeddingBatcher(failing, max_wait_ms=1)
+    results = await asyncio.gather(batcher.embed(["x"]), batcher.embed(["x"]), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,77 @@
+import math
+import random
+
+import pytest
+
+from src.core.embedding_index import ChildEmbeddingIndex, EmbeddingIndex
+
+
+def cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norms = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norms if norms else 0.0
+
+
+def brute_force(vectors, query, limit, threshold):
+    scored = [(key, cosine(vector, query)) for key, vector in vectors.items()]
+    return sorted((hit for hit in scored if hit[1] > threshold), key=lambda hit: -hit[1])[:limit]
+
+
+@pytest.fixture
+def vectors():
+    rng = random.Random(7)
+    return {f"memory:c1:chunk:{i}": [rng.uniform(-1, 1) for _ in range(16)] for i in range(200)}
+
+
+@pytest.mark.parametrize("limit,threshold", [(3, 0.0), (10, 0.3), (500, -1.0)])
+def test_search_matches_brute_force_cosine(vectors, limit, threshold):
+    index = ChildEmbeddingIndex(16)
+    for key, vector in vectors.items():
+        index.upsert(key, vector)
+    query = vectors["memory:c1:chunk:42"]
+
+    hits = index.search(query, limit, threshold)
+    expected = brute_force(vectors, query, limit, threshold)
+
+    assert [key for key, _ in hits] == [key for key, _ in expected]
+    assert [score for _, score in hits] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+
+def test_overwrites_and_removals_stay_in_sync(vectors):
+    index = ChildEmbeddingIndex(16)
+    for key, vector in vectors.items():
+        index.upsert(key, vector)
+
+    for i in range(0, 200, 3):
+        key = f"memory:c1:chunk:{i}"
+        index.remove(key)
+        del vectors[key]
+    vectors["memory:c1:chunk:1"] = [-x for x in vectors["memory:c1:chunk:1"]]
+    index.upsert("memory:c1:chunk:1", vectors["memory:c1:chunk:1"])
+
+    assert len(index) == len(vectors)
+    query = vectors["memory:c1:chunk:1"]
+    assert [key for key, _ in index.search(query, 20, 0.0)] == [
+        key for key, _ in brute_force(vectors, query, 20, 0.0)
+    ]
+
+
+def test_skips_wrong_dimension_and_zero_queries():
+    index = ChildEmbeddingIndex(4)
+    assert index.upsert("a", [1.0, 0.0, 0.0, 0.0])
+    assert not index.upsert("b", [1.0, 0.0])
+
+    assert len(index) == 1
+    assert index.search([1.0, 0.0], 5, 0.0) == []
+    assert index.search([0.0, 0.0, 0.0, 0.0], 5, 0.0) == []
+
+
+def test_unloaded_child_is_not_updated_by_writes():
+    embeddings = EmbeddingIndex()
+    embeddings.upsert("c1", "memory:c1:chunk:0", [1.0, 0.0])
+    assert not embeddings.is_loaded("c1")
+
+    embeddings.load_child("c1", [("memory:c1:chunk:0", [1.0, 0.0]), ("memory:c1:chunk:1", None)])
+    embeddings.upsert("c1", "memory:c1:chunk:1", [0.0, 1.0])
+    assert embeddings.size("c1") == 2
+    assert embeddings.search("c1", [0.0, 1.0], 1, 0.5) == [("memory:c1:chunk:1", pytest.approx(1.0))]
@@ -0,0 +1,109 @@
+import json
+from typing import Any, Dict, List
+
+import fakeredis.aioredis
+import pytest
+
+from src.tools import import_history as import_history_module
+from src.tools.import_history import HistoryImporter
+
+
+class StubMemory:
+    def __init__(self):
+        self.redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        self.stored: List[Dict[str, Any]] = []
+        self.calls = 0
+        self.fail_calls = set()
+
+    def chunk_messages(self, messages, chunk_size=10):
+        return [messages[i:i + chunk_size] for i in range(0, len(messages), chunk_size)]
+
+    def format_chunk(self, messages):
+        return "\n".join(message["content"] for message in messages)
+
+    async def store_chunks(self, child_id, chunks, embeddings=None, metadata=None):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise ConnectionError("down")
+        self.stored.extend(message for chunk in chunks for message in chunk)
+        return 1
+
+
+class StubOpenAI:
+    async def create_embeddings(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    memory = StubMemory()
+    monkeypatch.setattr(import_history_module, "memory_manager", memory)
+    monkeypatch.setattr(import_history_module, "openai_client", StubOpenAI())
+    return memory
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / "messages.ndjson"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(20):
+            f.write(json.dumps({"child_id": "c1", "session_id": "s1", "sender": "child", "content": f"m{i}"}) + "\n")
+    return str(path)
+
+
+def importer():
+    # One worker keeps batch completion in order; 4 records per batch
+    return HistoryImporter(run_name="test", workers=1, batch_chunks=2, chunk_size=2)
+
+
+async def test_failed_batch_holds_the_checkpoint_and_a_rerun_resumes_there(memory, export):
+    memory.fail_calls = {3}
+
+    first = await importer().run([export])
+
+    assert first.failed_batches == 1
+    # Batches 4 and 5 were written, but the checkpoint cannot pass batch 3
+    assert await memory.redis_client.hgetall("import:history:test") == {export: "8"}
+    assert [m["content"] for m in memory.stored] == [f"m{i}" for i in list(range(8)) + list(range(12, 20))]
+
+    memory.stored.clear()
+    second = await importer().run([export])
+
+    assert (second.resumed, second.records, second.failed_batches) == (8, 12, 0)
+    assert [m["content"] for m in memory.stored] == [f"m{i}" for i in range(8, 20)]
+    assert await memory.redis_client.hgetall("import:history:test") == {export: "20"}
+
+
+async def test_finished_import_is_not_repeated(memory, export):
+    await importer().run([export])
+    assert len(memory.stored) == 20
+
+    memory.stored.clear()
+    again = await importer().run([export])
+
+    assert (again.resumed, again.records, again.chunks) == (20, 0, 0)
+    assert memory.stored == []
+
+
+async def test_checkpoints_are_per_run_name(memory, export):
+    await importer().run([export])
+    memory.stored.clear()
+
+    other = await HistoryImporter(run_name="other", workers=1).run([export])
+
+    assert other.resumed == 0 and len(memory.stored) == 20
+
+
+async def test_json_array_sessions_use_the_file_name_and_child_option(memory, tmp_path):
+    path = tmp_path / "session-42.json"
+    path.write_text(json.dumps([
+        {"timestamp": "2024-12-01T10:00:00", "message": {"role": "user", "content": "hi"}},
+        {"timestamp": "2024-12-01T10:00:01", "message": {"role": "assistant", "content": "hello"}},
+        {"timestamp": "2024-12-01T10:00:02", "message": {"role": "user", "content": ""}},
+    ]), encoding="utf-8")
+
+    stats = await HistoryImporter(workers=1, child_id="c9").run([str(path)])
+
+    assert (stats.records, stats.skipped, stats.chunks) == (3, 1, 1)
+    assert [m["content"] for m in memory.stored] == ["hi", "hello"]
+    assert memory.stored[0]["timestamp"] == "2024-12-01T10:00:00"
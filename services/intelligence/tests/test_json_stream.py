@@ -0,0 +1,52 @@
+import json
+
+from src.core.json_stream import JsonArrayStreamParser
+
+MESSAGES = [
+    {"day": 1, "message": "Snow \"day\" {fun} [yay]", "tags": ["a", "b"]},
+    {"day": 2, "message": "Back\\slash and é and newline\n", "nested": {"x": [1, {"y": 2}]}},
+]
+
+
+def feed_in_pieces(text, size):
+    parser = JsonArrayStreamParser()
+    out = []
+    for start in range(0, len(text), size):
+        out.extend(parser.feed(text[start:start + size]))
+    return parser, out
+
+
+def test_elements_complete_across_any_split():
+    text = json.dumps(MESSAGES)
+    for size in (1, 2, 3, 7, len(text)):
+        parser, out = feed_in_pieces(text, size)
+        assert out == MESSAGES
+        assert parser.done
+
+
+def test_array_nested_in_wrapper_object():
+    text = json.dumps({"note": "ignore [this]", "messages": MESSAGES, "after": [{"not": "read"}]})
+    parser, out = feed_in_pieces(text, 5)
+
+    assert out == MESSAGES
+    assert parser.done
+
+
+def test_elements_are_returned_as_soon_as_they_close():
+    parser = JsonArrayStreamParser()
+    text = json.dumps(MESSAGES)
+    first_end = text.index("}, {") + 1
+
+    assert parser.feed(text[:first_end - 1]) == []
+    assert parser.feed(text[first_end - 1:first_end]) == [MESSAGES[0]]
+
+
+def test_scalar_elements_are_skipped():
+    _, out = feed_in_pieces('[1, "two", {"three": 3}, null, [4]]', 4)
+    assert out == [{"three": 3}, [4]]
+
+
+def test_empty_array_and_trailing_text():
+    parser, out = feed_in_pieces('[]  some trailing model chatter [{"x": 1}]', 3)
+    assert out == []
+    assert parser.done
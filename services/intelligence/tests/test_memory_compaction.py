@@ -0,0 +1,92 @@
+from typing import List, Set
+
+import fakeredis.aioredis
+import pytest
+
+from src.core.memory_compaction import MemoryCompactor
+from src.core.memory_manager import ChunkStats
+
+
+class StubMemory:
+    def __init__(self, chunk_count: int):
+        self.redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        self.stats = [
+            ChunkStats(str(i), f"memory:c1:chunk:{i}", written_at=0.0, access_count=0, size=100)
+            for i in range(chunk_count)
+        ]
+        self.summaries: Set[str] = set()
+        self.deleted: List[str] = []
+
+    async def chunk_stats(self, child_id):
+        return self.stats
+
+    async def get_chunks(self, child_id, chunk_ids):
+        return [
+            {"kind": "summary"} if chunk_id in self.summaries else {"messages": []}
+            for chunk_id in chunk_ids
+        ]
+
+    async def delete_chunks(self, child_id, chunk_ids):
+        self.deleted.extend(chunk_ids)
+        return 100 * len(chunk_ids)
+
+
+def compactor_for(memory, merge):
+    compactor = MemoryCompactor(memory, openai_client=None, min_age_seconds=0, group_size=2, max_chunks=100)
+    compactor._merge = merge
+    return compactor
+
+
+async def test_compacts_groups_and_releases_lock():
+    memory = StubMemory(4)
+
+    async def merge(child_id, chunk_ids, chunks):
+        return 50
+
+    report = await compactor_for(memory, merge).compact_child("c1")
+
+    assert (report.merged, report.summaries) == (4, 2)
+    assert await memory.redis_client.exists("memory:c1:compaction_lock") == 0
+
+
+async def test_skips_child_locked_by_another_worker():
+    memory = StubMemory(4)
+    await memory.redis_client.set("memory:c1:compaction_lock", "other", ex=60)
+
+    async def merge(child_id, chunk_ids, chunks):
+        pytest.fail("compacted a locked child")
+
+    report = await compactor_for(memory, merge).compact_child("c1")
+    assert report.merged == 0
+
+
+async def test_run_that_outlives_its_lock_stops_and_keeps_the_new_lock():
+    memory = StubMemory(6)
+    lock_key = "memory:c1:compaction_lock"
+
+    async def merge(child_id, chunk_ids, chunks):
+        # The lock expires mid-run and another worker takes it
+        await memory.redis_client.set(lock_key, "other", ex=60)
+        return 50
+
+    report = await compactor_for(memory, merge).compact_child("c1")
+
+    assert report.summaries == 1
+    assert memory.deleted == ["0", "1"]
+    assert await memory.redis_client.get(lock_key) == "other"
+
+
+async def test_earlier_summaries_are_not_merged_again():
+    memory = StubMemory(5)
+    memory.summaries = {"0", "2"}
+    merged = []
+
+    async def merge(child_id, chunk_ids, chunks):
+        merged.append(chunk_ids)
+        return 50
+
+    report = await compactor_for(memory, merge).compact_child("c1")
+
+    assert merged == [["1", "3"]]
+    assert (report.merged, report.summaries) == (2, 1)
+    assert memory.deleted == ["1", "3"]
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import math
+import random
+import time
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from src.core import memory_manager as memory_manager_module
+from src.core.memory_manager import MemoryManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    server = fakeredis.FakeServer()
+
+    def from_url(url, decode_responses=False):
+        return fakeredis.aioredis.FakeRedis(server=server, decode_responses=decode_responses)
+
+    monkeypatch.setattr(memory_manager_module.redis, "from_url", from_url)
+    return MemoryManager()
+
+
+async def test_backfilled_chunks_keep_their_write_time(manager):
+    redis_client = manager.redis_client
+    await redis_client.set("memory:c1:chunk:0", json.dumps({"created_at": "2024-01-02T03:04:05"}))
+    await redis_client.set("memory:c1:chunk:1", json.dumps({"messages": []}))  # No timestamp
+
+    before = time.time()
+    written_at = await manager._list_chunk_keys("c1")
+
+    assert written_at["memory:c1:chunk:0"] == 1704164645.0
+    assert written_at["memory:c1:chunk:1"] >= before
+    assert await redis_client.zscore("memory:c1:chunks", "0") == 1704164645.0
+    assert [chunk.written_at for chunk in await manager.chunk_stats("c1")][0] == 1704164645.0
+
+
+def clustered_embeddings(count, seed=3):
+    rng = random.Random(seed)
+    centers = [[rng.uniform(-1, 1) for _ in range(8)] for _ in range(3)]
+    return [[x + rng.uniform(-0.3, 0.3) for x in centers[i % 3]] for i in range(count)]
+
+
+async def keys_and_get_search(redis_client, child_id, query, limit):
+    """The original search: KEYS, one GET per chunk, pure-Python cosine."""
+    scored = []
+    for key in await redis_client.keys(f"memory:{child_id}:chunk:*"):
+        chunk = json.loads(await redis_client.get(key))
+        embedding = chunk.get("embedding")
+        if not embedding:
+            continue
+        dot = sum(a * b for a, b in zip(embedding, query))
+        norms = math.sqrt(sum(a * a for a in embedding)) * math.sqrt(sum(b * b for b in query))
+        score = dot / norms if norms else 0.0
+        if score > 0.7:
+            scored.append((score, chunk))
+    scored.sort(key=lambda hit: -hit[0])
+    return [chunk for _, chunk in scored[:limit]]
+
+
+@pytest.mark.parametrize("limit", [1, 3, 50])
+async def test_search_matches_the_keys_and_get_path(manager, limit):
+    embeddings = clustered_embeddings(30)
+    messages = [{"role": "user", "content": f"message {i}"} for i in range(300)]
+    await manager.store_long_term_memory("c1", messages, embeddings)
+    await manager.store_long_term_memory("c2", messages[:10], embeddings[:1])  # Another child
+
+    for query in (embeddings[0], embeddings[1], [-x for x in embeddings[2]]):
+        found = await manager.search_long_term_memory("c1", query, limit=limit)
+        expected = await keys_and_get_search(manager.redis_client, "c1", query, limit)
+        assert [chunk["chunk_id"] for chunk in found] == [chunk["chunk_id"] for chunk in expected]
+
+
+async def test_search_finds_chunks_written_before_the_chunk_index(manager):
+    embeddings = clustered_embeddings(12)
+    for i, embedding in enumerate(embeddings):
+        chunk = {"chunk_id": i, "messages": [], "embedding": embedding, "created_at": "2024-01-02T03:04:05"}
+        await manager.redis_client.set(f"memory:c1:chunk:{i}", json.dumps(chunk))
+
+    found = await manager.search_long_term_memory("c1", embeddings[4], limit=5)
+    expected = await keys_and_get_search(manager.redis_client, "c1", embeddings[4], 5)
+
+    assert found and [chunk["chunk_id"] for chunk in found] == [chunk["chunk_id"] for chunk in expected]
+    assert await manager.redis_client.zcard("memory:c1:chunks") == 12
+
+    # New chunks continue the ids after the backfilled ones
+    await manager.store_long_term_memory("c1", [{"role": "user", "content": "hi"}], embeddings[:1])
+    assert await manager.redis_client.exists("memory:c1:chunk:12")
+
+
+async def test_search_skips_chunks_expired_since_the_index_loaded(manager):
+    embeddings = clustered_embeddings(6)
+    messages = [{"role": "user", "content": f"message {i}"} for i in range(60)]
+    await manager.store_long_term_memory("c1", messages, embeddings)
+    await manager.search_long_term_memory("c1", embeddings[0])
+
+    await manager.redis_client.delete("memory:c1:chunk:0", "memory:c1:chunk:3")
+    found = await manager.search_long_term_memory("c1", embeddings[0], limit=10)
+
+    assert [chunk["chunk_id"] for chunk in found] == [
+        chunk["chunk_id"] for chunk in await keys_and_get_search(manager.redis_client, "c1", embeddings[0], 10)
+    ]
+    assert manager.embedding_index.size("c1") == 4
+
+
+async def test_session_log_keeps_a_rolling_window_with_a_ttl(manager, monkeypatch):
+    monkeypatch.setattr(memory_manager_module.settings, "short_term_memory_window", 5)
+    client = manager.binary_redis_client
+
+    for turn in range(4):
+        await manager.append_short_term_memory("c1", "s1", [
+            {"role": "user", "content": f"question {turn}"},
+            {"role": "assistant", "content": f"answer {turn}"},
+        ])
+
+    assert await client.llen("session:s1:messages") == 5
+    messages = await manager.load_short_term_memory("s1")
+    assert [m["content"] for m in messages] == [
+        "answer 1", "question 2", "answer 2", "question 3", "answer 3"
+    ]
+    assert [m["content"] for m in await manager.load_short_term_memory("s1", limit=2)] == [
+        "question 3", "answer 3"
+    ]
+
+    ttl = memory_manager_module.settings.memory_ttl_days * 24 * 60 * 60
+    assert 0 < await client.ttl("session:s1:messages") <= ttl
+    assert 0 < await client.ttl("session:s1:meta") <= ttl
+    assert (await client.hget("session:s1:meta", "child_id")) == b"c1"
+
+
+async def test_concurrent_turns_on_a_session_append_rather_than_overwrite(manager, monkeypatch):
+    monkeypatch.setattr(memory_manager_module.settings, "short_term_memory_window", 20)
+    await asyncio.gather(*(
+        manager.append_short_term_memory("c1", "s1", [{"role": "user", "content": f"m{i}"}])
+        for i in range(8)
+    ))
+
+    messages = await manager.load_short_term_memory("s1")
+    assert sorted(m["content"] for m in messages) == [f"m{i}" for i in range(8)]
+
+
+async def test_metadata_only_turn_refreshes_the_session_without_messages(manager):
+    await manager.append_short_term_memory("c1", "s1", [])
+
+    assert await manager.binary_redis_client.exists("session:s1:messages") == 0
+    assert await manager.binary_redis_client.hget("session:s1:meta", "updated_at")
+    assert await manager.load_short_term_memory("s1") == []
+
+
+async def test_reads_a_whole_session_blob_written_before_the_log(manager):
+    record = {"child_id": "c1", "messages": [{"role": "user", "content": f"m{i}"} for i in range(6)]}
+    await manager.binary_redis_client.set("session:s1", json.dumps(record))
+
+    assert [m["content"] for m in await manager.load_short_term_memory("s1", limit=3)] == ["m3", "m4", "m5"]
+
+    # Once the log has entries it is the source of truth
+    await manager.append_short_term_memory("c1", "s1", [{"role": "user", "content": "new"}])
+    assert [m["content"] for m in await manager.load_short_term_memory("s1")] == ["new"]
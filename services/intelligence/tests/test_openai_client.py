@@ -0,0 +1,88 @@
+import asyncio
+
+import openai
+import pytest
+
+from src.integrations.fake_openai import FakeAsyncOpenAI
+from src.integrations.openai_client import OpenAIClient
+from src.settings import settings
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "openai_retry_base_delay", 0.0)
+    return OpenAIClient(client=FakeAsyncOpenAI(ttft_ms=0, token_latency_ms=0, jitter_ms=0, tokens=5))
+
+
+@pytest.mark.parametrize("max_retries", [-1, 0])
+async def test_negative_retries_still_make_one_attempt(client, monkeypatch, max_retries):
+    monkeypatch.setattr(settings, "openai_max_retries", max_retries)
+
+    text = await client.create_completion("hello")
+    messages = [{"role": "user", "content": "hi"}]
+    pieces = [piece async for piece in client.create_chat_completion(messages, stream=True)]
+
+    assert text
+    assert pieces
+
+
+async def test_retries_transient_errors_then_raises_the_last(client, monkeypatch):
+    monkeypatch.setattr(settings, "openai_max_retries", 2)
+    failing = FakeAsyncOpenAI(error_rate=1.0)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        failing._maybe_fail(1.0)
+
+    with pytest.raises(openai.APIConnectionError):
+        await client._call_with_retries("completion", call)
+    assert len(calls) == 3
+
+
+@pytest.fixture
+def slow_client():
+    upstream = FakeAsyncOpenAI(ttft_ms=0, token_latency_ms=20, jitter_ms=0, tokens=50)
+    return OpenAIClient(client=upstream), upstream
+
+
+async def test_closing_the_stream_early_closes_the_upstream(slow_client):
+    client, upstream = slow_client
+    chunks = client.create_chat_completion([{"role": "user", "content": "hi"}], stream=True)
+
+    await chunks.__anext__()
+    assert upstream.open_streams == 1
+    await chunks.aclose()  # e.g. the client went away while a chunk was being sent
+
+    assert upstream.open_streams == 0
+
+
+async def test_cancelling_mid_stream_closes_the_upstream(slow_client):
+    client, upstream = slow_client
+    received = []
+
+    async def consume():
+        async for chunk in client.create_chat_completion([{"role": "user", "content": "hi"}], stream=True):
+            received.append(chunk)
+
+    task = asyncio.create_task(consume())
+    while len(received) < 2:
+        await asyncio.sleep(0.005)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert upstream.open_streams == 0
+
+
+async def test_failed_attempt_closes_its_stream(client, monkeypatch):
+    monkeypatch.setattr(settings, "openai_max_retries", 1)
+    upstream = client.client
+    upstream.mid_stream_error_rate = 1.0
+    upstream.tokens = 1  # Fails on the first piece, before any content is read
+
+    with pytest.raises(openai.APIConnectionError):
+        async for _ in client.create_chat_completion([{"role": "user", "content": "hi"}], stream=True):
+            pass
+
+    assert upstream.open_streams == 0
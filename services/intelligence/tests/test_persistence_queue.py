@@ -0,0 +1,103 @@
+import asyncio
+
+from src.core.persistence_queue import PersistenceJob, PersistenceQueue
+
+
+def job(session_id, text, cached=()):
+    message = {"role": "user", "content": text}
+    return PersistenceJob("c1", session_id, new_messages=[message], cached_replies=list(cached))
+
+
+async def test_jobs_for_a_waiting_session_are_coalesced_in_order():
+    written = []
+    release = asyncio.Event()
+
+    async def handler(persisted):
+        await release.wait()
+        written.append((persisted.session_id, [m["content"] for m in persisted.new_messages]))
+
+    queue = PersistenceQueue(handler, workers=1)
+    queue.start()
+    await queue.enqueue(job("s1", "one"))
+    await asyncio.sleep(0)  # The worker takes s1 and blocks
+    await queue.enqueue(job("s1", "two"))
+    await queue.enqueue(job("s1", "three"))
+    await queue.enqueue(job("s2", "other"))
+    release.set()
+    await queue.stop()
+
+    assert written == [("s1", ["one"]), ("s1", ["two", "three"]), ("s2", ["other"])]
+    assert queue.metrics()["coalesced"] == 1
+
+
+async def test_merge_keeps_new_messages_and_cached_replies_in_order():
+    merged = job("s1", "one", [("scope", "one", "reply one")]).merge(job("s1", "two", [("scope", "two", "reply two")]))
+
+    assert [m["content"] for m in merged.new_messages] == ["one", "two"]
+    assert [reply for _, _, reply in merged.cached_replies] == ["reply one", "reply two"]
+
+
+async def test_same_session_never_runs_concurrently():
+    active = 0
+    peak = 0
+
+    async def handler(persisted):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    queue = PersistenceQueue(handler, workers=4)
+    queue.start()
+    for i in range(10):
+        await queue.enqueue(job("s1", str(i)))
+        await asyncio.sleep(0.003)
+    await queue.stop()
+
+    assert peak == 1
+
+
+async def test_failures_are_counted_and_do_not_stop_workers():
+    async def handler(persisted):
+        if persisted.session_id == "bad":
+            raise RuntimeError("redis down")
+
+    queue = PersistenceQueue(handler, workers=1)
+    queue.start()
+    await queue.enqueue(job("bad", "x"))
+    await queue.enqueue(job("good", "y"))
+    await queue.stop()
+
+    assert (queue.failed, queue.processed) == (1, 1)
+
+
+async def test_runs_inline_when_not_started():
+    written = []
+
+    async def handler(persisted):
+        written.append(persisted.session_id)
+
+    await PersistenceQueue(handler).enqueue(job("s1", "x"))
+    assert written == ["s1"]
+
+
+async def test_full_queue_applies_backpressure():
+    release = asyncio.Event()
+
+    async def handler(persisted):
+        await release.wait()
+
+    queue = PersistenceQueue(handler, maxsize=1, workers=1)
+    queue.start()
+    await queue.enqueue(job("s1", "x"))
+    await asyncio.sleep(0)  # Worker holds s1
+    await queue.enqueue(job("s2", "x"))  # Fills the queue
+
+    blocked = asyncio.create_task(queue.enqueue(job("s3", "x")))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    release.set()
+    await asyncio.wait_for(blocked, timeout=1.0)
+    await queue.stop()
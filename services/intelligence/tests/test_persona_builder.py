@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from src.api.schemas import PersonaType
+from src.core.persona_builder import PersonaBuilder
+
+
+def write(path, content, bump=0):
+    path.write_text(content, encoding="utf-8")
+    # Filesystems with coarse mtimes would otherwise hide a quick rewrite
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+
+@pytest.fixture
+def prompts_dir(tmp_path):
+    for filename in PersonaBuilder.FILENAMES:
+        write(tmp_path / filename, f"{filename} v1")
+    return tmp_path
+
+
+def test_edited_template_is_picked_up_without_a_restart(prompts_dir):
+    builder = PersonaBuilder(prompts_dir, reload_interval=0)
+    assert "daddy_variant.md v1" in builder.build_system_prompt(PersonaType.DADDY, "Ada")
+
+    write(prompts_dir / "daddy_variant.md", "daddy_variant.md v2", bump=1)
+
+    prompt = builder.build_system_prompt(PersonaType.DADDY, "Ada")
+    assert "daddy_variant.md v2" in prompt and "daddy_variant.md v1" not in prompt
+    assert builder.persona_prefix(PersonaType.DADDY) == "base.md v1\n\ndaddy_variant.md v2"
+
+
+def test_changes_are_only_polled_every_reload_interval(prompts_dir):
+    builder = PersonaBuilder(prompts_dir, reload_interval=3600)
+    write(prompts_dir / "base.md", "base.md v2", bump=1)
+
+    assert builder.build_system_prompt(PersonaType.MUMMY, "Ada").startswith("base.md v1")
+    assert builder.reload()
+    assert builder.build_system_prompt(PersonaType.MUMMY, "Ada").startswith("base.md v2")
+    assert not builder.reload()  # Nothing changed since
+
+
+def test_missing_file_uses_the_fallback_until_it_appears(prompts_dir):
+    (prompts_dir / "mummy_variant.md").unlink()
+    builder = PersonaBuilder(prompts_dir, reload_interval=0)
+    assert "You are Mummy" in builder.build_system_prompt(PersonaType.MUMMY, "Ada")
+
+    write(prompts_dir / "mummy_variant.md", "mummy_variant.md v2")
+    assert "mummy_variant.md v2" in builder.build_system_prompt(PersonaType.MUMMY, "Ada")
+
+
+def test_deleted_file_keeps_the_last_good_content(prompts_dir):
+    builder = PersonaBuilder(prompts_dir, reload_interval=0)
+    (prompts_dir / "daddy_variant.md").unlink()
+
+    assert "daddy_variant.md v1" in builder.build_system_prompt(PersonaType.DADDY, "Ada")
+
+
+def test_prompts_start_with_the_persona_prefix(prompts_dir):
+    builder = PersonaBuilder(prompts_dir, reload_interval=0)
+
+    for persona in (PersonaType.MUMMY, PersonaType.DADDY):
+        for child in ("Ada", "Bo"):
+            assert builder.build_system_prompt(persona, child).startswith(builder.persona_prefix(persona))
+    custom = builder.build_system_prompt(PersonaType.CUSTOM, "Ada", "Talk like a pirate")
+    assert custom.startswith("base.md v1\n\nTalk like a pirate")
+
+
+def test_rendered_prompts_are_memoized_with_lru_eviction(prompts_dir):
+    builder = PersonaBuilder(prompts_dir, reload_interval=3600, cache_size=2)
+    first = builder.build_system_prompt(PersonaType.DADDY, "Ada")
+
+    assert builder.build_system_prompt(PersonaType.DADDY, "Ada") is first
+    builder.build_system_prompt(PersonaType.DADDY, "Bo")
+    builder.build_system_prompt(PersonaType.DADDY, "Cy")
+    assert ("daddy", "Ada", "") not in builder._rendered
+    assert len(builder._rendered) == 2
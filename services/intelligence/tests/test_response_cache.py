@@ -0,0 +1,105 @@
+import math
+
+import fakeredis.aioredis
+import pytest
+
+from src.core.response_cache import ResponseCache, normalize_message
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(fakeredis.aioredis.FakeRedis(decode_responses=True), similarity_threshold=0.95)
+
+
+def at_similarity(similarity):
+    """A unit vector whose cosine with [1, 0] is `similarity`."""
+    return [similarity, math.sqrt(1 - similarity ** 2)]
+
+
+def embedder(vector, calls=None):
+    async def embed():
+        if calls is not None:
+            calls.append(1)
+        return vector
+    return embed
+
+
+async def test_exact_hit_after_normalization(cache):
+    scope = cache.scope("daddy", "c1", [])
+    await cache.put(scope, "I love you Daddy!!", "I love you too!")
+
+    calls = []
+    assert await cache.get("daddy", scope, "i love you,  daddy", embedder([1.0, 0.0], calls)) == "I love you too!"
+    assert calls == []  # No embedding needed for an exact match
+    assert normalize_message("  How ARE you?? ") == "how are you"
+
+
+@pytest.mark.parametrize("similarity,hit", [(0.999, True), (0.951, True), (0.95, False), (0.94, False)])
+async def test_semantic_hit_only_above_the_threshold(cache, similarity, hit):
+    scope = cache.scope("daddy", "c1", [])
+    await cache.put(scope, "how are you daddy", "I'm great!", embedder([1.0, 0.0]))
+
+    reply = await cache.get("daddy", scope, "how r u daddy", embedder(at_similarity(similarity)))
+
+    assert reply == ("I'm great!" if hit else None)
+    assert cache.metrics()["daddy"]["semantic" if hit else "miss"] == 1
+
+
+async def test_miss_skips_embedding_without_candidates(cache):
+    calls = []
+    scope = cache.scope("daddy", "c1", [])
+
+    assert await cache.get("daddy", scope, "hello", embedder([1.0, 0.0], calls)) is None
+    assert calls == []
+
+
+async def test_history_and_child_change_the_scope(cache):
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "Hello!"}]
+    scope = cache.scope("daddy", "c1", history)
+    await cache.put(scope, "how are you", "Great!", embedder([1.0, 0.0]))
+
+    assert await cache.get("daddy", cache.scope("daddy", "c1", history), "how are you") == "Great!"
+    assert await cache.get("daddy", cache.scope("daddy", "c2", history), "how are you") is None
+    assert await cache.get("mummy", cache.scope("mummy", "c1", history), "how are you") is None
+    other_turn = history + [{"role": "user", "content": "tell me a story"}]
+    assert await cache.get("daddy", cache.scope("daddy", "c1", other_turn), "how are you") is None
+    # Only the last history_depth messages count
+    older = [{"role": "user", "content": "earlier"}] + history
+    assert cache.scope("daddy", "c1", older) == scope
+
+
+async def test_expired_reply_is_a_miss_and_forgets_the_candidate(cache):
+    scope = cache.scope("daddy", "c1", [])
+    await cache.put(scope, "how are you daddy", "I'm great!", embedder([1.0, 0.0]))
+    await cache.redis_client.delete(cache._redis_key(cache.make_key(scope, "how are you daddy")))
+
+    calls = []
+    assert await cache.get("daddy", scope, "how r u daddy", embedder(at_similarity(0.99), calls)) is None
+    assert await cache.get("daddy", scope, "how r u daddy", embedder(at_similarity(0.99), calls)) is None
+    assert len(calls) == 1  # Nothing left to compare against the second time
+
+
+async def test_entries_get_the_freshness_ttl(cache):
+    scope = cache.scope("daddy", "c1", [])
+    await cache.put(scope, "hi", "Hello!")
+
+    ttl = await cache.redis_client.ttl(cache._redis_key(cache.make_key(scope, "hi")))
+    assert 0 < ttl <= cache.ttl_seconds
+
+
+def test_only_short_messages_are_cacheable(cache):
+    assert cache.is_cacheable("a" * 80)
+    assert not cache.is_cacheable("a" * 81)
+    assert not cache.is_cacheable("?!")
+
+
+async def test_hit_rate_per_persona(cache):
+    scope = cache.scope("daddy", "c1", [])
+    await cache.put(scope, "hi", "Hello!")
+    await cache.get("daddy", scope, "hi")
+    await cache.get("daddy", scope, "bye")
+    await cache.get("mummy", cache.scope("mummy", "c1", []), "hi")
+
+    stats = cache.metrics()
+    assert stats["daddy"] == {"exact": 1, "semantic": 0, "miss": 1, "hit_rate": 0.5}
+    assert stats["mummy"]["hit_rate"] == 0.0
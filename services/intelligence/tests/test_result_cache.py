@@ -0,0 +1,79 @@
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+
+from src.core.result_cache import ResultCache
+
+
+@pytest.fixture
+def cache():
+    return ResultCache("test", fakeredis.aioredis.FakeRedis(decode_responses=True))
+
+
+async def test_concurrent_misses_compute_once(cache):
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return {"value": 1}, True
+
+    key = cache.make_key(theme="winter")
+    results = await asyncio.gather(*[cache.get_or_compute(key, compute) for _ in range(5)])
+
+    assert results == [{"value": 1}] * 5
+    assert calls == 1
+    assert await cache.get_or_compute(key, compute) == {"value": 1}
+    assert calls == 1
+
+
+async def test_cancelled_leader_hands_over_to_a_follower(cache):
+    calls = 0
+    started = asyncio.Event()
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await asyncio.sleep(0.02)
+        return calls, True
+
+    key = cache.make_key(theme="winter")
+    leader = asyncio.create_task(cache.get_or_compute(key, compute))
+    await started.wait()
+    followers = [asyncio.create_task(cache.get_or_compute(key, compute)) for _ in range(3)]
+    await asyncio.sleep(0.005)  # Followers waiting on the leader's computation
+    leader.cancel()
+
+    assert await asyncio.gather(*followers) == [2, 2, 2]
+    assert calls == 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_failure_reaches_followers_and_is_not_cached(cache):
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    key = cache.make_key(theme="winter")
+    results = await asyncio.gather(
+        cache.get_or_compute(key, failing), cache.get_or_compute(key, failing), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def working():
+        return "ok", True
+
+    assert await cache.get_or_compute(key, working) == "ok"
+
+
+async def test_incomplete_results_are_not_cached(cache):
+    async def partial():
+        return "partial", False
+
+    key = cache.make_key(theme="winter")
+    await cache.get_or_compute(key, partial)
+    assert await cache.redis_client.get(cache._redis_key(key)) is None
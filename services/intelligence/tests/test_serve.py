@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from src.api import serve
+from src.settings import settings
+
+
+@pytest.fixture
+def restore_settings(monkeypatch):
+    monkeypatch.setattr(settings, "cache_invalidation_enabled", False)
+    monkeypatch.delenv("CACHE_INVALIDATION_ENABLED", raising=False)
+
+
+def test_gunicorn_workers_inherit_cache_invalidation(monkeypatch, restore_settings):
+    seen = {}
+
+    def fake_gunicorn(host, port, workers, log_level):
+        # Gunicorn forks here: workers inherit this process's settings object
+        seen["enabled"] = settings.cache_invalidation_enabled
+        seen["workers"] = workers
+
+    monkeypatch.setattr(serve, "run_gunicorn", fake_gunicorn)
+    serve.main(["--workers", "4", "--server", "gunicorn"])
+
+    assert seen == {"enabled": True, "workers": 4}
+    assert os.environ["CACHE_INVALIDATION_ENABLED"] == "true"
+
+
+def test_single_worker_leaves_cache_invalidation_off(monkeypatch, restore_settings):
+    monkeypatch.setattr(serve, "run_uvicorn", lambda *args, **kwargs: None)
+    serve.main(["--workers", "1"])
+
+    assert settings.cache_invalidation_enabled is False
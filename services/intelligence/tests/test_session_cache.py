@@ -0,0 +1,87 @@
+import asyncio
+
+from src.core import session_cache
+from src.core.session_cache import SessionHistoryCache
+
+
+def message(text):
+    return {"role": "user", "content": text}
+
+
+async def test_concurrent_gets_share_one_load():
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return [message("hi")]
+
+    cache = SessionHistoryCache()
+    results = await asyncio.gather(*[cache.get("s1", load) for _ in range(5)])
+
+    assert loads == 1
+    assert results == [[message("hi")]] * 5
+    results[0].append(message("mutated"))
+    assert await cache.get("s1", load) == [message("hi")]
+
+
+async def test_cancelled_caller_does_not_cancel_the_shared_load():
+    async def load():
+        await asyncio.sleep(0.02)
+        return [message("hi")]
+
+    cache = SessionHistoryCache()
+    first = asyncio.create_task(cache.get("s1", load))
+    second = asyncio.create_task(cache.get("s1", load))
+    await asyncio.sleep(0.005)
+    first.cancel()
+
+    assert await second == [message("hi")]
+
+
+async def test_append_keeps_the_window_and_invalidate_drops():
+    async def load():
+        return [message(str(i)) for i in range(3)]
+
+    cache = SessionHistoryCache(window=4)
+    await cache.get("s1", load)
+    cache.append("s1", [message("3"), message("4")])
+
+    async def unused():
+        raise AssertionError("cache miss")
+
+    assert [m["content"] for m in await cache.get("s1", unused)] == ["1", "2", "3", "4"]
+
+    cache.invalidate("s1")
+    assert len(await cache.get("s1", load)) == 3
+
+
+async def test_entries_expire(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(session_cache.time, "monotonic", lambda: now[0])
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        return []
+
+    cache = SessionHistoryCache(ttl_seconds=10)
+    await cache.get("s1", load)
+    now[0] = 11.0
+    cache.append("s1", [message("late")])  # Expired entries are not extended
+    await cache.get("s1", load)
+
+    assert loads == 2
+
+
+async def test_oldest_sessions_are_evicted():
+    async def load():
+        return []
+
+    cache = SessionHistoryCache(max_sessions=2)
+    for session_id in ("s1", "s2", "s3"):
+        await cache.get(session_id, load)
+
+    assert list(cache._entries) == ["s2", "s3"]
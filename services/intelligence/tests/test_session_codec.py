@@ -0,0 +1,77 @@
+import json
+import zlib
+
+import pytest
+
+from src.core.session_codec import (
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_ZSTD,
+    FORMAT_JSON,
+    FORMAT_MSGPACK,
+    SessionSerializer,
+)
+
+MESSAGE = {"role": "user", "content": "I love you Daddy ❤", "token_count": 9}
+SESSION = {
+    "messages": [MESSAGE] * 40,
+    "child_id": "c1",
+}
+
+
+@pytest.mark.parametrize("format", ["json", "msgpack"])
+def test_round_trip(format):
+    if format == "msgpack":
+        pytest.importorskip("msgpack")
+    serializer = SessionSerializer(format=format)
+
+    raw = serializer.dumps(MESSAGE)
+
+    assert raw[0] == {"json": FORMAT_JSON, "msgpack": FORMAT_MSGPACK}[format] | COMPRESSION_NONE
+    assert serializer.loads(raw) == MESSAGE
+    assert serializer.is_current(raw)
+
+
+def test_msgpack_entries_are_smaller_than_json():
+    pytest.importorskip("msgpack")
+    raw = SessionSerializer(format="msgpack").dumps(MESSAGE)
+    assert len(raw) < len(json.dumps(MESSAGE).encode("utf-8"))
+
+
+def test_reads_records_written_compressed():
+    reader = SessionSerializer(format="json")
+    payload = json.dumps(SESSION).encode("utf-8")
+    compressed = bytes([FORMAT_JSON | COMPRESSION_ZLIB]) + zlib.compress(payload)
+
+    assert reader.loads(compressed) == SESSION
+    assert not reader.is_current(compressed)
+
+
+def test_reads_records_written_with_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    raw = bytes([FORMAT_JSON | COMPRESSION_ZSTD]) + zstandard.ZstdCompressor().compress(json.dumps(SESSION).encode("utf-8"))
+
+    assert SessionSerializer(format="json").loads(raw) == SESSION
+
+
+def test_reads_records_from_other_formats_and_legacy_json():
+    pytest.importorskip("msgpack")
+    reader = SessionSerializer(format="json")
+
+    assert reader.loads(SessionSerializer(format="msgpack").dumps(SESSION)) == SESSION
+    assert reader.loads(json.dumps(SESSION).encode("utf-8")) == SESSION
+    assert reader.loads(json.dumps(SESSION)) == SESSION
+    assert not reader.is_current(json.dumps(SESSION).encode("utf-8"))
+    assert reader.loads(None) is None
+
+
+def test_unknown_header_is_rejected():
+    with pytest.raises(ValueError):
+        SessionSerializer(format="json").loads(b"\x0f{}")
+    with pytest.raises(ValueError):
+        SessionSerializer(format="json").loads(b"\x31{}")
+
+
+def test_unknown_configuration_is_rejected():
+    with pytest.raises(ValueError):
+        SessionSerializer(format="yaml")
@@ -0,0 +1,131 @@
+import asyncio
+from typing import AsyncIterator, List
+
+import pytest
+
+from src.api.sse import KEEPALIVE_FRAME, SSEWriter, encode_event
+from src.integrations.fake_openai import FakeAsyncOpenAI
+from src.integrations.openai_client import OpenAIClient
+
+
+async def tokens(items: List[str], delay: float = 0.0) -> AsyncIterator[str]:
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+def data_of(frame: str) -> str:
+    return "\n".join(line[6:] for line in frame.split("\n") if line.startswith("data: "))
+
+
+def test_encode_event_splits_every_line_break():
+    frame = encode_event("one\ntwo\r\nthree\rfour", event_id="7", event="token")
+
+    assert frame == "id: 7\nevent: token\ndata: one\ndata: two\ndata: three\ndata: four\n\n"
+    assert data_of(frame) == "one\ntwo\nthree\nfour"
+
+
+def test_encode_event_keeps_empty_data():
+    assert encode_event("") == "data: \n\n"
+
+
+async def test_first_chunk_is_sent_alone_then_chunks_coalesce():
+    writer = SSEWriter(flush_interval=0.05)
+    frames = [frame async for frame in writer.stream(tokens(["Hello", " there", " little", " one"]))]
+
+    assert [data_of(frame) for frame in frames] == ["Hello", " there little one"]
+    assert frames[0].startswith("id: 1\n") and frames[1].startswith("id: 2\n")
+
+
+async def test_frames_flush_at_max_bytes():
+    writer = SSEWriter(flush_interval=10.0, max_frame_bytes=8)
+    frames = [frame async for frame in writer.stream(tokens(["a", "bbbb", "cccc", "dd"]))]
+
+    assert [data_of(frame) for frame in frames] == ["a", "bbbbcccc", "dd"]
+
+
+async def test_keepalive_sent_while_upstream_is_silent():
+    writer = SSEWriter(flush_interval=0.01, keepalive_interval=0.02)
+    frames = [frame async for frame in writer.stream(tokens(["a", "b"], delay=0.07))]
+
+    assert KEEPALIVE_FRAME in frames
+    assert "".join(data_of(frame) for frame in frames if frame != KEEPALIVE_FRAME) == "ab"
+
+
+async def test_upstream_error_raised_after_buffered_text():
+    async def failing() -> AsyncIterator[str]:
+        yield "first"
+        yield "second"
+        raise RuntimeError("upstream reset")
+
+    writer = SSEWriter(flush_interval=10.0)
+    frames = []
+    with pytest.raises(RuntimeError):
+        async for frame in writer.stream(failing()):
+            frames.append(frame)
+
+    assert [data_of(frame) for frame in frames] == ["first", "second"]
+
+
+async def test_closing_early_cancels_the_upstream():
+    cancelled = asyncio.Event()
+
+    async def endless() -> AsyncIterator[str]:
+        try:
+            while True:
+                yield "token"
+                await asyncio.sleep(0.001)
+        finally:
+            cancelled.set()
+
+    writer = SSEWriter()
+    stream = writer.stream(endless())
+    await stream.__anext__()
+    await stream.aclose()
+
+    assert writer.disconnected
+    await asyncio.wait_for(cancelled.wait(), timeout=1.0)
+
+
+class DisconnectingRequest:
+    """Reports the client gone once `after` checks have been made."""
+
+    def __init__(self, after: int = 0):
+        self.after = after
+
+    async def is_disconnected(self) -> bool:
+        self.after -= 1
+        return self.after < 0
+
+
+@pytest.fixture
+def upstream():
+    upstream = FakeAsyncOpenAI(ttft_ms=0, token_latency_ms=50, jitter_ms=0, tokens=100)
+    return OpenAIClient(client=upstream), upstream
+
+
+async def test_client_disconnect_closes_the_fake_upstream(upstream):
+    client, fake = upstream
+    writer = SSEWriter(DisconnectingRequest(), keepalive_interval=0.01)
+    frames = [
+        frame async for frame in writer.stream(
+            client.create_chat_completion([{"role": "user", "content": "hi"}], stream=True)
+        )
+    ]
+
+    assert len(frames) == 1  # The first token, then the disconnect is noticed
+    assert writer.disconnected
+    assert fake.open_streams == 0
+
+
+async def test_server_closing_the_response_closes_the_fake_upstream(upstream):
+    client, fake = upstream
+    writer = SSEWriter(flush_interval=10.0)
+    frames = writer.stream(client.create_chat_completion([{"role": "user", "content": "hi"}], stream=True))
+    await frames.__anext__()
+    assert fake.open_streams == 1
+
+    await frames.aclose()  # A write to the client failed
+
+    assert fake.open_streams == 0
@@ -0,0 +1,23 @@
+import os
+import statistics
+
+from benchmarks.startup import eager_imports, measure_first_health, measure_import
+
+RUNS = 3
+# Generous enough for a shared CI runner; override to tighten locally
+MAX_IMPORT_MS = float(os.environ.get("STARTUP_MAX_IMPORT_MS", "800"))
+MAX_HEALTH_MS = float(os.environ.get("STARTUP_MAX_HEALTH_MS", "2500"))
+
+
+def test_app_import_defers_heavy_modules():
+    assert eager_imports() == []
+
+
+def test_app_import_within_budget():
+    median_ms = statistics.median(measure_import() for _ in range(RUNS)) * 1000
+    assert median_ms <= MAX_IMPORT_MS
+
+
+def test_first_health_within_budget():
+    median_ms = statistics.median(measure_first_health() for _ in range(RUNS)) * 1000
+    assert median_ms <= MAX_HEALTH_MS